@@ -1,10 +1,14 @@
-from sqlalchemy import create_engine, text, inspect
+from sqlalchemy import create_engine
 from dotenv import load_dotenv
-from datetime import datetime
-import pandas as pd
-import json
 import os
-import time
+import logging
+from hotel_mapping import GI_CONVERT_MAPPING
+from hotel_records import HotelRecord
+from hotel_db import fetch_distinct_column, fetch_one
+from payload_store import PayloadStore
+from stage_metrics import metrics, start_metrics_reporter, stop_metrics_reporter
+from log_setup import ProgressLog, setup_logging
+import fast_json
 
 
 load_dotenv()
@@ -19,212 +23,49 @@ db_name = os.getenv('DB_NAME')
 DATABASE_URL = f"mysql+pymysql://{db_user}:{db_pass}@{db_host}/{db_name}"
 engine = create_engine(DATABASE_URL)
 
+# Side table holding HotelInfo, when HOTEL_INFO_PAYLOAD_STORE is set.
+payload_store = PayloadStore.from_env(engine)
+
 table = 'hotel_info_all'
 
+logger = logging.getLogger(__name__)
+
+# Bump when build_specific_data's output changes so --changed-only exports regenerate every file.
+EXPORT_SCHEMA_VERSION = "convert-1"
+
 
 def get_system_id_list(table, column, engine):
     try: 
         query = f"SELECT {column} FROM {table} WHERE StatusUpdateHotelInfo = 'Done Json';"
-        df = pd.read_sql(query, engine)
-        # data_all = df[column].tolist()
-        # print(len(data_all))
-        data = list(set(df[column].tolist()))
+        data = fetch_distinct_column(engine, query)
         # print(len(data))
         return data
     except Exception as e:
-        print(f"Error fetching column info: {e}")
+        logger.error("Error fetching column info: %s", e)
 
 
 
 def get_specifiq_data_from_system_id(table, systemid, engine):
-    # SQL query to fetch data for a specific SystemId
-    query = f"SELECT * FROM {table} WHERE SystemId = '{systemid}';"
-    df = pd.read_sql(query, engine)
+    # SQL query to fetch data for a specific SystemId, decoded straight into a HotelRecord
+    columns = ", ".join(HotelRecord.__slots__)
+    query = f"SELECT {columns} FROM {table} WHERE SystemId = :systemid LIMIT 1;"
+    hotel_data = fetch_one(engine, query, {"systemid": systemid}, record_type=HotelRecord)
 
-    if df.empty:
-        print("No data found for the provided SystemId.")
+    if hotel_data is None:
+        logger.debug("No data found for SystemId %s.", systemid)
         return None
 
-    # Assuming only one row will be returned for a specific SystemId
-    hotel_data = df.iloc[0].to_dict()
-
-    # Extract nested JSON from the 'HotelInfo' field
-    hotel_info = json.loads(hotel_data.get("HotelInfo", "{}"))
-    
-    # Construct the hotel photo data in the desired format
-    hotel_photo_data = [
-        {
-            "picture_id": "NULL",  
-            "title": "NULL",       
-            "url": url             
-        } for url in hotel_info.get("imageUrls", []) or []
-    ]
-
-    hotel_room_amenities = [
-        {
-            "type": ameList,
-            "title": ameList,
-            "icon": "NULL"
-        } for ameList in hotel_info.get("masterRoomAmenities", []) or []
-    ]
-    
-    hotel_amenities = [
-        {
-            "type": ameList,
-            "title": ameList,
-            "icon": "NULL"
-        } for ameList in hotel_info.get("masterHotelAmenities", []) or []
-    ]
-    
-    specific_data = {
-        "hotel_id": hotel_data.get("SystemId", "NULL"),
-        "name": hotel_info.get("name", hotel_data.get("HotelName", "NULL")),
-        "name_local": hotel_info.get("name", hotel_data.get("HotelName", "NULL")),
-        "hotel_formerly_name": "NULL",
-        "destination_code": hotel_data.get("GiDestinationId", "NULL"),
-        "country_code":  hotel_data.get("CountryCode", "NULL"),
-        "brand_text": "NULL",
-        "property_type": "NULL",
-        "star_rating": hotel_info.get("rating", hotel_data.get("Rating", "NULL")),
-        "chain": "NULL",
-        "brand": "NULL",
-        "logo": "NULL",
-        "primary_photo": hotel_info.get("imageUrl", hotel_data.get("ImageUrl", "NULL")),
-        "review_rating": {
-            "source": "NULL",
-            "number_of_reviews": "NULL",
-            "rating_average": hotel_info.get("tripAdvisorRating", "NULL"),
-            "popularity_score": "NULL",
-        },
-        "policies": {
-            "checkin": {
-                "begin_time": "NULL",
-                "end_time": "NULL",
-                "instructions": "NULL",
-                "min_age": "NULL",
-            },
-            "checkout": {
-                "time": "NULL",
-            },
-            "fees": {
-                "optional": "NULL",
-            },
-            "know_before_you_go": "NULL",
-            "pets": "NULL",
-            "remark": "NULL",
-            "child_and_extra_bed_policy": {
-                "infant_age": "NULL",
-                "children_age_from": "NULL",
-                "children_age_to": "NULL",
-                "children_stay_free": "NULL",
-                "min_guest_age": "NULL"
-            },
-            "nationality_restrictions": "NULL",
-        },
-        "address": {
-            "latitude": hotel_info.get("geocode", {}).get("lat", hotel_data.get("Latitude", "NULL")),
-            "longitude": hotel_info.get("geocode", {}).get("lon", hotel_data.get("Longitude", "NULL")),
-            "address_line_1": hotel_data.get("Address1", "NULL"),
-            "address_line_2": hotel_data.get("Address2", "NULL"),
-            "city": hotel_data.get("City", "NULL"),
-            "state": hotel_info.get("address", {}).get("stateName", "NULL"),
-            "country": hotel_data.get("CountryName", "NULL"),
-            "country_code": hotel_data.get("CountryCode", "NULL"),
-            "postal_code": hotel_data.get("ZipCode", "NULL"),
-            "full_address": f"{hotel_data.get('Address1', 'NULL')}, {hotel_data.get('Address2', 'NULL')}",
-            "google_map_site_link": "NULL",
-            "local_lang": {
-                "latitude": hotel_info.get("geocode", {}).get("lat", hotel_data.get("Latitude", "NULL")),
-                "longitude": hotel_info.get("geocode", {}).get("lon", hotel_data.get("Longitude", "NULL")),
-                "address_line_1": hotel_data.get("Address1", "NULL"),
-                "address_line_2": hotel_data.get("Address2", "NULL"),
-                "city": hotel_data.get("City", "NULL"),
-                "state": hotel_info.get("address", {}).get("stateName", "NULL"),
-                "country": hotel_data.get("CountryName", "NULL"),
-                "country_code": hotel_data.get("CountryCode", "NULL"),
-                "postal_code": hotel_data.get("ZipCode", "NULL"),
-                "full_address": f"{hotel_data.get('Address1', 'NULL')}, {hotel_data.get('Address2', 'NULL')}", 
-                "google_map_site_link": "NULL",
-            },
-            "mapping": {
-                "continent_id": "NULL",
-                "country_id": hotel_data.get("CountryCode", "NULL"),
-                "province_id": "NULL",
-                "state_id": "NULL",
-                "city_id": "NULL",
-                "area_id": "NULL"
-            }
-        },
-        "contacts": {
-            "phone_numbers": [hotel_info.get("contact", {}).get("phoneNo", "NULL")],
-            "fax": hotel_info.get("contact", {}).get("faxNo", "NULL"),
-            "email_address": "NULL",
-            "website": hotel_info.get("contact", {}).get("website", hotel_data.get("Website", "NULL"))
-        },
-        "descriptions": [
-            {
-                "title": "NULL",
-                "text": "NULL"
-            }
-        ],
-        "room_type": {
-            "room_id": "NULL",
-            "title": "NULL",
-            "title_lang": "NULL",
-            "room_pic": "NULL",
-            "description": "NULL",
-            "max_allowed": {
-            "total": "NULL",
-            "adults": "NULL",
-            "children": "NULL",
-            "infant": "n/a"
-            },
-            "no_of_room": "n/a",
-            "room_size": "NULL",
-            "bed_type": [
-                    {
-                    "description": "NULL",
-                    "configuration": [
-                        {
-                        "quantity": "NULL",
-                        "size": "NULL",
-                        "type": "NULL"
-                        }
-                    ],
-                    "max_extrabeds": "n/a"
-                    }
-                ],
-            "shared_bathroom": "n/a"
-            },
-        "spoken_languages": {
-            "type": "NULL",
-            "title": "NULL",
-            "icon": "NULL"
-            },
-        "amenities": hotel_room_amenities,
-        "facilities": hotel_amenities,
-        "hotel_photo": hotel_photo_data, 
-        
-        "point_of_interests": {
-            "code": "NULL",
-            "name": "NULL"
-            },
-        "nearest_airports": {
-            "code": "NULL",
-            "name": "NULL"
-            },
-        
-        "train_stations": {
-            "code": "NULL",
-            "name": "NULL"
-            },
-        
-        "connected_locations": [],
-        "stadiums": []
-    }
-
-
-    return specific_data
+    if payload_store is not None:
+        payload_store.fill_hotel_info([hotel_data])
+    return build_specific_data(hotel_data)
+
+
+def build_specific_data(hotel_data):
+    """Build the specific_data dict for one hotel_info_all row given as a HotelRecord (or dict)."""
+    with metrics.timer("transform"):
+        # Extract nested JSON from the 'HotelInfo' field
+        hotel_info = fast_json.loads(hotel_data.get("HotelInfo") or "{}")
+        return GI_CONVERT_MAPPING(row=hotel_data, info=hotel_info)
 
 
 
@@ -237,19 +78,25 @@ def save_json_files_follow_systemId(folder_path):
 
     systemid_list = get_system_id_list(table, column, engine)
 
+    progress = ProgressLog(logger, "SystemIds", total=len(systemid_list))
     for systemid in systemid_list:
         file_name = f"{systemid}.json"
         file_path = os.path.join(folder_path, file_name)
 
         data_dict = get_specifiq_data_from_system_id(table, systemid, engine)
 
-        with open(file_path, "w") as json_file:
-            json.dump(data_dict, json_file, indent=4)
+        with metrics.timer("file_write"):
+            fast_json.dump_to_file(data_dict, file_path, indent=4)
             
-        print(f"Save {file_name} in {folder_path}")
+        progress.record(systemid, "saved")
+    progress.close()
 
 
 
-folder_path = './gill_hotel_json_files'
+if __name__ == "__main__":
+    folder_path = './gill_hotel_json_files'
 
-save_json_files_follow_systemId(folder_path)
\ No newline at end of file
+    setup_logging()
+    start_metrics_reporter()
+    save_json_files_follow_systemId(folder_path)
+    stop_metrics_reporter()
@@ -0,0 +1,248 @@
+import os
+import time
+import asyncio
+import logging
+import argparse
+import aiohttp
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from json_convert_agoda_using_agoda_api_key import (
+    AGODA_FEED_URL,
+    engine,
+    gtrs_api_key,
+    get_vervotech_id,
+    parse_agoda_hotel_feed,
+    save_json_to_folder,
+    build_agoda_specific_data,
+)
+from agoda_stream_parser import AgodaFeedStreamParser
+from response_cache import get_response_cache
+from stage_metrics import metrics, start_metrics_reporter, stop_metrics_reporter
+from log_setup import ProgressLog, setup_logging
+from jsonl_archive import add_archive_arguments, open_archive
+
+
+logger = logging.getLogger(__name__)
+
+
+class HostRateLimiter:
+    """Space out request starts so each host receives at most `rate` requests per second."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next_slot = {}
+        self._lock = asyncio.Lock()
+
+    async def wait(self, url):
+        if not self.interval:
+            return
+        host = urlsplit(url).netloc
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class OrderedReporter:
+    """Report results in input order even though hotels finish out of order.
+
+    Each result is logged at DEBUG; at INFO only periodic ProgressLog totals appear.
+    """
+
+    def __init__(self, total=None):
+        self.total = total
+        self.counts = {}
+        self.progress = ProgressLog(logger, "Agoda hotels", total=total)
+        self._pending = {}
+        self._next_index = 0
+
+    def complete(self, index, hotel_id, status):
+        self.counts[status] = self.counts.get(status, 0) + 1
+        self._pending[index] = (hotel_id, status)
+        while self._next_index in self._pending:
+            done_id, done_status = self._pending.pop(self._next_index)
+            self._next_index += 1
+            self.progress.record(done_id, done_status)
+
+
+async def fetch_agoda_feed(session, limiter, api_key, hotel_id):
+    """Download the raw Hotel_feed_full XML for one hotel, or None on a non-200 response.
+
+    A configured response cache is consulted first; stale entries are revalidated
+    with If-None-Match / If-Modified-Since. Cache file I/O runs in a thread so it
+    does not stall the event loop.
+    """
+    cache = get_response_cache()
+    cached = await asyncio.to_thread(cache.get, "agoda_feed", hotel_id, allow_stale=True) if cache else None
+    if cached is not None and cached.fresh:
+        metrics.count("cache_hits")
+        return cached.body
+
+    url = AGODA_FEED_URL.format(api_key=api_key, hotel_id=hotel_id)
+    headers = cached.conditional_headers() if cached is not None else {}
+    await limiter.wait(url)
+    with metrics.timer("fetch"):
+        async with session.get(url, headers=headers) as response:
+            if response.status == 304 and cached is not None:
+                await asyncio.to_thread(cache.touch, "agoda_feed", hotel_id)
+                return cached.body
+            if response.status != 200:
+                logger.warning("Error fetching data from API for hotel %s: Status code %s", hotel_id, response.status)
+                return None
+            xml_data = await response.read()
+        if cache:
+            await asyncio.to_thread(cache.put, "agoda_feed", hotel_id, xml_data,
+                                    etag=response.headers.get("ETag"),
+                                    last_modified=response.headers.get("Last-Modified"))
+        return xml_data
+
+
+async def fetch_agoda_feed_streaming(session, limiter, api_key, hotel_id, chunk_size=64 * 1024):
+    """Download and incrementally parse one feed; returns the Hotel_feed_full dict, None or False."""
+    cache = get_response_cache()
+    if cache:
+        # The cache needs the whole body anyway, so parse the (cached or downloaded) bytes at once.
+        xml_data = await fetch_agoda_feed(session, limiter, api_key, hotel_id)
+        if xml_data is None:
+            return False
+        with metrics.timer("parse"):
+            parser = AgodaFeedStreamParser(typed=True)
+            parser.feed(xml_data)
+            return parser.close()
+
+    url = AGODA_FEED_URL.format(api_key=api_key, hotel_id=hotel_id)
+    await limiter.wait(url)
+    # Parsing is interleaved with the download, so both count as the fetch stage here.
+    with metrics.timer("fetch"):
+        async with session.get(url) as response:
+            if response.status != 200:
+                logger.warning("Error fetching data from API for hotel %s: Status code %s", hotel_id, response.status)
+                return False
+            parser = AgodaFeedStreamParser(typed=True)
+            async for chunk in response.content.iter_chunked(chunk_size):
+                parser.feed(chunk)
+            return parser.close()
+
+
+def build_and_save(hotel_feed_full, hotel_id, folder_name, archive=None):
+    if hotel_feed_full is None:
+        logger.debug("Skipping hotel %s as 'Hotel_feed_full' is not found.", hotel_id)
+        return "skipped"
+    data = build_agoda_specific_data(hotel_feed_full, hotel_id)
+    if data is None:
+        return "skipped"
+    save_json_to_folder(data=data, hotel_id=hotel_id, folder_name=folder_name, archive=archive)
+    return "saved"
+
+
+def convert_and_save(xml_data, hotel_id, folder_name, archive=None):
+    data = parse_agoda_hotel_feed(xml_data, hotel_id)
+    if data is None:
+        return "skipped"
+    save_json_to_folder(data=data, hotel_id=hotel_id, folder_name=folder_name, archive=archive)
+    return "saved"
+
+
+async def convert_agoda_hotels(hotel_ids, api_key, folder_name, concurrency=20, rate_per_host=10.0, timeout=60,
+                               streaming=False, archive=None, trace_configs=None):
+    """Convert Agoda hotels to JSON files with at most `concurrency` requests in flight.
+
+    With `streaming` the XML is parsed incrementally while it downloads instead of
+    being buffered and handed to xmltodict. With a JsonlShardWriter as `archive`,
+    hotels are appended to it instead of written to `folder_name`. `trace_configs`
+    are passed to the aiohttp session, e.g. to time requests in a benchmark.
+
+    Returns a dict counting how many hotels ended in each status.
+    """
+    hotel_ids = list(hotel_ids)
+    reporter = OrderedReporter(total=len(hotel_ids))
+    limiter = HostRateLimiter(rate_per_host)
+    queue = iter(enumerate(hotel_ids))
+
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=concurrency, keepalive_timeout=30)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+
+    async def worker(session):
+        for index, raw_id in queue:
+            try:
+                hotel_id = int(raw_id)
+            except (TypeError, ValueError):
+                reporter.complete(index, raw_id, "invalid id")
+                continue
+
+            try:
+                if streaming:
+                    hotel_feed_full = await fetch_agoda_feed_streaming(session, limiter, api_key, hotel_id)
+                    if hotel_feed_full is False:
+                        status = "fetch failed"
+                    else:
+                        status = await asyncio.to_thread(build_and_save, hotel_feed_full, hotel_id, folder_name, archive)
+                else:
+                    xml_data = await fetch_agoda_feed(session, limiter, api_key, hotel_id)
+                    if xml_data is None:
+                        status = "fetch failed"
+                    else:
+                        status = await asyncio.to_thread(convert_and_save, xml_data, hotel_id, folder_name, archive)
+            except Exception as e:
+                logger.error("Error converting hotel %s: %s", hotel_id, e)
+                status = "error"
+            reporter.complete(index, hotel_id, status)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout,
+                                     trace_configs=trace_configs) as session:
+        await asyncio.gather(*(worker(session) for _ in range(max(1, concurrency))))
+
+    reporter.progress.close()
+    return reporter.counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert Agoda Hotel_feed_full XML to JSON files concurrently.")
+    parser.add_argument("--table", default="vervotech_mapping")
+    parser.add_argument("--provider-family", default="Agoda")
+    parser.add_argument("--folder", default=None, help="Output folder (defaults to the provider family name).")
+    parser.add_argument("--concurrency", type=int, default=20, help="Maximum requests in flight.")
+    parser.add_argument("--rate", type=float, default=10.0, help="Maximum requests per second per host (0 disables).")
+    parser.add_argument("--timeout", type=float, default=60, help="Total timeout per request in seconds.")
+    parser.add_argument("--streaming", action="store_true", help="Parse the XML incrementally while it downloads.")
+    add_archive_arguments(parser)
+    args = parser.parse_args()
+
+    setup_logging()
+    start_time = time.time()
+    logger.info("Start Time: %s", datetime.fromtimestamp(start_time).strftime('%I:%M %p'))
+
+    ids = get_vervotech_id(engine=engine, table=args.table, providerFamily=args.provider_family)
+    folder_name = args.folder or args.provider_family
+    archive = open_archive(args)
+    if archive is None:
+        os.makedirs(folder_name, exist_ok=True)
+    start_metrics_reporter()
+
+    try:
+        counts = asyncio.run(convert_agoda_hotels(
+            ids,
+            api_key=gtrs_api_key,
+            folder_name=folder_name,
+            concurrency=args.concurrency,
+            rate_per_host=args.rate,
+            timeout=args.timeout,
+            streaming=args.streaming,
+            archive=archive,
+        ))
+    finally:
+        if archive is not None:
+            archive.close()
+        stop_metrics_reporter()
+
+    total_time = time.time() - start_time
+    logger.info("Finished %d hotels in %.2f seconds: %s", len(ids), total_time, counts)
+
+
+if __name__ == "__main__":
+    main()
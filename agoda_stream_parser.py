@@ -0,0 +1,161 @@
+import logging
+from xml.etree.ElementTree import XMLPullParser
+
+from json_convert_agoda_using_agoda_api_key import AGODA_FEED_URL, build_agoda_specific_data
+from hotel_records import AGODA_RECORD_TYPES
+from http_transport import get_transport
+
+
+logger = logging.getLogger(__name__)
+
+# Sections of Hotel_feed_full that build_agoda_specific_data reads, mapped to their record tag.
+AGODA_FEED_SECTIONS = {
+    "hotels": "hotel",
+    "addresses": "address",
+    "roomtypes": "roomtype",
+    "facilities": "facility",
+    "pictures": "picture",
+}
+
+
+def element_to_dict(elem):
+    """Convert an element subtree to the same shape xmltodict.parse would produce."""
+    children = list(elem)
+    text = elem.text.strip() if elem.text and elem.text.strip() else None
+
+    if not children and not elem.attrib:
+        return text
+
+    result = {f"@{key}": value for key, value in elem.attrib.items()}
+    for child in children:
+        value = element_to_dict(child)
+        if child.tag in result:
+            if not isinstance(result[child.tag], list):
+                result[child.tag] = [result[child.tag]]
+            result[child.tag].append(value)
+        else:
+            result[child.tag] = value
+    if text is not None:
+        result["#text"] = text
+    return result
+
+
+def element_to_record(elem, record_type):
+    """Decode a record element into `record_type`, skipping child elements it has no field for."""
+    if not len(elem) and not elem.attrib:
+        return element_to_dict(elem)
+
+    fields = record_type.FIELD_SET
+    nested = record_type.NESTED
+    values = {}
+    for child in elem:
+        tag = child.tag
+        if tag not in fields:
+            continue
+        if len(child) or child.attrib:
+            value = element_to_record(child, nested[tag]) if tag in nested else element_to_dict(child)
+        else:
+            text = child.text
+            value = (text.strip() or None) if text else None
+        if tag in values:
+            previous = values[tag]
+            value = previous + [value] if isinstance(previous, list) else [previous, value]
+        values[tag] = value
+
+    record = record_type.__new__(record_type)
+    for name, value in values.items():
+        setattr(record, name, value)
+    return record
+
+
+class AgodaFeedStreamParser:
+    """Incrementally parse Hotel_feed_full XML, keeping only the sections specific_data needs.
+
+    Feed bytes as they arrive with feed(); close() returns a dict shaped like the
+    xmltodict "Hotel_feed_full" node (restricted to AGODA_FEED_SECTIONS), or None
+    when the document is not a Hotel_feed_full feed. With `typed`, records are
+    decoded into the hotel_records types instead of dicts.
+    """
+
+    def __init__(self, typed=False):
+        self.typed = typed
+        self._parser = XMLPullParser(events=("start", "end"))
+        self._root = None
+        self._depth = 0
+        self._section = None
+        self._records = {}
+        self.hotel_feed_full = {}
+
+    def feed(self, chunk):
+        self._parser.feed(chunk)
+        self._drain()
+
+    def close(self):
+        self._parser.close()
+        self._drain()
+        if self._root is None or self._root.tag != "Hotel_feed_full":
+            return None
+        return self.hotel_feed_full
+
+    def _drain(self):
+        for event, elem in self._parser.read_events():
+            if event == "start":
+                self._depth += 1
+                if self._depth == 1:
+                    self._root = elem
+                elif self._depth == 2:
+                    self._section = elem.tag if elem.tag in AGODA_FEED_SECTIONS else None
+                    if self._section is not None:
+                        self._records[self._section] = []
+                continue
+
+            self._depth -= 1
+            if self._depth == 2:
+                # A record (hotel, address, picture, ...) inside a top level section.
+                if self._section is not None and elem.tag == AGODA_FEED_SECTIONS[self._section]:
+                    if self.typed:
+                        record = element_to_record(elem, AGODA_RECORD_TYPES[self._section])
+                    else:
+                        record = element_to_dict(elem)
+                    self._records[self._section].append(record)
+                elem.clear()
+            elif self._depth == 1:
+                if self._section is not None:
+                    self._finish_section(self._section)
+                    self._section = None
+                # Drop the finished section so the document never builds up in memory.
+                self._root.remove(elem)
+
+    def _finish_section(self, section):
+        records = self._records.pop(section)
+        record_tag = AGODA_FEED_SECTIONS[section]
+        if not records:
+            self.hotel_feed_full[section] = None
+        elif len(records) == 1:
+            self.hotel_feed_full[section] = {record_tag: records[0]}
+        else:
+            self.hotel_feed_full[section] = {record_tag: records}
+
+
+def parse_agoda_hotel_feed_stream(chunks, hotel_id, typed=True):
+    """Streaming counterpart of parse_agoda_hotel_feed; `chunks` is any iterable of bytes."""
+    parser = AgodaFeedStreamParser(typed=typed)
+    for chunk in chunks:
+        parser.feed(chunk)
+    hotel_feed_full = parser.close()
+
+    if hotel_feed_full is None:
+        logger.debug("Skipping hotel %s as 'Hotel_feed_full' is not found.", hotel_id)
+        return None
+
+    return build_agoda_specific_data(hotel_feed_full, hotel_id)
+
+
+def get_xml_to_json_data_for_agoda_streaming(api_key, hotel_id, chunk_size=64 * 1024):
+    """Like get_xml_to_json_data_for_agoda, but parses the response while it downloads."""
+    url = AGODA_FEED_URL.format(api_key=api_key, hotel_id=hotel_id)
+    with get_transport().stream("GET", url, chunk_size=chunk_size) as (response, chunks):
+        if response.status_code != 200:
+            logger.warning("Error fetching data from API for hotel %s: Status code %s", hotel_id, response.status_code)
+            return None
+        return parse_agoda_hotel_feed_stream(chunks, hotel_id)
@@ -0,0 +1,183 @@
+import time
+import asyncio
+import logging
+import argparse
+import aiohttp
+from datetime import datetime
+
+from single_hotel_info_input_data_in_db_json_formet import engine, only_column_info, payload_store
+from gi_client import gi_post_async
+from response_cache import get_response_cache
+from hotel_info_writer import BufferedHotelInfoWriter
+from checkpoint_journal import CheckpointJournal
+from stage_metrics import metrics, start_metrics_reporter, stop_metrics_reporter
+from log_setup import ProgressLog, setup_logging
+import fast_json
+
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+async def fetch_hotel_info_by_systemId_async(session, systemId):
+    """Async counterpart of fetch_hotel_info_by_systemId; returns the hotelInformation dict or None."""
+    cache = get_response_cache()
+    try:
+        # Cache reads and writes are file I/O; keep them off the event loop.
+        cached = await asyncio.to_thread(cache.get, "gi_hotel_info", systemId) if cache else None
+        if cached is not None:
+            metrics.count("cache_hits")
+            status, response_data = 200, fast_json.loads(cached.body)
+        else:
+            with metrics.timer("fetch"):
+                status, response_data = await gi_post_async(session, "/Hotel/HotelInfo", {"hotelCode": str(systemId)})
+            if cache and status == 200 and response_data.get("isSuccess"):
+                body = fast_json.dumps(response_data, ensure_ascii=False)
+                await asyncio.to_thread(cache.put, "gi_hotel_info", systemId, body)
+        if status == 200:
+            if response_data.get("isSuccess"):
+                hotel_info = response_data.get("hotelInformation")
+                if hotel_info:
+                    return hotel_info
+                logger.debug("No hotel information found for systemID: %s", systemId)
+            else:
+                logger.debug("API response not successful for systemID: %s", systemId)
+        else:
+            logger.warning("Failed to fetch data for systemID %s: %s", systemId, status)
+    except Exception as e:
+        logger.warning("Error fetching data for system ID %s: %s", systemId, e)
+
+    return None
+
+
+async def produce_ids(system_ids, id_queue, fetch_workers):
+    for systemId in system_ids:
+        await id_queue.put(systemId)
+    for _ in range(fetch_workers):
+        await id_queue.put(_DONE)
+
+
+async def fetch_stage(session, id_queue, result_queue):
+    while True:
+        systemId = await id_queue.get()
+        if systemId is _DONE:
+            await result_queue.put(_DONE)
+            return
+        metrics.gauge("id_queue", id_queue.qsize())
+        hotel_info = await fetch_hotel_info_by_systemId_async(session, systemId)
+        # Blocks when the writer falls behind, which in turn stops this fetcher.
+        await result_queue.put((systemId, hotel_info))
+
+
+async def write_stage(result_queue, writer, fetch_workers, stats, progress):
+    finished_fetchers = 0
+    while finished_fetchers < fetch_workers:
+        try:
+            item = await asyncio.wait_for(result_queue.get(), timeout=writer.flush_interval)
+        except asyncio.TimeoutError:
+            await asyncio.to_thread(writer.maybe_flush)
+            continue
+
+        if item is _DONE:
+            finished_fetchers += 1
+            continue
+
+        metrics.gauge("result_queue", result_queue.qsize())
+        systemId, hotel_info = item
+        if hotel_info:
+            status_update = "Done Json"
+            stats["found"] += 1
+        else:
+            status_update = "Not found json"
+            hotel_info = {}
+            stats["not_found"] += 1
+        # The database work (including flushes) runs in a thread so fetching continues meanwhile.
+        await asyncio.to_thread(writer.add, systemId, hotel_info, status_update)
+        progress.record(systemId, status_update)
+
+    await asyncio.to_thread(writer.flush)
+
+
+async def run_hotel_info_pipeline(system_ids, concurrency=20, queue_size=200, flush_size=200, flush_interval=5.0,
+                                  timeout=60, journal=None):
+    """Fetch HotelInfo for `system_ids` and write it back, overlapping network and database work.
+
+    `concurrency` caps requests in flight; the request rate itself is set by the
+    shared adaptive limiter in gi_client. The fetchers share one aiohttp session and feed a single writer stage
+    through bounded queues, so a slow database applies backpressure to the fetchers
+    instead of letting results pile up in memory. With a CheckpointJournal, ids it
+    already holds are skipped and committed "Done Json" ids are recorded in it;
+    "Not found json" ids are not, so they are retried like the baseline did.
+    """
+    id_queue = asyncio.Queue(maxsize=queue_size)
+    result_queue = asyncio.Queue(maxsize=queue_size)
+
+    def record_done(pairs):
+        # Only found hotels are final; "Not found json" may be a transient GI failure and is retried next run.
+        journal.record_many((systemId, status) for systemId, status in pairs if status == "Done Json")
+
+    on_flush = record_done if journal is not None else None
+    writer = BufferedHotelInfoWriter(engine, batch_size=flush_size, flush_interval=flush_interval, on_flush=on_flush,
+                                     payload_store=payload_store)
+    stats = {"found": 0, "not_found": 0}
+    if journal is not None:
+        system_ids = list(journal.pending(system_ids))
+    progress = ProgressLog(logger, "SystemIds", total=len(system_ids) if hasattr(system_ids, "__len__") else None)
+
+    connector = aiohttp.TCPConnector(limit=concurrency, keepalive_timeout=30)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout) as session:
+        await asyncio.gather(
+            produce_ids(system_ids, id_queue, concurrency),
+            *(fetch_stage(session, id_queue, result_queue) for _ in range(concurrency)),
+            write_stage(result_queue, writer, concurrency, stats, progress),
+        )
+    progress.close()
+
+    stats["written"] = writer.written
+    stats["write_failed"] = writer.failed
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch GI HotelInfo concurrently and write it to hotel_info_all.")
+    parser.add_argument("--concurrency", type=int, default=20, help="HotelInfo requests in flight.")
+    parser.add_argument("--queue-size", type=int, default=200, help="Capacity of each stage queue.")
+    parser.add_argument("--flush-size", type=int, default=200, help="HotelInfo updates per database transaction.")
+    parser.add_argument("--flush-interval", type=float, default=5.0, help="Seconds before a partial batch is flushed.")
+    parser.add_argument("--job", default=None,
+                        help="Checkpoint journal name; when set, SystemIds it records as done are skipped.")
+    parser.add_argument("--checkpoint-dir", default="checkpoints")
+    args = parser.parse_args()
+
+    setup_logging()
+    start_time = time.time()
+    logger.info("Start Time: %s", datetime.fromtimestamp(start_time).strftime('%I:%M %p'))
+
+    if payload_store is not None:
+        payload_store.ensure_schema()
+    system_ids = only_column_info(table='hotel_info_all', column='SystemId', engine=engine)
+    journal = CheckpointJournal(args.job, directory=args.checkpoint_dir) if args.job else None
+    start_metrics_reporter()
+    try:
+        stats = asyncio.run(run_hotel_info_pipeline(
+            system_ids,
+            concurrency=args.concurrency,
+            queue_size=args.queue_size,
+            flush_size=args.flush_size,
+            flush_interval=args.flush_interval,
+            journal=journal,
+        ))
+    finally:
+        if journal is not None:
+            journal.close()
+        stop_metrics_reporter()
+
+    total_time = time.time() - start_time
+    rate = len(system_ids) / total_time if total_time > 0 else 0.0
+    logger.info("Finished %d SystemIds in %.2f seconds (%.1f/sec): %s", len(system_ids), total_time, rate, stats)
+
+
+if __name__ == "__main__":
+    main()
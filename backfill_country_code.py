@@ -0,0 +1,111 @@
+from sqlalchemy import create_engine, text
+from dotenv import load_dotenv
+import os
+import time
+import logging
+import argparse
+
+from hotel_db import iter_keyset_batches
+from log_setup import setup_logging
+
+load_dotenv()
+
+db_host = os.getenv('DB_HOST')
+db_user = os.getenv('DB_USER')
+db_pass = os.getenv('DB_PASSWORD')
+db_name = os.getenv('DB_NAME')
+
+
+DATABASE_URL = f"mysql+pymysql://{db_user}:{db_pass}@{db_host}/{db_name}"
+
+hotel_table = 'hotel_info_all'
+city_table = 'hotels_info_with_gidestination_code'
+
+logger = logging.getLogger(__name__)
+
+
+# One statement per SystemId range. Rows that already hold the right code are
+# skipped, so re-running the job (or resuming it) only touches stale rows.
+UPDATE_JOIN = {
+    "mysql": """
+        UPDATE {hotel_table} AS h
+        JOIN {city_table} AS g ON h.GiDestinationId = g.GiDestinationId
+        SET h.CountryCode = g.CountryCode
+        WHERE h.SystemId BETWEEN :first_id AND :last_id
+          AND g.CountryCode IS NOT NULL
+          AND (h.CountryCode IS NULL OR h.CountryCode <> g.CountryCode){country_filter}
+    """,
+    # UPDATE ... FROM, for trying the job against a local SQLite copy.
+    "sqlite": """
+        UPDATE {hotel_table} AS h
+        SET CountryCode = g.CountryCode
+        FROM {city_table} AS g
+        WHERE h.GiDestinationId = g.GiDestinationId
+          AND h.SystemId BETWEEN :first_id AND :last_id
+          AND g.CountryCode IS NOT NULL
+          AND (h.CountryCode IS NULL OR h.CountryCode <> g.CountryCode){country_filter}
+    """,
+}
+
+
+def build_update_statement(engine, country_code=None):
+    """The UPDATE ... JOIN for one SystemId range, in the engine's dialect."""
+    country_filter = "\n          AND g.CountryCode = :country_code" if country_code else ""
+    template = UPDATE_JOIN[engine.dialect.name]
+    return text(template.format(hotel_table=hotel_table, city_table=city_table, country_filter=country_filter))
+
+
+def backfill_country_code(engine, chunk_size=2000, country_code=None, start_after=None, pause=0.0):
+    """Copy CountryCode from hotels_info_with_gidestination_code into hotel_info_all.
+
+    hotel_info_all is walked in SystemId order with the keyset scanner and every
+    chunk of `chunk_size` ids is updated by one set-based statement in its own
+    short transaction, so locks are held for one chunk only. `pause` seconds are
+    slept between chunks to leave room for other writers. Progress lines carry the
+    last SystemId done; pass it back as `start_after` to resume. Returns
+    (rows scanned, rows updated).
+    """
+    statement = build_update_statement(engine, country_code)
+    scanned = updated = 0
+    started = time.time()
+
+    for batch in iter_keyset_batches(engine, hotel_table, ["SystemId"], key="SystemId",
+                                     batch_size=chunk_size, start_after=start_after):
+        first_id, last_id = batch[0][0], batch[-1][0]
+        params = {"first_id": first_id, "last_id": last_id}
+        if country_code:
+            params["country_code"] = country_code
+        with engine.begin() as connection:
+            result = connection.execute(statement, params)
+        scanned += len(batch)
+        updated += max(result.rowcount, 0)
+
+        elapsed = time.time() - started
+        logger.info("Scanned %d rows, updated %d (%.0f rows/s), last SystemId: %s",
+                    scanned, updated, scanned / elapsed, last_id)
+        if pause:
+            time.sleep(pause)
+
+    logger.info("CountryCode backfill finished: %d of %d rows updated in %.1f s.",
+                updated, scanned, time.time() - started)
+    return scanned, updated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Backfill hotel_info_all.CountryCode from hotels_info_with_gidestination_code in chunks.")
+    parser.add_argument("--chunk-size", type=int, default=2000,
+                        help="SystemIds per UPDATE statement and transaction.")
+    parser.add_argument("--country-code", default=None,
+                        help="Only propagate this CountryCode (e.g. RU); all codes by default.")
+    parser.add_argument("--start-after", default=None,
+                        help="Resume after this SystemId (the last one a previous run printed).")
+    parser.add_argument("--pause", type=float, default=0.0,
+                        help="Seconds to sleep between chunks.")
+    parser.add_argument("--database-url", default=DATABASE_URL,
+                        help="Defaults to the DB_* settings from .env.")
+    args = parser.parse_args()
+
+    setup_logging()
+    backfill_country_code(create_engine(args.database_url), chunk_size=args.chunk_size,
+                          country_code=args.country_code, start_after=args.start_after, pause=args.pause)
@@ -0,0 +1,139 @@
+import json
+import time
+import argparse
+import tracemalloc
+from xml.sax.saxutils import escape
+
+from json_convert_agoda_using_agoda_api_key import parse_agoda_hotel_feed
+from agoda_stream_parser import AgodaFeedStreamParser, parse_agoda_hotel_feed_stream
+
+
+def build_sample_feed(sample_json, scale=1):
+    """Rebuild a Hotel_feed_full XML document from an exported hotel JSON file.
+
+    `scale` multiplies the room types, facilities and pictures so larger hotels can be
+    simulated. A few sections specific_data never reads are added as well, as the real
+    feed carries them.
+    """
+    with open(sample_json) as f:
+        hotel = json.load(f)
+
+    def tag(name, value):
+        if value is None or value == "NULL":
+            return f"<{name}/>"
+        return f"<{name}>{escape(str(value))}</{name}>"
+
+    def address_xml(address):
+        fields = ["address_line_1", "address_line_2", "city", "state", "country", "postal_code"]
+        return "<address>" + "".join(tag(field, address.get(field)) for field in fields) + "</address>"
+
+    policy = hotel["policies"]["child_and_extra_bed_policy"]
+    parts = ["<Hotel_feed_full><hotels><hotel>"]
+    parts.append(tag("hotel_id", hotel["hotel_id"]))
+    parts.append(tag("hotel_name", hotel["name"]))
+    parts.append(tag("translated_name", hotel["name_local"]))
+    parts.append(tag("hotel_formerly_name", hotel["hotel_formerly_name"]))
+    parts.append(tag("accommodation_type", hotel["property_type"]))
+    parts.append(tag("star_rating", hotel["star_rating"]))
+    parts.append(tag("number_of_reviews", hotel["review_rating"]["number_of_reviews"]))
+    parts.append(tag("rating_average", hotel["review_rating"]["rating_average"]))
+    parts.append(tag("popularity_score", hotel["review_rating"]["popularity_score"]))
+    parts.append("<child_and_extra_bed_policy>" + "".join(tag(k, v) for k, v in policy.items()) + "</child_and_extra_bed_policy>")
+    parts.append(tag("latitude", hotel["address"]["latitude"]))
+    parts.append(tag("longitude", hotel["address"]["longitude"]))
+    parts.append("</hotel></hotels>")
+
+    parts.append("<addresses>" + address_xml(hotel["address"]) + address_xml(hotel["address"]["local_lang"]) + "</addresses>")
+
+    parts.append("<roomtypes>")
+    for i in range(scale):
+        for room in hotel["room_type"]:
+            parts.append("<roomtype>")
+            parts.append(tag("hotel_room_type_id", f"{room['room_id']}{i}"))
+            parts.append(tag("standard_caption", room["title"]))
+            parts.append(tag("hotel_room_type_picture", room["room_pic"]))
+            parts.append(tag("max_occupancy_per_room", room["max_allowed"]["total"]))
+            parts.append(tag("max_infant_in_room", room["max_allowed"]["infant"]))
+            parts.append(tag("no_of_room", room["no_of_room"]))
+            parts.append(tag("size_of_room", room["room_size"]))
+            parts.append(tag("bed_type", room["bed_type"][0]["description"]))
+            parts.append(tag("max_extrabeds", room["bed_type"][0]["max_extrabeds"]))
+            parts.append(tag("shared_bathroom", room["shared_bathroom"]))
+            parts.append("</roomtype>")
+    parts.append("</roomtypes>")
+
+    parts.append("<facilities>")
+    for _ in range(scale):
+        for facility in hotel["facilities"]:
+            parts.append("<facility>" + tag("property_name", facility["type"])
+                         + tag("property_group_description", facility["title"])
+                         + tag("property_translated_name", facility["icon"]) + "</facility>")
+    parts.append("</facilities>")
+
+    parts.append("<pictures>")
+    for i in range(scale):
+        for photo in hotel["hotel_photo"]:
+            parts.append("<picture>" + tag("picture_id", f"{photo['picture_id']}{i}")
+                         + tag("caption", photo["title"]) + tag("URL", photo["url"]) + "</picture>")
+    parts.append("</pictures>")
+
+    # Sections the feed carries but specific_data never reads.
+    parts.append("<reviews>")
+    for i in range(20 * scale):
+        parts.append(f"<review><review_id>{i}</review_id><comment>{'Lovely stay. ' * 20}</comment></review>")
+    parts.append("</reviews>")
+
+    parts.append("</Hotel_feed_full>")
+    return "".join(parts).encode("utf-8")
+
+
+def measure(label, func, repeat):
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<10} {elapsed / repeat * 1000:8.2f} ms/hotel   peak {peak / 1024:8.1f} KiB")
+    return result
+
+
+def retained_size(chunks, typed):
+    """Memory still allocated by a parsed Hotel_feed_full, e.g. while a batch of them is held."""
+    tracemalloc.start()
+    parser = AgodaFeedStreamParser(typed=typed)
+    for chunk in chunks:
+        parser.feed(chunk)
+    before, _ = tracemalloc.get_traced_memory()
+    hotel_feed_full = parser.close()
+    del parser
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size if hotel_feed_full is not None else before
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the xmltodict and streaming Agoda feed parsers.")
+    parser.add_argument("--sample", default="10000072.json", help="Exported hotel JSON used to build the feed.")
+    parser.add_argument("--scale", type=int, default=1, help="Multiply room types, facilities and pictures.")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--chunk-size", type=int, default=16 * 1024)
+    args = parser.parse_args()
+
+    xml_data = build_sample_feed(args.sample, scale=args.scale)
+    chunks = [xml_data[i:i + args.chunk_size] for i in range(0, len(xml_data), args.chunk_size)]
+    print(f"Feed size: {len(xml_data) / 1024:.1f} KiB in {len(chunks)} chunks, repeat={args.repeat}")
+
+    expected = measure("xmltodict", lambda: parse_agoda_hotel_feed(xml_data, "bench"), args.repeat)
+    streamed = measure("streaming", lambda: parse_agoda_hotel_feed_stream(chunks, "bench", typed=False), args.repeat)
+    typed = measure("typed", lambda: parse_agoda_hotel_feed_stream(chunks, "bench", typed=True), args.repeat)
+
+    print("Outputs identical:", expected == streamed == typed)
+
+    for label, typed_records in (("dicts", False), ("records", True)):
+        print(f"Parsed feed held as {label:<8} {retained_size(chunks, typed_records) / 1024:8.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
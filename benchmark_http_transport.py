@@ -0,0 +1,144 @@
+import os
+import ssl
+import gzip
+import time
+import argparse
+import tempfile
+import threading
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from http_transport import HttpTransport
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Answers every request with the sample HotelInfo body, gzip-compressed when the client accepts it."""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, kept-alive connections stall on delayed ACKs.
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def _respond(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        body = self.server.body
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = self.server.gzip_body
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        with self.server.lock:
+            self.server.bytes_sent += len(body)
+
+    do_GET = _respond
+    do_POST = _respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+def self_signed_context(directory):
+    """Server SSL context with a throwaway localhost certificate; returns (context, cert path)."""
+    cert, key = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", "/CN=localhost",
+                    "-addext", "subjectAltName=DNS:localhost", "-keyout", key, "-out", cert],
+                   check=True, capture_output=True)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    return context, cert
+
+
+def start_server(body, tls_context=None):
+    server = ThreadingHTTPServer(("localhost", 0), StandInHandler)
+    server.daemon_threads = True
+    server.body = body
+    server.gzip_body = gzip.compress(body)
+    server.lock = threading.Lock()
+    server.connections = 0
+    server.bytes_sent = 0
+    if tls_context is not None:
+        server.socket = tls_context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_case(label, server, post, requests_count, threads):
+    server.connections = server.bytes_sent = 0
+    per_thread = requests_count // threads
+
+    def worker():
+        for _ in range(per_thread):
+            response = post()
+            assert response.status_code == 200 and response.content == server.body
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    total = per_thread * threads
+    print(f"{label:<28} {total / elapsed:8.0f} req/s   {elapsed / total * 1000:6.2f} ms/req   "
+          f"{server.connections:5d} connections   {server.bytes_sent / total / 1024:6.1f} KiB/response")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-call requests.post with the pooled http_transport "
+                                                 "against a local stand-in server.")
+    parser.add_argument("--sample", default="10000072.json", help="Response body served for every request.")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--tls", action="store_true", help="Serve HTTPS with a self-signed certificate (needs openssl).")
+    args = parser.parse_args()
+
+    with open(args.sample, "rb") as f:
+        body = f.read()
+
+    with tempfile.TemporaryDirectory() as directory:
+        tls_context = None
+        if args.tls:
+            tls_context, cert = self_signed_context(directory)
+            # Picked up by requests and httpx alike.
+            os.environ["REQUESTS_CA_BUNDLE"] = os.environ["SSL_CERT_FILE"] = cert
+        server = start_server(body, tls_context)
+        url = f"{'https' if args.tls else 'http'}://localhost:{server.server_address[1]}/api/Hotel/HotelInfo"
+        payload = b'{"hotelCode": "10000072"}'
+        print(f"{url}, body {len(body) / 1024:.1f} KiB, {args.requests} requests on {args.threads} threads")
+
+        run_case("requests.post, no gzip", server,
+                 lambda: requests.post(url, data=payload, headers={"Accept-Encoding": "identity"}),
+                 args.requests, args.threads)
+        run_case("requests.post", server, lambda: requests.post(url, data=payload),
+                 args.requests, args.threads)
+
+        transport = HttpTransport()
+        run_case("http_transport (requests)", server, lambda: transport.post(url, data=payload),
+                 args.requests, args.threads)
+        transport.close()
+
+        transport = HttpTransport(http2=True)
+        if transport.http2:
+            # The stdlib stand-in speaks HTTP/1.1 only, so this measures the httpx client's pooling.
+            run_case("http_transport (httpx)", server, lambda: transport.post(url, data=payload),
+                     args.requests, args.threads)
+            transport.close()
+        else:
+            print("httpx with h2 is not installed; skipping the HTTP/2 client.")
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
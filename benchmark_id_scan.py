@@ -0,0 +1,101 @@
+import time
+import argparse
+import tracemalloc
+from sqlalchemy import create_engine, text
+
+from hotel_db import fetch_column, iter_column, iter_keyset_batches
+
+
+def populate(engine, table, rows):
+    """Create `table` with `rows` SystemIds when it does not hold that many yet (for the SQLite default)."""
+    with engine.begin() as connection:
+        connection.execute(text(f"CREATE TABLE IF NOT EXISTS {table} (SystemId VARCHAR(32) PRIMARY KEY, "
+                                f"StatusUpdateHotelInfo VARCHAR(32))"))
+        existing = connection.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+        if existing >= rows:
+            return
+        insert = text(f"INSERT INTO {table} (SystemId, StatusUpdateHotelInfo) VALUES (:SystemId, :Status)")
+        for start in range(existing, rows, 50000):
+            connection.execute(insert, [
+                {"SystemId": f"{i:09d}", "Status": "Done Json" if i % 3 else None}
+                for i in range(start, min(start + 50000, rows))
+            ])
+
+
+def pandas_ids(engine, query, column):
+    import pandas as pd
+    return pd.read_sql(query, engine)[column].tolist()
+
+
+def streamed_count(engine, query):
+    return sum(1 for _ in iter_column(engine, query))
+
+
+def offset_page_seconds(engine, table, column, offset, page_size):
+    """Time of one `LIMIT ... OFFSET offset` page, the pattern the sharded scripts used."""
+    start = time.perf_counter()
+    with engine.connect() as connection:
+        connection.execute(text(f"SELECT {column} FROM {table} ORDER BY {column} "
+                                f"LIMIT {page_size} OFFSET {offset}")).all()
+    return time.perf_counter() - start
+
+
+def keyset_page_seconds(engine, table, column, offset, page_size):
+    """Time of the same page read by iter_keyset_batches, resuming after the key before it."""
+    with engine.connect() as connection:
+        start_after = connection.execute(text(f"SELECT {column} FROM {table} ORDER BY {column} "
+                                              f"LIMIT 1 OFFSET {offset - 1}")).scalar() if offset else None
+    start = time.perf_counter()
+    next(iter_keyset_batches(engine, table, [column], key=column, batch_size=page_size, start_after=start_after))
+    return time.perf_counter() - start
+
+
+def measure(label, func):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    count = result if isinstance(result, int) else len(result)
+    print(f"{label:<22} {elapsed:8.2f} s   peak {peak / 1024 / 1024:8.1f} MiB   {count} ids")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare pd.read_sql with hotel_db cursor streaming, and OFFSET with keyset pages.")
+    parser.add_argument("--url", default="sqlite:///id_scan_bench.sqlite",
+                        help="Database URL; the SQLite default is created and filled on first run.")
+    parser.add_argument("--table", default="hotel_info_all")
+    parser.add_argument("--column", default="SystemId")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Rows to create in the SQLite table.")
+    parser.add_argument("--page-size", type=int, default=3000, help="Page size for the OFFSET / keyset comparison.")
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    if args.url.startswith("sqlite"):
+        populate(engine, args.table, args.rows)
+    query = f"SELECT {args.column} FROM {args.table}"
+
+    # The scripts no longer pay this at start-up.
+    start = time.perf_counter()
+    import pandas
+    print(f"{'pandas import':<22} {time.perf_counter() - start:8.2f} s   (version {pandas.__version__})")
+
+    measure("pd.read_sql + tolist", lambda: pandas_ids(engine, query, args.column))
+    measure("hotel_db.fetch_column", lambda: fetch_column(engine, query))
+    measure("hotel_db.iter_column", lambda: streamed_count(engine, query))
+
+    print()
+    rows = fetch_column(engine, f"SELECT COUNT(*) FROM {args.table}")[0]
+    for fraction in (0, 0.25, 0.5, 0.9):
+        offset = int(rows * fraction)
+        offset_ms = offset_page_seconds(engine, args.table, args.column, offset, args.page_size) * 1000
+        keyset_ms = keyset_page_seconds(engine, args.table, args.column, offset, args.page_size) * 1000
+        print(f"page at row {offset:<10} OFFSET {offset_ms:8.1f} ms   keyset {keyset_ms:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
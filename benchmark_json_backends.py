@@ -0,0 +1,47 @@
+import json
+import time
+import argparse
+
+import fast_json
+
+
+def measure(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare stdlib json with fast_json on one hotel record.")
+    parser.add_argument("--sample", default="10000072.json", help="Exported hotel JSON used as the record.")
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    with open(args.sample) as f:
+        record = json.load(f)
+    hotel_info_text = json.dumps(record)
+
+    # (label, what the writers did before, what they do now)
+    cases = [
+        ("loads HotelInfo", lambda: json.loads(hotel_info_text), lambda: fast_json.loads(hotel_info_text)),
+        ("dumps HotelInfo", lambda: json.dumps(record), lambda: fast_json.dumps(record)),
+        ("dumps indent=4", lambda: json.dumps(record, indent=4), lambda: fast_json.dumps(record, indent=4)),
+        ("dumps archive line", lambda: json.dumps(record, separators=(",", ":"), ensure_ascii=False),
+         lambda: fast_json.dumps(record, ensure_ascii=False)),
+    ]
+
+    print(f"Backend: {fast_json.BACKEND}, record {len(hotel_info_text) / 1024:.1f} KiB, repeat={args.repeat}")
+    for label, stdlib_func, fast_func in cases:
+        fast_result, stdlib_result = fast_func(), stdlib_func()
+        if isinstance(stdlib_result, str):
+            fast_result, stdlib_result = json.loads(fast_result), json.loads(stdlib_result)
+        assert fast_result == stdlib_result, f"{label}: outputs differ"
+        stdlib_us = measure(stdlib_func, args.repeat)
+        fast_us = measure(fast_func, args.repeat)
+        print(f"{label:<20} json {stdlib_us:8.1f} us   fast_json {fast_us:8.1f} us   "
+              f"saved {stdlib_us - fast_us:8.1f} us/record ({stdlib_us / fast_us:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import resource
+import tempfile
+import multiprocessing
+from urllib.request import urlopen
+
+from sqlalchemy import create_engine, text
+
+from mock_provider_server import add_mock_arguments, settings_from_args, MockProviderServer
+
+
+PIPELINES = ["gi-async", "gi-sync", "destination", "agoda", "agoda-streaming", "hotels-by-destination"]
+
+# Pipelines whose SQL (INSERT ... ON DUPLICATE KEY UPDATE) only runs on MySQL.
+MYSQL_ONLY = {"hotels-by-destination"}
+
+HOTEL_TABLE_DDL = """
+    CREATE TABLE hotel_info_all (
+        SystemId VARCHAR(64) NOT NULL PRIMARY KEY,
+        HotelName VARCHAR(255), GiDestinationId VARCHAR(64), CountryCode VARCHAR(8), CountryName VARCHAR(128),
+        Rating VARCHAR(16), ImageUrl TEXT, Latitude VARCHAR(32), Longitude VARCHAR(32), Address1 TEXT,
+        Address2 TEXT, City VARCHAR(128), ZipCode VARCHAR(32), Website TEXT, HotelInfo {json_type},
+        CreatedAt DATETIME, StatusUpdateHotelInfo VARCHAR(32), StatusUpdate VARCHAR(32)
+    )
+"""
+
+CITY_TABLE_DDL = """
+    CREATE TABLE hotels_info_with_gidestination_code (
+        CityName VARCHAR(255), GiDestinationId VARCHAR(64), CountryCode VARCHAR(8)
+    )
+"""
+
+
+def benchmark_system_ids(count):
+    return [str(100000 + index) for index in range(count)]
+
+
+def benchmark_city_names(count):
+    """City names with a share of alternative spellings, as the real table has."""
+    names = []
+    for index in range(count):
+        name = f"City {index // 2}"
+        names.append(name.upper() if index % 2 else name)
+    return names
+
+
+def reset_database(database_url, hotels, cities, destinations):
+    """Recreate hotel_info_all and hotels_info_with_gidestination_code with fresh benchmark rows."""
+    engine = create_engine(database_url)
+    json_type = "MEDIUMTEXT" if engine.dialect.name == "mysql" else "TEXT"
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE IF EXISTS hotel_info_payload"))
+        connection.execute(text("DROP TABLE IF EXISTS hotel_info_all"))
+        connection.execute(text("DROP TABLE IF EXISTS hotels_info_with_gidestination_code"))
+        connection.execute(text(HOTEL_TABLE_DDL.format(json_type=json_type)))
+        connection.execute(text(CITY_TABLE_DDL))
+        connection.execute(
+            text("INSERT INTO hotel_info_all (SystemId, HotelName, CreatedAt) VALUES (:SystemId, :HotelName, :CreatedAt)"),
+            [{"SystemId": system_id, "HotelName": f"Hotel {system_id}", "CreatedAt": "2024-01-01 00:00:00"}
+             for system_id in benchmark_system_ids(hotels)])
+        city_names = benchmark_city_names(cities)
+        connection.execute(
+            text("INSERT INTO hotels_info_with_gidestination_code (CityName, GiDestinationId) VALUES (:city, :gi)"),
+            [{"city": city_names[index] if index < cities else None,
+              "gi": str(2000 + index) if index < destinations else None}
+             for index in range(max(cities, destinations))])
+    engine.dispose()
+
+
+def serve_mock(settings, port_queue):
+    server = MockProviderServer(("localhost", 0), settings)
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+def server_stats(base_url):
+    with urlopen(f"{base_url}/stats") as response:
+        return json.loads(response.read())
+
+
+def percentile(values, fraction):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def use_engine(engine, *modules):
+    """Point the pipeline modules at the benchmark database (and a payload store on it, if one is enabled)."""
+    from payload_store import PayloadStore
+    for module in modules:
+        module.engine = engine
+        if hasattr(module, "payload_store"):
+            module.payload_store = PayloadStore.from_env(engine)
+            if module.payload_store is not None:
+                module.payload_store.ensure_schema()
+
+
+def agoda_trace_config(latencies):
+    import aiohttp
+
+    async def on_request_start(session, context, params):
+        context.start = time.monotonic()
+
+    async def on_request_end(session, context, params):
+        latencies.append(time.monotonic() - context.start)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    return trace_config
+
+
+def run_pipeline(name, options, results):
+    """Run one pipeline end to end in this (fresh) process and put its measurements on `results`."""
+    os.environ["GI_API_BASE_URL"] = f"{options['base_url']}/api"
+    os.environ["AGODA_FEED_URL"] = (f"{options['base_url']}/datafeeds/feed/getfeed"
+                                    "?apikey={api_key}&mhotel_id={hotel_id}&feed_id=19")
+    os.environ["GI_INITIAL_RPS"] = os.environ["GI_MAX_RPS"] = str(options["gi_rps"])
+    os.environ["GILL_API_KEY"] = "benchmark"
+    os.environ.pop("RESPONSE_CACHE_DIR", None)
+    if options["verbose"]:
+        from log_setup import setup_logging
+        setup_logging()
+    else:
+        sys.stdout = open(os.devnull, "w")
+        logging.disable(logging.CRITICAL)
+
+    import gi_client
+    latencies = []
+    gi_client.response_observers.append(lambda status, latency: latencies.append(latency))
+    engine = create_engine(options["database_url"])
+    system_ids = benchmark_system_ids(options["hotels"])
+    concurrency = options["concurrency"]
+
+    start = time.perf_counter()
+    if name == "gi-async":
+        import single_hotel_info_input_data_in_db_json_formet as single
+        import async_hotel_info_pipeline
+        use_engine(engine, single, async_hotel_info_pipeline)
+        asyncio.run(async_hotel_info_pipeline.run_hotel_info_pipeline(system_ids, concurrency=concurrency))
+        items = len(system_ids)
+    elif name == "gi-sync":
+        import single_hotel_info_input_data_in_db_json_formet as single
+        use_engine(engine, single)
+        single.update_hotel_info_sequentially(system_ids)
+        items = len(system_ids)
+    elif name == "destination":
+        import get_giDestinationId_using_city_name as destination
+        use_engine(engine, destination)
+        memo_path = os.path.join(options["workdir"], f"destination_memo_{os.getpid()}.tsv")
+        asyncio.run(destination.bulk_update_gi_destination_id(memo_path=memo_path, concurrency=concurrency))
+        items = options["cities"]
+    elif name in ("agoda", "agoda-streaming"):
+        from agoda_async_converter import convert_agoda_hotels
+        folder = os.path.join(options["workdir"], name)
+        asyncio.run(convert_agoda_hotels([int(system_id) for system_id in system_ids], "bench", folder,
+                                         concurrency=concurrency, rate_per_host=0,
+                                         streaming=name == "agoda-streaming",
+                                         trace_configs=[agoda_trace_config(latencies)]))
+        items = len(system_ids)
+    elif name == "hotels-by-destination":
+        import hotelsInfo_byDestinationId_inputData_GetWith_SystemId as by_destination
+        use_engine(engine, by_destination)
+        items = 0
+        for destination_id in by_destination.only_column_info(by_destination.gill_table, "GiDestinationId", engine):
+            if destination_id is None:
+                continue
+            hotels, status_update = by_destination.fetch_hotels_by_destination_id(destination_id)
+            inserted, _ = by_destination.bulk_insert_hotels_into_db(hotels, status_update)
+            items += inserted
+    else:
+        raise ValueError(f"Unknown pipeline {name!r}")
+    elapsed = time.perf_counter() - start
+
+    from stage_metrics import metrics
+    stages, _, _ = metrics.snapshot()
+    results.put({
+        "stages": {stage: (stats.count, stats.seconds) for stage, stats in stages.items()},
+        "items": items,
+        "seconds": elapsed,
+        "requests": len(latencies),
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        # ru_maxrss is in KiB on Linux.
+        "peak_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the ingestion pipelines end to end against mock_provider_server "
+                                                 "and a local database.")
+    parser.add_argument("--pipelines", nargs="+", default=[name for name in PIPELINES if name not in MYSQL_ONLY],
+                        choices=PIPELINES)
+    parser.add_argument("--hotels", type=int, default=1000, help="SystemIds / Agoda hotel ids per run.")
+    parser.add_argument("--cities", type=int, default=500, help="CityName rows for the destination pipeline.")
+    parser.add_argument("--destinations", type=int, default=20, help="GiDestinationIds for hotels-by-destination.")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--gi-rps", type=float, default=1000.0, help="GI_INITIAL_RPS / GI_MAX_RPS for the run.")
+    parser.add_argument("--database-url", default=None,
+                        help="Benchmark database; defaults to a temporary SQLite file.")
+    parser.add_argument("--reset-tables", action="store_true",
+                        help="Required with --database-url: the benchmark drops and recreates hotel_info_all, "
+                             "hotels_info_with_gidestination_code and hotel_info_payload there.")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipelines' own output.")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    if args.database_url and not args.reset_tables:
+        parser.error("--database-url needs --reset-tables; point it at a scratch database only.")
+
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as workdir:
+        database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'benchmark.sqlite')}"
+        port_queue = context.Queue()
+        server = context.Process(target=serve_mock, args=(settings_from_args(args), port_queue), daemon=True)
+        server.start()
+        base_url = f"http://localhost:{port_queue.get(timeout=30)}"
+        options = {
+            "base_url": base_url, "database_url": database_url, "workdir": workdir, "hotels": args.hotels,
+            "cities": args.cities, "concurrency": args.concurrency, "gi_rps": args.gi_rps, "verbose": args.verbose,
+        }
+        print(f"Mock server {base_url} (latency {args.latency_ms} +- {args.jitter_ms} ms, error rate "
+              f"{args.error_rate}, rate limit {args.rate_limit or 'off'}), database {database_url.split('://')[0]}")
+        print(f"{'pipeline':<22} {'items':>7} {'seconds':>8} {'items/s':>9} {'requests':>9} "
+              f"{'p50 ms':>8} {'p99 ms':>8} {'peak RSS':>10}  server responses")
+
+        for name in args.pipelines:
+            if name in MYSQL_ONLY and not database_url.startswith("mysql"):
+                print(f"{name:<22} skipped: needs a MySQL --database-url")
+                continue
+            reset_database(database_url, args.hotels, args.cities, args.destinations)
+            before = server_stats(base_url)
+            results = context.Queue()
+            child = context.Process(target=run_pipeline, args=(name, options, results))
+            child.start()
+            result = results.get()
+            child.join()
+            after = server_stats(base_url)
+            responses = {key: after[key] - before.get(key, 0) for key in after
+                         if key.isdigit() and after[key] != before.get(key, 0)}
+
+            rate = result["items"] / result["seconds"] if result["seconds"] > 0 else 0.0
+            print(f"{name:<22} {result['items']:>7} {result['seconds']:>8.2f} {rate:>9.1f} {result['requests']:>9} "
+                  f"{result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f} {result['peak_rss_mib']:>6.0f} MiB  {responses}")
+            # Summed stage time; concurrent stages can add up to more than the wall clock.
+            stage_times = "  ".join(f"{stage} {count} x {seconds / count * 1000:.1f} ms = {seconds:.2f} s"
+                                    for stage, (count, seconds) in sorted(result["stages"].items()) if count)
+            if stage_times:
+                print(f"{'':<22} {stage_times}")
+
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import os
+import glob
+
+
+class CheckpointJournal:
+    """Append-only record of processed ids for one job shard.
+
+    Each line is "<id>\\t<outcome>". On open, the journal (and optionally the other
+    shards of the same job) is loaded into a set, so a restarted job can skip
+    finished ids with a set lookup instead of asking MySQL or the filesystem.
+    A partially written last line, left behind by a crash, is ignored.
+    """
+
+    def __init__(self, job, shard=0, directory="checkpoints", include_other_shards=True, flush_every=100):
+        os.makedirs(directory, exist_ok=True)
+        self.job = job
+        self.shard = shard
+        self.directory = directory
+        self.path = os.path.join(directory, f"{job}.{shard}.journal")
+        self.flush_every = flush_every
+        self.completed = set()
+        self.outcomes = {}
+
+        if include_other_shards:
+            paths = sorted(glob.glob(os.path.join(directory, f"{glob.escape(job)}.*.journal")))
+        else:
+            paths = [self.path] if os.path.exists(self.path) else []
+        for path in paths:
+            self._load(path)
+
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._unflushed = 0
+
+    def _load(self, path):
+        with open(path, encoding="utf-8") as journal:
+            for line in journal:
+                if not line.endswith("\n"):
+                    break
+                item_id, _, outcome = line.rstrip("\n").partition("\t")
+                if item_id not in self.completed:
+                    self.completed.add(item_id)
+                    self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+    def __contains__(self, item_id):
+        return str(item_id) in self.completed
+
+    def __len__(self):
+        return len(self.completed)
+
+    def is_done(self, item_id):
+        return str(item_id) in self.completed
+
+    def pending(self, item_ids):
+        """Yield the ids from `item_ids` that are not recorded yet."""
+        for item_id in item_ids:
+            if str(item_id) not in self.completed:
+                yield item_id
+
+    def record(self, item_id, outcome="done"):
+        item_id = str(item_id)
+        self._file.write(f"{item_id}\t{outcome}\n")
+        if item_id not in self.completed:
+            self.completed.add(item_id)
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        self._unflushed += 1
+        if self._unflushed >= self.flush_every:
+            self.flush()
+
+    def record_many(self, items):
+        """Record several (id, outcome) pairs."""
+        for item_id, outcome in items:
+            self.record(item_id, outcome)
+
+    def flush(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unflushed = 0
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
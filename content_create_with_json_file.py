@@ -1,10 +1,19 @@
-from sqlalchemy import create_engine, text, inspect
+from sqlalchemy import create_engine
 from dotenv import load_dotenv
-from datetime import datetime
-import pandas as pd
-import json
 import os
 import time
+import logging
+import argparse
+from checkpoint_journal import CheckpointJournal
+from export_fingerprints import FingerprintStore, row_fingerprint
+from hotel_mapping import GI_CONTENT_MAPPING
+from hotel_records import HotelRecord
+from hotel_db import fetch_distinct_column, fetch_one, iter_keyset_batches
+from payload_store import PayloadStore
+from jsonl_archive import add_archive_arguments, open_archive
+from stage_metrics import metrics, start_metrics_reporter, stop_metrics_reporter
+from log_setup import ProgressLog, setup_logging
+import fast_json
 
 load_dotenv()
 
@@ -17,257 +26,72 @@ db_name = os.getenv('DB_NAME')
 DATABASE_URL = f"mysql+pymysql://{db_user}:{db_pass}@{db_host}/{db_name}"
 engine = create_engine(DATABASE_URL)
 
+# Side table holding HotelInfo, when HOTEL_INFO_PAYLOAD_STORE is set.
+payload_store = PayloadStore.from_env(engine)
+
 table_main = 'hotel_info_all'
 
+logger = logging.getLogger(__name__)
+
 
 def get_system_id_list(table, column, engine):
     try: 
         query = f"SELECT {column} FROM {table} WHERE StatusUpdateHotelInfo = 'Done Json' AND CountryCode = 'AE';"
-        df = pd.read_sql(query, engine)
-        # data_all = df[column].tolist()
-        # print(len(data_all))
-        data = list(set(df[column].tolist()))
+        data = fetch_distinct_column(engine, query)
         # print(data)
         return data
     except Exception as e:
-        print(f"Error fetching column info: {e}")
+        logger.error("Error fetching column info: %s", e)
+
+
 
 
+# Bump when build_specific_data's output changes so --changed-only regenerates every file.
+EXPORT_SCHEMA_VERSION = "content-1"
+
+# Columns of hotel_info_all read by build_specific_data.
+EXPORT_COLUMNS = list(HotelRecord.__slots__)
 
 
 def get_specifiq_data_from_system_id(table, systemid, engine):
-    # SQL query to fetch data for a specific SystemId
-    query = f"SELECT * FROM {table} WHERE SystemId = '{systemid}';"
-    df = pd.read_sql(query, engine)
+    # SQL query to fetch data for a specific SystemId, decoded straight into a HotelRecord
+    query = f"SELECT {', '.join(EXPORT_COLUMNS)} FROM {table} WHERE SystemId = :systemid LIMIT 1;"
+    hotel_data = fetch_one(engine, query, {"systemid": systemid}, record_type=HotelRecord)
 
-    if df.empty:
-        print("No data found for the provided SystemId.")
+    if hotel_data is None:
+        logger.debug("No data found for SystemId %s.", systemid)
         return None
 
-    # Assuming only one row will be returned for a specific SystemId
-    hotel_data = df.iloc[0].to_dict()
+    if payload_store is not None:
+        payload_store.fill_hotel_info([hotel_data])
+    return build_specific_data(hotel_data)
 
-    # Extract nested JSON from the 'HotelInfo' field
-    hotel_info = json.loads(hotel_data.get("HotelInfo", "{}"))
-    
-    createdAt = hotel_data.get("CreatedAt")
-    
-    if isinstance(createdAt, pd.Timestamp):
-        # Convert to string if needed and format timestamp
-        createdAt_str = createdAt.strftime("%Y-%m-%dT%H:%M:%S")
-        created_at_dt = datetime.strptime(createdAt_str, "%Y-%m-%dT%H:%M:%S")
-        timeStamp = int(created_at_dt.timestamp())
-    else:
-        created_at_dt = datetime.strptime(createdAt, "%Y-%m-%dT%H:%M:%S")
-        timeStamp = int(created_at_dt.timestamp())
 
-    # print("CreatedAt:", created_at_dt)
-    # print("Timestamp:", timeStamp)
-    # print("HotelInfo:", hotel_info)
-    
-    # Construct the hotel photo data in the desired format
-    hotel_photo_data = [
-        {
-            "picture_id": "NULL",  
-            "title": "NULL",       
-            "url": url             
-        } for url in hotel_info.get("imageUrls", []) or []
-    ]
-
-    hotel_room_amenities = [
-        {
-            "type": ameList,
-            "title": ameList,
-            "icon": "NULL"
-        } for ameList in hotel_info.get("masterRoomAmenities", []) or []
-    ]
-    
-    hotel_amenities = [
-        {
-            "type": ameList,
-            "title": ameList,
-            "icon": "NULL"
-        } for ameList in hotel_info.get("masterHotelAmenities", []) or []
-    ]
-    
-    address_line_1 = hotel_data.get("Address1", "NULL")
-    address_line_2 = hotel_data.get("Address2", "NULL")
-    hotel_name = hotel_info.get("name", hotel_data.get("HotelName", "NULL"))
-    # city = hotel_data.get("City", "NULL")
-    # postal_code = hotel_data.get("ZipCode", "NULL")
-    # state = hotel_info.get("address", {}).get("stateName", "NULL")
-    # country = hotel_data.get("CountryName", "NULL")
-
-    address_query = f"{address_line_1}, {address_line_2}, {hotel_name}"
-    google_map_site_link = f"http://maps.google.com/maps?q={address_query.replace(' ', '+')}" if address_line_1 != "NULL" else "NULL"
-
-
-    specific_data = {
-        "created": createdAt_str,
-        "timestamp": timeStamp,
-        "hotel_id": hotel_data.get("SystemId", "NULL"),
-        "name": hotel_info.get("name", hotel_data.get("HotelName", "NULL")),
-        "name_local": hotel_info.get("name", hotel_data.get("HotelName", "NULL")),
-        "hotel_formerly_name": "NULL",
-        "destination_code": hotel_data.get("GiDestinationId", "NULL"),
-        "country_code":  hotel_data.get("CountryCode", "NULL"),
-        "brand_text": "NULL",
-        "property_type": "NULL",
-        "star_rating": hotel_info.get("rating", hotel_data.get("Rating", "NULL")),
-        "chain": "NULL",
-        "brand": "NULL",
-        "logo": "NULL",
-        "primary_photo": hotel_info.get("imageUrl", hotel_data.get("ImageUrl", "NULL")),
-        "review_rating": {
-            "source": "NULL",
-            "number_of_reviews": "NULL",
-            "rating_average": hotel_info.get("tripAdvisorRating", "NULL"),
-            "popularity_score": "NULL",
-        },
-        "policies": {
-            "checkin": {
-                "begin_time": "NULL",
-                "end_time": "NULL",
-                "instructions": "NULL",
-                "special_instructions": "NULL",
-                "min_age": "NULL",
-            },
-            "checkout": {
-                "time": "NULL",
-            },
-            "fees": {
-                "optional": "NULL",
-            },
-            "know_before_you_go": "NULL",
-            "pets": "NULL",
-            "remark": "NULL",
-            "child_and_extra_bed_policy": {
-                "infant_age": "NULL",
-                "children_age_from": "NULL",
-                "children_age_to": "NULL",
-                "children_stay_free": "NULL",
-                "min_guest_age": "NULL"
-            },
-            "nationality_restrictions": "NULL",
-        },
-        "address": {
-            "latitude": hotel_info.get("geocode", {}).get("lat", hotel_data.get("Latitude", "NULL")),
-            "longitude": hotel_info.get("geocode", {}).get("lon", hotel_data.get("Longitude", "NULL")),
-            "address_line_1": hotel_data.get("Address1", "NULL"),
-            "address_line_2": hotel_data.get("Address2", "NULL"),
-            "city": hotel_data.get("City", "NULL"),
-            "state": hotel_info.get("address", {}).get("stateName", "NULL"),
-            "country": hotel_data.get("CountryName", "NULL"),
-            "country_code": hotel_data.get("CountryCode", "NULL"),
-            "postal_code": hotel_data.get("ZipCode", "NULL"),
-            "full_address": f"{hotel_data.get('Address1', 'NULL')}, {hotel_data.get('Address2', 'NULL')}",
-            "google_map_site_link": google_map_site_link,
-            "local_lang": {
-                "latitude": hotel_info.get("geocode", {}).get("lat", hotel_data.get("Latitude", "NULL")),
-                "longitude": hotel_info.get("geocode", {}).get("lon", hotel_data.get("Longitude", "NULL")),
-                "address_line_1": hotel_data.get("Address1", "NULL"),
-                "address_line_2": hotel_data.get("Address2", "NULL"),
-                "city": hotel_data.get("City", "NULL"),
-                "state": hotel_info.get("address", {}).get("stateName", "NULL"),
-                "country": hotel_data.get("CountryName", "NULL"),
-                "country_code": hotel_data.get("CountryCode", "NULL"),
-                "postal_code": hotel_data.get("ZipCode", "NULL"),
-                "full_address": f"{hotel_data.get('Address1', 'NULL')}, {hotel_data.get('Address2', 'NULL')}", 
-                "google_map_site_link": google_map_site_link,
-            },
-            "mapping": {
-                "continent_id": "NULL",
-                "country_id": hotel_data.get("CountryCode", "NULL"),
-                "province_id": "NULL",
-                "state_id": "NULL",
-                "city_id": "NULL",
-                "area_id": "NULL"
-            }
-        },
-        "contacts": {
-            "phone_numbers": [hotel_info.get("contact", {}).get("phoneNo", "NULL")],
-            "fax": hotel_info.get("contact", {}).get("faxNo", "NULL"),
-            "email_address": "NULL",
-            "website": hotel_info.get("contact", {}).get("website", hotel_data.get("Website", "NULL"))
-        },
-        "descriptions": [
-            {
-                "title": "NULL",
-                "text": "NULL"
-            }
-        ],
-        "room_type": {
-            "room_id": "NULL",
-            "title": "NULL",
-            "title_lang": "NULL",
-            "room_pic": "NULL",
-            "description": "NULL",
-            "max_allowed": {
-            "total": "NULL",
-            "adults": "NULL",
-            "children": "NULL",
-            "infant": "n/a"
-            },
-            "no_of_room": "n/a",
-            "room_size": "NULL",
-            "bed_type": [
-                    {
-                    "description": "NULL",
-                    "configuration": [
-                        {
-                        "quantity": "NULL",
-                        "size": "NULL",
-                        "type": "NULL"
-                        }
-                    ],
-                    "max_extrabeds": "n/a"
-                    }
-                ],
-            "shared_bathroom": "n/a"
-            },
-        "spoken_languages": {
-            "type": "spoken_languages",
-            "title": "English",
-            "icon": "mdi mdi-translate-variant"
-            },
-        "amenities": hotel_room_amenities,
-        "facilities": hotel_amenities,
-        "hotel_photo": hotel_photo_data, 
-        
-        "point_of_interests": [
-            {
-            "code": "NULL",
-            "name": "NULL"
-            }
-        ],
-        "nearest_airports": [
-            {
-            "code": "NULL",
-            "name": "NULL"
-            }
-        ],
-        "train_stations": [
-            {
-            "code": "NULL",
-            "name": "NULL"
-            }
-        ], 
-        "connected_locations": [
-            {
-            "code": "NULL",
-            "name": "NULL"
-            },
-        ],
-        "stadiums": [
-            {
-            "code": "NULL",
-            "name": "NULL"
-            }
-        ]
-    }
-
-
-    return specific_data
+def iter_hotel_rows_in_batches(table, engine, country_code=None, batch_size=5000):
+    """Yield 'Done Json' rows as HotelRecords, paging through the table by SystemId.
+
+    Each batch is a single keyset query (SystemId > last seen id) selecting only
+    EXPORT_COLUMNS, so the cost of a page does not grow with its position. When a
+    PayloadStore holds the HotelInfo JSON, each batch fetches it in one query.
+    """
+    where = "StatusUpdateHotelInfo = 'Done Json'"
+    params = {}
+    if country_code:
+        where += " AND CountryCode = :country_code"
+        params["country_code"] = country_code
+    for batch in iter_keyset_batches(engine, table, EXPORT_COLUMNS, key="SystemId", where=where, params=params,
+                                     batch_size=batch_size, record_type=HotelRecord):
+        if payload_store is not None:
+            payload_store.fill_hotel_info(batch)
+        yield from batch
+
+
+def build_specific_data(hotel_data):
+    """Build the specific_data dict for one hotel_info_all row given as a HotelRecord (or dict)."""
+    with metrics.timer("transform"):
+        # Extract nested JSON from the 'HotelInfo' field
+        hotel_info = fast_json.loads(hotel_data.get("HotelInfo") or "{}")
+        return GI_CONTENT_MAPPING(row=hotel_data, info=hotel_info)
 
 
 def save_json_files_follow_systemId(folder_path):
@@ -279,37 +103,139 @@ def save_json_files_follow_systemId(folder_path):
 
     systemid_list = get_system_id_list(table, column, engine)
 
-    print(f"Total System IDs found: {len(systemid_list)}")
+    logger.info("Total System IDs found: %d", len(systemid_list))
     # print(f"System ID list: {systemid_list}")
     
+    progress = ProgressLog(logger, "SystemIds", total=len(systemid_list))
     for systemid in systemid_list:
         file_name = f"{systemid}.json"
         file_path = os.path.join(folder_path, file_name)
 
         try:
             if os.path.exists(file_path):
-                print(f"File {file_name} already exists. Skipping...")
+                progress.record(systemid, "exists")
                 continue
             
             data_dict = get_specifiq_data_from_system_id(table, systemid, engine)
 
             if data_dict is None:
-                print(f"Data not found for SystemId: {systemid}. Skipping........................")
+                progress.record(systemid, "not found")
                 continue  
 
-            with open(file_path, "w") as json_file:
-                json.dump(data_dict, json_file, indent=4)
+            with metrics.timer("file_write"):
+                fast_json.dump_to_file(data_dict, file_path, indent=4)
 
-            print(f"Saved {file_name} in {folder_path}")
+            progress.record(systemid, "saved")
 
         except Exception as e:
-            print(f"Error occurred while processing SystemId {systemid}: {e}")
+            logger.error("Error occurred while processing SystemId %s: %s", systemid, e)
+            progress.record(systemid, "error")
             continue  
+    progress.close()
+
+
+def save_json_files_in_batches(folder_path, country_code=None, batch_size=5000, journal=None, fingerprints=None,
+                               archive=None):
+    """Export every 'Done Json' hotel using batched keyset queries instead of one query per SystemId.
 
+    With a CheckpointJournal, finished SystemIds are looked up in the journal
+    instead of calling os.path.exists for every hotel. With a FingerprintStore,
+    a hotel is regenerated only when its source row changed since the last
+    export (new hotels included), and existing files are otherwise left alone.
+    With a JsonlShardWriter, hotels go into its shards instead of `folder_path`.
+    """
+    if archive is None and not os.path.exists(folder_path):
+        os.makedirs(folder_path)
+
+    start_time = time.time()
+    saved = 0
+    unchanged = 0
+    progress = ProgressLog(logger, "SystemIds")
+    for hotel_data in iter_hotel_rows_in_batches(table_main, engine, country_code=country_code, batch_size=batch_size):
+        systemid = hotel_data["SystemId"]
+        file_name = f"{systemid}.json"
+        file_path = os.path.join(folder_path, file_name)
 
-folder_path = './gill_hotel_json_files/AE'
+        try:
+            if fingerprints is not None:
+                fingerprint = row_fingerprint(hotel_data, salt=EXPORT_SCHEMA_VERSION)
+                if fingerprints.is_unchanged(systemid, fingerprint):
+                    unchanged += 1
+                    progress.record(systemid, "unchanged")
+                    continue
+            elif journal is not None:
+                if systemid in journal:
+                    continue
+            elif archive is not None:
+                if systemid in archive:
+                    continue
+            elif os.path.exists(file_path):
+                progress.record(systemid, "exists")
+                continue
 
-save_json_files_follow_systemId(folder_path)
+            data_dict = build_specific_data(hotel_data)
 
+            with metrics.timer("file_write"):
+                if archive is not None:
+                    archive.write(systemid, data_dict)
+                else:
+                    fast_json.dump_to_file(data_dict, file_path, indent=4)
 
+            saved += 1
+            if fingerprints is not None:
+                fingerprints.update(systemid, fingerprint)
+            if journal is not None:
+                journal.record(systemid, "saved")
+            progress.record(systemid, "saved")
 
+        except Exception as e:
+            logger.error("Error occurred while processing SystemId %s: %s", systemid, e)
+            progress.record(systemid, "error")
+            continue
+
+    progress.close()
+    total_time = time.time() - start_time
+    logger.info("Saved %d files (%d unchanged) in %.2f seconds", saved, unchanged, total_time)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export hotel_info_all rows to one JSON file per hotel.")
+    parser.add_argument("--folder", default="./gill_hotel_json_files/AE")
+    parser.add_argument("--country-code", default="AE")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--per-system-id", action="store_true",
+                        help="Use the old one-query-per-SystemId export instead of batched reads.")
+    parser.add_argument("--job", default=None,
+                        help="Checkpoint journal name; when set, finished hotels are skipped via the journal.")
+    parser.add_argument("--checkpoint-dir", default="checkpoints")
+    parser.add_argument("--changed-only", action="store_true",
+                        help="Regenerate only hotels whose source row changed since the last export.")
+    parser.add_argument("--fingerprints", default=None,
+                        help="Fingerprint file for --changed-only (defaults to <checkpoint-dir>/<folder name>.fingerprints).")
+    add_archive_arguments(parser)
+    args = parser.parse_args()
+
+    setup_logging()
+    start_metrics_reporter()
+    if args.per_system_id:
+        save_json_files_follow_systemId(args.folder)
+    else:
+        journal = CheckpointJournal(args.job, directory=args.checkpoint_dir) if args.job else None
+        fingerprints = None
+        if args.changed_only:
+            fingerprint_path = args.fingerprints or os.path.join(
+                args.checkpoint_dir, f"{os.path.basename(os.path.normpath(args.folder))}.fingerprints")
+            fingerprints = FingerprintStore(fingerprint_path)
+        archive = open_archive(args)
+        try:
+            save_json_files_in_batches(args.folder, country_code=args.country_code or None,
+                                       batch_size=args.batch_size, journal=journal, fingerprints=fingerprints,
+                                       archive=archive)
+        finally:
+            if archive is not None:
+                archive.close()
+            if journal is not None:
+                journal.close()
+            if fingerprints is not None:
+                fingerprints.close()
+    stop_metrics_reporter()
@@ -0,0 +1,77 @@
+import os
+import re
+import unicodedata
+
+
+# Stored for a city the DestinationInfo API had no match for.
+NOT_FOUND = ""
+
+
+def normalize_city_name(city):
+    """Fold a city name so equivalent spellings share one key.
+
+    Case, diacritics, punctuation and repeated whitespace are ignored:
+    "São Paulo", "SAO PAULO" and "Sao-Paulo" all become "sao paulo".
+    """
+    decomposed = unicodedata.normalize("NFKD", str(city))
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(re.sub(r"[\W_]+", " ", stripped.casefold()).split())
+
+
+class DestinationMemo:
+    """GiDestinationId per normalized city name, kept across runs in an append-only "<city>\\t<id>" file.
+
+    get() returns the id, NOT_FOUND for a city the API had no match for, or None
+    for a city that was never looked up. Later lines win on load.
+    """
+
+    def __init__(self, path, flush_every=200):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.flush_every = flush_every
+        self.destinations = {}
+
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as memo:
+                for line in memo:
+                    if not line.endswith("\n"):
+                        break
+                    city_key, _, gi_destination_id = line.rstrip("\n").partition("\t")
+                    self.destinations[city_key] = gi_destination_id
+
+        self._file = open(path, "a", encoding="utf-8")
+        self._unflushed = 0
+
+    def __len__(self):
+        return len(self.destinations)
+
+    def get(self, city_key):
+        return self.destinations.get(city_key)
+
+    def put(self, city_key, gi_destination_id):
+        value = NOT_FOUND if gi_destination_id is None else str(gi_destination_id)
+        if self.destinations.get(city_key) == value:
+            return
+        self.destinations[city_key] = value
+        self._file.write(f"{city_key}\t{value}\n")
+        self._unflushed += 1
+        if self._unflushed >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unflushed = 0
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
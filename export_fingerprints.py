@@ -0,0 +1,78 @@
+import os
+import json
+import hashlib
+
+
+def row_fingerprint(hotel_data, salt=""):
+    """Stable hash of a source row (dict or Record); `salt` lets a schema change invalidate every fingerprint."""
+    if not isinstance(hotel_data, dict):
+        hotel_data = hotel_data.to_dict()
+    canonical = json.dumps(hotel_data, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha1(f"{salt}\n{canonical}".encode("utf-8")).hexdigest()
+
+
+class FingerprintStore:
+    """Last exported fingerprint per SystemId, kept in an append-only "<id>\\t<hash>" file.
+
+    Later lines win on load. When superseded lines make up most of the file it is
+    rewritten in compacted form.
+    """
+
+    def __init__(self, path, flush_every=500):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.flush_every = flush_every
+        self.fingerprints = {}
+
+        lines = 0
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as store:
+                for line in store:
+                    if not line.endswith("\n"):
+                        break
+                    item_id, _, digest = line.rstrip("\n").partition("\t")
+                    self.fingerprints[item_id] = digest
+                    lines += 1
+        if lines > 2 * len(self.fingerprints) + 1000:
+            self._compact()
+
+        self._file = open(path, "a", encoding="utf-8")
+        self._unflushed = 0
+
+    def _compact(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as store:
+            for item_id, digest in self.fingerprints.items():
+                store.write(f"{item_id}\t{digest}\n")
+        os.replace(tmp_path, self.path)
+
+    def is_unchanged(self, item_id, digest):
+        return self.fingerprints.get(str(item_id)) == digest
+
+    def update(self, item_id, digest):
+        item_id = str(item_id)
+        if self.fingerprints.get(item_id) == digest:
+            return
+        self.fingerprints[item_id] = digest
+        self._file.write(f"{item_id}\t{digest}\n")
+        self._unflushed += 1
+        if self._unflushed >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unflushed = 0
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
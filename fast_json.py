@@ -0,0 +1,75 @@
+import os
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+def _select_backend(name):
+    """(name, encode, decode) for JSON_BACKEND=orjson|msgspec|json, or the fastest one installed."""
+    if name in (None, "", "orjson") and orjson is not None:
+        return "orjson", lambda obj: orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+                                                  | orjson.OPT_PASSTHROUGH_DATACLASS), orjson.loads
+    if name in (None, "", "msgspec") and msgspec is not None:
+        return "msgspec", msgspec.json.encode, msgspec.json.decode
+    return "json", None, None
+
+
+BACKEND, _encode, _decode = _select_backend(os.getenv("JSON_BACKEND"))
+
+_ENCODE_ERRORS = (TypeError, ValueError, OverflowError) + ((msgspec.EncodeError,) if msgspec is not None else ())
+_DECODE_ERRORS = (ValueError,) + ((msgspec.DecodeError,) if msgspec is not None else ())
+
+
+def _try_encode(encode, obj):
+    try:
+        return encode(obj)
+    except _ENCODE_ERRORS:
+        return None
+
+
+def dumps(obj, indent=None, ensure_ascii=True):
+    """json.dumps replacement returning the same JSON value as the stdlib.
+
+    Compact output goes through the C backend and indented output through
+    msgspec's formatter when they are installed. Everything else falls back to
+    the stdlib: ensure_ascii text containing non-ASCII characters and objects the
+    backend rejects (ints beyond 64 bits, unsupported types). Non-finite floats,
+    which the stdlib writes as NaN/Infinity literals, come out as null.
+    """
+    data = None
+    if indent is None:
+        if _encode is not None:
+            data = _try_encode(_encode, obj)
+    elif BACKEND != "json" and msgspec is not None:
+        data = _try_encode(msgspec.json.encode, obj)
+        if data is not None:
+            data = msgspec.json.format(data, indent=indent)
+    if data is not None and (not ensure_ascii or data.isascii()):
+        return data.decode("utf-8")
+    separators = (",", ":") if indent is None else None
+    return json.dumps(obj, indent=indent, ensure_ascii=ensure_ascii, separators=separators)
+
+
+def loads(data):
+    """json.loads replacement for str or bytes; input the backend rejects (e.g. NaN literals) uses the stdlib."""
+    if _decode is not None:
+        try:
+            return _decode(data)
+        except _DECODE_ERRORS:
+            pass
+    return json.loads(data)
+
+
+def dump_to_file(obj, file_path, indent=4):
+    """Write `obj` to `file_path` the way json.dump(obj, f, indent=indent) would."""
+    text = dumps(obj, indent=indent)
+    with open(file_path, "w") as json_file:
+        json_file.write(text)
@@ -1,13 +1,16 @@
 from sqlalchemy import create_engine, text
 from dotenv import load_dotenv
 import os
-import pandas as pd
-import json
+import logging
 import aiohttp
 import asyncio
-import pandas as pd
 from datetime import datetime
 import time
+import argparse
+from gi_client import gi_post_async
+from hotel_db import fetch_column
+from destination_memo import NOT_FOUND, DestinationMemo, normalize_city_name
+from log_setup import setup_logging
 
 
 # Load environment variables
@@ -15,7 +18,6 @@ load_dotenv()
 
 # API and Database setup
 gill_api = os.getenv('GILL_API_KEY')
-url = "https://api.giinfotech.ae/api/Hotel/DestinationInfo"
 
 db_host = os.getenv('DB_HOST')
 db_user = os.getenv('DB_USER')
@@ -27,70 +29,196 @@ engine = create_engine(DATABASE_URL)
 
 gill_table = 'hotels_info_with_gidestination_code'
 
-
-semaphore = asyncio.Semaphore(5)  
+logger = logging.getLogger(__name__)
 
 
 def fetch_city_names(table, column, engine):
     query = f"SELECT DISTINCT {column} FROM {table};"
-    return pd.read_sql(query, engine)[column].tolist()
+    return fetch_column(engine, query)
 
 async def fetch_gi_destination_id(session, city, retries=3):
-    """Fetch GiDestinationId for a given city, with retries and concurrency control."""
-    payload = json.dumps({"destination": city})
-    headers = {'ApiKey': f'{gill_api}', 'Content-Type': 'application/json'}
-
-    for attempt in range(retries):
+    """Fetch GiDestinationId for a given city; pacing and retries come from the shared GI client.
+
+    Returns NOT_FOUND when the API answered without a match, and None when the
+    request failed (so the city is not remembered as unknown).
+    """
+    try:
+        status, response_data = await gi_post_async(session, "/Hotel/DestinationInfo", {"destination": city},
+                                                     retries=retries)
+    except asyncio.TimeoutError:
+        logger.warning("Timeout error for city %r after %d attempts", city, retries + 1)
+        return None
+    except aiohttp.ClientError as e:
+        logger.warning("Error fetching destination for city %r: %s", city, e)
+        return None
+
+    if status != 200:
+        logger.warning("Error fetching destination for city %r: Status code %s", city, status)
+        return None
+    if response_data.get("isSuccess") and response_data.get("data"):
+        return response_data["data"][0]["giDestinationId"]
+    return NOT_FOUND
+
+
+UPDATE_GI_DESTINATION_QUERY = text(f"""
+    UPDATE {gill_table}
+    SET GiDestinationId = :gi_destination_id
+    WHERE CityName = :city_name
+      AND (GiDestinationId IS NULL OR GiDestinationId <> :gi_destination_id)
+""")
+
+_DONE = object()
+
+
+def group_cities(city_names):
+    """Map each normalized city key to the CityName spellings that share it."""
+    groups = {}
+    for city in city_names:
+        if city is None:
+            continue
+        groups.setdefault(normalize_city_name(city), []).append(city)
+    return groups
+
+
+def write_destination_batch(batch, engine, max_retries=5, base_delay=1):
+    """Write a batch of (CityName, GiDestinationId) updates in one transaction; runs off the event loop.
+
+    Failed transactions are retried with exponential backoff. Returns False when
+    every attempt failed, so the caller can carry on with the next batch.
+    """
+    params = [{"city_name": city, "gi_destination_id": gi_destination_id} for city, gi_destination_id in batch]
+    attempt = 0
+    while attempt < max_retries:
         try:
-            async with semaphore:  
-                async with session.post(url, headers=headers, data=payload) as response:
-                    if response.status == 200:
-                        response_data = await response.json()
-                        if response_data.get("isSuccess") and response_data.get("data"):
-                            return response_data["data"][0]["giDestinationId"]
-            return None  
-        except asyncio.TimeoutError:
-            print(f"Timeout error for city '{city}', attempt {attempt + 1}/{retries}")
-            if attempt == retries - 1:
-                return None  
-
-
-async def update_gi_destination_id(city, session):
-    """Fetch and update GiDestinationId for a specific city."""
-    gi_destination_id = await fetch_gi_destination_id(session, city)
-    if gi_destination_id:
-        with engine.begin() as conn:
-            conn.execute(
-                text(f"""
-                    UPDATE {gill_table}
-                    SET GiDestinationId = :gi_destination_id
-                    WHERE CityName = :city_name
-                """),
-                {'gi_destination_id': gi_destination_id, 'city_name': city}
-            )
-            print(f"Update successful - City: {city}, GiDestinationId: {gi_destination_id}")
-
-async def bulk_update_gi_destination_id():
-    """Bulk update GiDestinationId using asynchronous requests with retries and concurrency limit."""
+            with engine.begin() as conn:
+                conn.execute(UPDATE_GI_DESTINATION_QUERY, params)
+            logger.debug("Flushed %d GiDestinationId updates.", len(batch))
+            return True
+        except Exception as e:
+            attempt += 1
+            if attempt < max_retries:
+                delay = base_delay * (2 ** (attempt - 1))  # Exponential backoff
+                logger.warning("Batch attempt %d failed: %s. Retrying in %s seconds...", attempt, e, delay)
+                time.sleep(delay)
+            else:
+                logger.error("All %d attempts failed for a batch of %d cities. Error: %s", max_retries, len(batch), e)
+                return False
+
+
+async def produce_keys(to_fetch, memo_answers, key_queue, result_queue, resolvers):
+    # Memo answers go straight to the writer; they are queued before any resolver can finish.
+    for item in memo_answers:
+        await result_queue.put(item)
+    for city_key in to_fetch:
+        await key_queue.put(city_key)
+    for _ in range(resolvers):
+        await key_queue.put(_DONE)
+
+
+async def resolve_stage(session, key_queue, result_queue, groups, memo, stats):
+    while True:
+        city_key = await key_queue.get()
+        if city_key is _DONE:
+            await result_queue.put(_DONE)
+            return
+        # One lookup per normalized key, using the first spelling seen for it.
+        gi_destination_id = await fetch_gi_destination_id(session, groups[city_key][0])
+        stats["fetched"] += 1
+        if gi_destination_id is None:
+            stats["failed"] += 1
+            continue
+        memo.put(city_key, gi_destination_id)
+        await result_queue.put((city_key, gi_destination_id))
+
+
+async def flush_destination_batch(batch, engine, stats):
+    if await asyncio.to_thread(write_destination_batch, batch, engine):
+        stats["written"] += len(batch)
+    else:
+        stats["write_failed"] += len(batch)
+
+
+async def write_stage(result_queue, groups, resolvers, engine, flush_size, stats):
+    finished_resolvers = 0
+    batch = []
+    while finished_resolvers < resolvers:
+        item = await result_queue.get()
+        if item is _DONE:
+            finished_resolvers += 1
+            continue
+
+        city_key, gi_destination_id = item
+        if not gi_destination_id:
+            stats["not_found"] += 1
+            continue
+        batch.extend((city, gi_destination_id) for city in groups[city_key])
+        stats["resolved"] += 1
+        if len(batch) >= flush_size:
+            await flush_destination_batch(batch, engine, stats)
+            batch = []
+
+    if batch:
+        await flush_destination_batch(batch, engine, stats)
+
+
+async def bulk_update_gi_destination_id(memo_path="checkpoints/gi_destination_memo.tsv", concurrency=20,
+                                        flush_size=500, retry_not_found=False):
+    """Resolve GiDestinationId for every CityName and write it back in batches.
+
+    City names are folded with normalize_city_name, so equivalent spellings cost a
+    single DestinationInfo call, and answers are kept in a DestinationMemo so later
+    runs only ask about new cities (and, with `retry_not_found`, cities the API
+    previously had no match for). Resolvers feed one writer stage through a
+    bounded queue; its batched UPDATEs run in a thread so the event loop keeps
+    fetching while the database works.
+    """
     start_time = time.time()
     formatted_start_time = datetime.fromtimestamp(start_time).strftime("%I:%M %p")  
-    print(f"Start Time: {formatted_start_time}")
+    logger.info("Start Time: %s", formatted_start_time)
 
     city_names = fetch_city_names(table=gill_table, column='CityName', engine=engine)
-    
-    timeout = aiohttp.ClientTimeout(total=60)  
-    async with aiohttp.ClientSession(timeout=timeout) as session:
-        tasks = [update_gi_destination_id(city, session) for city in city_names]
-        await asyncio.gather(*tasks)
+    groups = group_cities(city_names)
+    stats = {"fetched": 0, "failed": 0, "resolved": 0, "not_found": 0, "written": 0, "write_failed": 0}
+
+    with DestinationMemo(memo_path) as memo:
+        key_queue = asyncio.Queue(maxsize=concurrency * 10)
+        result_queue = asyncio.Queue(maxsize=concurrency * 10)
+        to_fetch, memo_answers = [], []
+        for city_key in groups:
+            known = memo.get(city_key)
+            if known is None or (known == NOT_FOUND and retry_not_found):
+                to_fetch.append(city_key)
+            else:
+                memo_answers.append((city_key, known))
+        logger.info("%d city names, %d distinct after normalizing, %d answered by the memo.",
+                    len(city_names), len(groups), len(memo_answers))
+
+        timeout = aiohttp.ClientTimeout(total=60)  
+        connector = aiohttp.TCPConnector(limit=concurrency, keepalive_timeout=30)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            await asyncio.gather(
+                produce_keys(to_fetch, memo_answers, key_queue, result_queue, concurrency),
+                *(resolve_stage(session, key_queue, result_queue, groups, memo, stats) for _ in range(concurrency)),
+                write_stage(result_queue, groups, concurrency, engine, flush_size, stats),
+            )
 
-    
     end_time = time.time()  
     formatted_end_time = datetime.fromtimestamp(end_time).strftime("%I:%M %p")
-    print(f"END time: {formatted_end_time}")
-    total_time = end_time - start_time
-    formatted_total_time = datetime.fromtimestamp(total_time).strftime("%I:%M %p")
-    print(f"Total time taken for updates: ", formatted_total_time)
+    logger.info("END time: %s", formatted_end_time)
+    logger.info("Total time taken for updates: %.1f s, %s", end_time - start_time, stats)
+    return stats
 
 
 if __name__ == "__main__":
-    asyncio.run(bulk_update_gi_destination_id())
+    parser = argparse.ArgumentParser(description="Fill hotels_info_with_gidestination_code.GiDestinationId by CityName.")
+    parser.add_argument("--memo", default="checkpoints/gi_destination_memo.tsv",
+                        help="File keeping city -> GiDestinationId answers across runs.")
+    parser.add_argument("--concurrency", type=int, default=20, help="DestinationInfo requests in flight.")
+    parser.add_argument("--flush-size", type=int, default=500, help="CityName updates per transaction.")
+    parser.add_argument("--retry-not-found", action="store_true",
+                        help="Ask again about cities the API had no match for in earlier runs.")
+    args = parser.parse_args()
+
+    setup_logging()
+    asyncio.run(bulk_update_gi_destination_id(memo_path=args.memo, concurrency=args.concurrency,
+                                              flush_size=args.flush_size, retry_not_found=args.retry_not_found))
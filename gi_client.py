@@ -0,0 +1,237 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+import aiohttp
+from dotenv import load_dotenv
+
+import fast_json
+from http_transport import get_transport
+
+
+load_dotenv()
+
+GI_API_BASE_URL = os.getenv('GI_API_BASE_URL', 'https://api.giinfotech.ae/api')
+gill_api = os.getenv('GILL_API_KEY')
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveRateLimiter:
+    """Token bucket whose rate follows AIMD: grow slowly on success, halve on trouble.
+
+    A response counts as trouble when it is a 429/5xx, a network error, or slower
+    than `latency_threshold` seconds. One instance is shared by every sync and async
+    caller in the process.
+    """
+
+    def __init__(self, initial_rate=5.0, min_rate=0.5, max_rate=50.0, increase=0.5, decrease_factor=0.5,
+                 latency_threshold=5.0, decrease_cooldown=1.0):
+        self.rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.latency_threshold = latency_threshold
+        self.decrease_cooldown = decrease_cooldown
+        self._tokens = 1.0
+        self._updated = time.monotonic()
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """Take a token, returning how long the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(1.0, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1.0
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self):
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def record(self, status, latency):
+        trouble = status is None or status in RETRYABLE_STATUSES or latency > self.latency_threshold
+        with self._lock:
+            now = time.monotonic()
+            if trouble:
+                # Several in-flight requests usually fail together; count them as one signal.
+                if now - self._last_decrease >= self.decrease_cooldown:
+                    self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+                    self._last_decrease = now
+            else:
+                # About `increase` requests/second more per second of healthy traffic.
+                self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+
+class CircuitBreaker:
+    """Stop calling the API after repeated failures, then probe it again after a pause."""
+
+    def __init__(self, failure_threshold=10, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def wait_time(self):
+        """Seconds until a request may be sent; 0 means go ahead."""
+        with self._lock:
+            if self.state == "closed":
+                return 0.0
+            remaining = self._opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0:
+                return remaining
+            if self._probe_in_flight:
+                return min(1.0, self.reset_timeout)
+            # Half open: let exactly one probe through.
+            self.state = "half-open"
+            self._probe_in_flight = True
+            return 0.0
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                logger.info("GI API circuit closed again.")
+            self.state = "closed"
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self.state == "half-open" or self._failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning("GI API circuit opened after %d failures; pausing %ss.",
+                                   self._failures, self.reset_timeout)
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+    def release_probe(self):
+        """Give up a probe that ended without a response (e.g. cancelled), so another may be sent."""
+        with self._lock:
+            self._probe_in_flight = False
+
+
+# Total request budget for the GI API across every process of a job.
+GI_INITIAL_RPS = float(os.getenv('GI_INITIAL_RPS', '5'))
+GI_MAX_RPS = float(os.getenv('GI_MAX_RPS', '50'))
+
+limiter = AdaptiveRateLimiter(initial_rate=GI_INITIAL_RPS, max_rate=GI_MAX_RPS)
+breaker = CircuitBreaker()
+
+# Callables given (status, latency) after every GI response or network error, e.g. by benchmarks.
+response_observers = []
+
+
+def set_process_share(processes):
+    """Give this process 1/`processes` of the GI budget, for jobs that run several worker processes."""
+    processes = max(1, int(processes))
+    with limiter._lock:
+        limiter.max_rate = GI_MAX_RPS / processes
+        limiter.rate = min(limiter.max_rate, GI_INITIAL_RPS / processes)
+        limiter.min_rate = min(limiter.min_rate, limiter.max_rate)
+
+
+def _gi_headers():
+    return {
+        'ApiKey': gill_api,
+        'Content-Type': 'application/json'
+    }
+
+
+def _before_request():
+    while True:
+        wait = breaker.wait_time()
+        if wait <= 0:
+            break
+        time.sleep(wait)
+    limiter.acquire()
+
+
+def _after_response(status, latency):
+    for observer in response_observers:
+        observer(status, latency)
+    limiter.record(status, latency)
+    if status is None or status in RETRYABLE_STATUSES:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+
+
+def gi_post(path, payload, retries=3, timeout=60):
+    """POST a JSON payload to the GI API through the shared limiter and breaker.
+
+    Requests go over the pooled keep-alive connections of the shared
+    http_transport. Returns (status_code, parsed_json_or_None). 429/5xx responses
+    and network errors are retried; the last network error is re-raised.
+    """
+    url = f"{GI_API_BASE_URL}{path}"
+    data = fast_json.dumps(payload)
+    transport = get_transport()
+    for attempt in range(retries + 1):
+        _before_request()
+        start = time.monotonic()
+        try:
+            response = transport.post(url, headers=_gi_headers(), data=data, timeout=timeout)
+        except transport.errors:
+            _after_response(None, time.monotonic() - start)
+            if attempt == retries:
+                raise
+            continue
+
+        _after_response(response.status_code, time.monotonic() - start)
+        if response.status_code in RETRYABLE_STATUSES and attempt < retries:
+            continue
+        body = fast_json.loads(response.content) if response.status_code == 200 else None
+        return response.status_code, body
+
+
+async def gi_post_async(session, path, payload, retries=3):
+    """aiohttp counterpart of gi_post, sharing the same limiter and breaker."""
+    url = f"{GI_API_BASE_URL}{path}"
+    data = fast_json.dumps(payload)
+    for attempt in range(retries + 1):
+        while True:
+            wait = breaker.wait_time()
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+        await limiter.acquire_async()
+
+        start = time.monotonic()
+        try:
+            async with session.post(url, headers=_gi_headers(), data=data) as response:
+                status = response.status
+                content = await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            _after_response(None, time.monotonic() - start)
+            if attempt == retries:
+                raise
+            continue
+        except BaseException:
+            # Cancelled or failed unexpectedly: no outcome to record, but a half-open probe must not stay taken.
+            breaker.release_probe()
+            raise
+
+        _after_response(status, time.monotonic() - start)
+        if status in RETRYABLE_STATUSES and attempt < retries:
+            continue
+        body = fast_json.loads(content) if status == 200 else None
+        return status, body
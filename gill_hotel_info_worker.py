@@ -0,0 +1,182 @@
+import os
+import time
+import socket
+import logging
+import argparse
+from datetime import datetime
+from multiprocessing import Process
+from sqlalchemy import text
+
+from single_hotel_info_input_data_in_db_json_formet import (
+    engine,
+    fetch_hotel_info_by_systemId,
+    payload_store,
+)
+from gi_client import set_process_share
+from hotel_info_writer import BufferedHotelInfoWriter
+from stage_metrics import start_metrics_reporter, stop_metrics_reporter
+from log_setup import ProgressLog, setup_logging
+
+
+lease_table = 'hotel_info_lease'
+
+logger = logging.getLogger(__name__)
+
+PENDING_CONDITION = """
+    (h.StatusUpdateHotelInfo IS NULL
+     OR h.StatusUpdateHotelInfo NOT IN ('Done Json', 'Not found json'))
+"""
+
+
+def ensure_lease_table(engine):
+    """Create the lease table that records which worker currently owns a SystemId."""
+    with engine.begin() as connection:
+        connection.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {lease_table} (
+                SystemId VARCHAR(64) NOT NULL PRIMARY KEY,
+                WorkerId VARCHAR(128) NOT NULL,
+                LeaseExpiresAt DATETIME NOT NULL,
+                KEY idx_lease_expires (LeaseExpiresAt)
+            )
+        """))
+
+
+def claim_batch(engine, worker_id, batch_size, lease_seconds):
+    """Claim up to `batch_size` pending SystemIds that no other worker holds a live lease on.
+
+    The candidate rows are locked with FOR UPDATE SKIP LOCKED while the leases are
+    written, so two workers claiming at the same moment never receive the same id.
+    """
+    select_query = text(f"""
+        SELECT h.SystemId
+        FROM hotel_info_all h
+        LEFT JOIN {lease_table} l ON l.SystemId = h.SystemId
+        WHERE {PENDING_CONDITION}
+          AND h.SystemId IS NOT NULL
+          AND (l.SystemId IS NULL OR l.LeaseExpiresAt < NOW())
+        ORDER BY h.SystemId
+        LIMIT :batch_size
+        FOR UPDATE OF h SKIP LOCKED
+    """)
+    lease_query = text(f"""
+        INSERT INTO {lease_table} (SystemId, WorkerId, LeaseExpiresAt)
+        VALUES (:SystemId, :WorkerId, NOW() + INTERVAL :LeaseSeconds SECOND)
+        ON DUPLICATE KEY UPDATE
+            WorkerId = VALUES(WorkerId),
+            LeaseExpiresAt = VALUES(LeaseExpiresAt)
+    """)
+
+    with engine.begin() as connection:
+        system_ids = connection.execute(select_query, {"batch_size": batch_size}).scalars().all()
+        if system_ids:
+            connection.execute(lease_query, [
+                {"SystemId": system_id, "WorkerId": worker_id, "LeaseSeconds": lease_seconds}
+                for system_id in system_ids
+            ])
+    return system_ids
+
+
+def release_batch(engine, worker_id, system_ids):
+    """Drop this worker's leases once the batch has been written back."""
+    if not system_ids:
+        return
+    with engine.begin() as connection:
+        connection.execute(
+            text(f"DELETE FROM {lease_table} WHERE SystemId = :SystemId AND WorkerId = :WorkerId"),
+            [{"SystemId": system_id, "WorkerId": worker_id} for system_id in system_ids],
+        )
+
+
+def process_system_id(systemId, writer):
+    hotel_info = fetch_hotel_info_by_systemId(systemId)
+    if hotel_info:
+        writer.add(systemId, hotel_info, "Done Json")
+        return True
+    writer.add(systemId, {}, "Not found json")
+    return False
+
+
+def run_worker(worker_id, batch_size=100, lease_seconds=900, max_batches=None, flush_size=50, flush_interval=5.0,
+               total_workers=1):
+    """Claim and process batches until no pending SystemIds remain (or max_batches is reached)."""
+    # Connections inherited from the parent process must not be shared with it.
+    engine.dispose(close=False)
+    # All workers together stay within one GI request budget.
+    set_process_share(total_workers)
+    # The parent's log queue listener does not exist in this process.
+    setup_logging()
+    # Each worker reports its own stages; put {pid} in STAGE_METRICS_FILE to keep one file per worker.
+    start_metrics_reporter()
+
+    writer = BufferedHotelInfoWriter(engine, batch_size=flush_size, flush_interval=flush_interval,
+                                     payload_store=payload_store)
+    processed = 0
+    batches = 0
+    progress = ProgressLog(logger, f"[{worker_id}] SystemIds")
+    while max_batches is None or batches < max_batches:
+        system_ids = claim_batch(engine, worker_id, batch_size, lease_seconds)
+        if not system_ids:
+            break
+        batches += 1
+
+        failed_before = len(writer.failed_ids)
+        for systemId in system_ids:
+            found = process_system_id(systemId, writer)
+            processed += 1
+            progress.record(systemId, "Done" if found else "Not found json")
+
+        # Results must be committed before the leases go, or another worker could re-claim them.
+        writer.flush()
+        failed = set(writer.failed_ids[failed_before:])
+        if failed:
+            # Still pending: keeping their leases until they expire stops this loop from re-claiming them at once.
+            logger.warning("[%s] %d SystemIds could not be written; leaving them leased for %d seconds.",
+                           worker_id, len(failed), lease_seconds)
+        release_batch(engine, worker_id, [systemId for systemId in system_ids if systemId not in failed])
+
+    stop_metrics_reporter()
+    progress.close()
+    logger.info("[%s] Finished after %d batches, %d SystemIds (%d not written).", worker_id, batches, processed,
+                writer.failed)
+    return processed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch GI HotelInfo for pending SystemIds with N leasing workers.")
+    parser.add_argument("--workers", type=int, default=16, help="Number of worker processes to launch.")
+    parser.add_argument("--batch-size", type=int, default=100, help="SystemIds claimed per lease.")
+    parser.add_argument("--lease-seconds", type=int, default=900,
+                        help="How long a claim is held before another worker may take it over.")
+    parser.add_argument("--max-batches", type=int, default=None, help="Stop each worker after this many batches.")
+    parser.add_argument("--flush-size", type=int, default=50, help="HotelInfo updates per database transaction.")
+    parser.add_argument("--flush-interval", type=float, default=5.0, help="Seconds before a partial batch is flushed.")
+    args = parser.parse_args()
+
+    setup_logging()
+    start_time = time.time()
+    logger.info("Start Time: %s", datetime.fromtimestamp(start_time).strftime('%I:%M %p'))
+
+    ensure_lease_table(engine)
+    if payload_store is not None:
+        payload_store.ensure_schema()
+
+    prefix = f"{socket.gethostname()}-{os.getpid()}"
+    processes = [
+        Process(target=run_worker, args=(f"{prefix}-{index}", args.batch_size, args.lease_seconds, args.max_batches,
+                                           args.flush_size, args.flush_interval, args.workers))
+        for index in range(1, args.workers + 1)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    total_time = time.time() - start_time
+    hours = int(total_time // 3600)
+    minutes = int((total_time % 3600) // 60)
+    seconds = int(total_time % 60)
+    logger.info("Total time taken for updates: %d hours, %d minutes, %d seconds", hours, minutes, seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+from sqlalchemy import text
+
+
+def _statement(query):
+    return text(query) if isinstance(query, str) else query
+
+
+def iter_rows(engine, query, params=None, batch_size=10000, record_type=None):
+    """Stream the rows of `query` through a server-side cursor, `batch_size` rows at a time.
+
+    Rows are yielded as SQLAlchemy Row tuples, or as `record_type.from_values(row)`
+    when a hotel_records type is given. The connection stays open until the
+    generator is exhausted or closed.
+    """
+    with engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, max_row_buffer=batch_size).execute(
+            _statement(query), params or {})
+        for partition in result.partitions(batch_size):
+            if record_type is None:
+                yield from partition
+            else:
+                for row in partition:
+                    yield record_type.from_values(row)
+
+
+def iter_column(engine, query, params=None, batch_size=10000):
+    """Stream the first column of every row of `query`."""
+    for row in iter_rows(engine, query, params, batch_size=batch_size):
+        yield row[0]
+
+
+def fetch_column(engine, query, params=None, batch_size=10000):
+    """List of the first column of `query`, read through a server-side cursor."""
+    return list(iter_column(engine, query, params, batch_size=batch_size))
+
+
+def fetch_distinct_column(engine, query, params=None, batch_size=10000):
+    """Like fetch_column, with duplicates dropped (first occurrence order kept)."""
+    return list(dict.fromkeys(iter_column(engine, query, params, batch_size=batch_size)))
+
+
+def fetch_one(engine, query, params=None, record_type=None):
+    """First row of `query` (as `record_type` when given), or None."""
+    with engine.connect() as connection:
+        row = connection.execute(_statement(query), params or {}).first()
+    if row is None or record_type is None:
+        return row
+    return record_type.from_values(row)
+
+
+# Column each table is scanned by when iter_keyset is not given a key.
+KEYSET_KEYS = {
+    "hotel_info_all": "SystemId",
+    "hotels_info_with_gidestination_code": "CityName",
+}
+
+
+def iter_keyset_batches(engine, table, columns, key=None, where=None, params=None, batch_size=5000,
+                        start_after=None, end_at=None, record_type=None):
+    """Yield lists of rows of `table` in `key` order, one keyset query per batch.
+
+    Each page asks for `key > last key seen` instead of using LIMIT/OFFSET, so a
+    deep page costs the same as the first one. `where` (with `params`) is pushed
+    into every query, and start_after / end_at restrict the scan to a key range,
+    e.g. one shard of a job. The key does not have to be unique: when a page ends
+    inside a run of equal keys, the rest of that run is read before moving on.
+    Rows whose key is NULL are never returned.
+    """
+    key = key or KEYSET_KEYS[table]
+    columns = list(columns)
+    select_columns = columns if key in columns else columns + [key]
+    key_index = select_columns.index(key)
+
+    filters = [f"({where})"] if where else []
+    if end_at is not None:
+        filters.append(f"{key} <= :_end_at")
+    filters = " AND ".join(filters + [""])
+    select = f"SELECT {', '.join(select_columns)} FROM {table} WHERE {filters}"
+    first_page = text(f"{select}{key} IS NOT NULL ORDER BY {key} LIMIT :_batch_size")
+    next_page = text(f"{select}{key} > :_last ORDER BY {key} LIMIT :_batch_size")
+    key_run = text(f"{select}{key} = :_last")
+
+    query_params = dict(params or {}, _batch_size=batch_size, _end_at=end_at)
+    last = start_after
+    while True:
+        with engine.connect() as connection:
+            if last is None:
+                rows = connection.execute(first_page, query_params).all()
+            else:
+                rows = connection.execute(next_page, dict(query_params, _last=last)).all()
+            full_page = len(rows) == batch_size
+            if full_page:
+                last_key = rows[-1][key_index]
+                rows = [row for row in rows if row[key_index] != last_key]
+                rows += connection.execute(key_run, dict(query_params, _last=last_key)).all()
+        if not rows:
+            return
+        last = rows[-1][key_index]
+        yield rows if record_type is None else [record_type.from_values(row) for row in rows]
+        if not full_page:
+            return
+
+
+def iter_keyset(engine, table, columns, **kwargs):
+    """Rows of iter_keyset_batches one at a time."""
+    for batch in iter_keyset_batches(engine, table, columns, **kwargs):
+        yield from batch
@@ -0,0 +1,174 @@
+import time
+import logging
+import threading
+from sqlalchemy import text
+
+import fast_json
+from stage_metrics import metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+UPDATE_HOTEL_INFO_QUERY = text("""
+    UPDATE hotel_info_all
+    SET HotelInfo = :HotelInfo,
+        StatusUpdateHotelInfo = :StatusUpdateHotelInfo,
+        CountryCode = :CountryCode,
+        ZipCode = :ZipCode,
+        CountryName = :CountryName
+    WHERE SystemId = :SystemId
+""")
+
+# Used with a PayloadStore: the JSON goes to the side table and the row keeps its hash.
+UPDATE_HOTEL_INFO_POINTER_QUERY = text("""
+    UPDATE hotel_info_all
+    SET HotelInfo = NULL,
+        HotelInfoSha256 = :HotelInfoSha256,
+        StatusUpdateHotelInfo = :StatusUpdateHotelInfo,
+        CountryCode = :CountryCode,
+        ZipCode = :ZipCode,
+        CountryName = :CountryName
+    WHERE SystemId = :SystemId
+""")
+
+
+def hotel_info_update_params(systemId, hotel_info_json_data, status_update, payload_store=None):
+    """Bind parameters for UPDATE_HOTEL_INFO_QUERY from a HotelInfo dict (or its JSON text).
+
+    With a payload_store the parameters are for UPDATE_HOTEL_INFO_POINTER_QUERY
+    instead, carrying the compressed payload and its hash.
+    """
+    if isinstance(hotel_info_json_data, str):
+        hotel_info_json_data = fast_json.loads(hotel_info_json_data)
+
+    address = hotel_info_json_data.get("address") or {}
+    params = {
+        "HotelInfo": fast_json.dumps(hotel_info_json_data),
+        "StatusUpdateHotelInfo": status_update,
+        "CountryCode": address.get("countryCode"),
+        "ZipCode": address.get("zipCode"),
+        "CountryName": address.get("countryName"),
+        "SystemId": systemId
+    }
+    if payload_store is not None:
+        hotel_info = params.pop("HotelInfo")
+        params["HotelInfoSha256"] = params["Payload"] = None
+        if hotel_info_json_data:
+            params["HotelInfoSha256"], params["Payload"] = payload_store.encode(hotel_info)
+    return params
+
+
+def write_hotel_info_updates(connection, params, payload_store=None):
+    """Execute a list of hotel_info_update_params() rows in the caller's transaction."""
+    if payload_store is None:
+        connection.execute(UPDATE_HOTEL_INFO_QUERY, params)
+    else:
+        payload_store.write(connection, params)
+        connection.execute(UPDATE_HOTEL_INFO_POINTER_QUERY, params)
+
+
+class BufferedHotelInfoWriter:
+    """Accumulate HotelInfo updates and write them in batched transactions.
+
+    A batch is flushed when it reaches `batch_size` rows or when `flush_interval`
+    seconds have passed since the previous flush, whichever comes first. A failed
+    batch is retried as a whole with exponential backoff, like update_hotel_info,
+    and then written row by row so one bad row does not lose the rest; SystemIds
+    that still fail are counted in `failed` and listed in `failed_ids`.
+    `on_flush`, if given, is called with a list of (SystemId, status) pairs after
+    each batch has been committed, covering only the rows that were written. With a PayloadStore, payloads are written to
+    its side table in the same transaction as the row updates.
+    """
+
+    def __init__(self, engine, batch_size=200, flush_interval=5.0, max_retries=5, base_delay=1, on_flush=None,
+                 payload_store=None):
+        self.engine = engine
+        self.payload_store = payload_store
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.on_flush = on_flush
+        self.written = 0
+        self.failed = 0
+        self.failed_ids = []
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add(self, systemId, hotel_info_json_data, status_update):
+        with metrics.timer("transform"):
+            params = hotel_info_update_params(systemId, hotel_info_json_data, status_update, self.payload_store)
+        with self._lock:
+            self._buffer.append(params)
+            due = (len(self._buffer) >= self.batch_size
+                   or time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def maybe_flush(self):
+        """Flush if the time limit has passed; for callers that go idle between adds."""
+        with self._lock:
+            due = self._buffer and time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def _write(self, batch):
+        with metrics.timer("db_write"), self.engine.begin() as connection:
+            write_hotel_info_updates(connection, batch, self.payload_store)
+
+    def flush(self):
+        """Write the buffered rows; returns False when some of them could not be written."""
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+            self._last_flush = time.monotonic()
+        if not batch:
+            return True
+
+        written = batch
+        attempt = 0
+        while attempt < self.max_retries:
+            try:
+                self._write(batch)
+                break
+            except Exception as e:
+                attempt += 1
+                if attempt < self.max_retries:
+                    delay = self.base_delay * (2 ** (attempt - 1))  # Exponential backoff
+                    logger.warning("Batch attempt %d failed: %s. Retrying in %s seconds...", attempt, e, delay)
+                    time.sleep(delay)
+                else:
+                    logger.warning("All %d attempts failed for %d SystemIds, retrying row by row. Error: %s",
+                                   self.max_retries, len(batch), e)
+                    written = self._write_row_by_row(batch)
+
+        if written:
+            self.written += len(written)
+            metrics.count("rows_written", len(written))
+            logger.debug("Flushed %d HotelInfo updates (total %d).", len(written), self.written)
+            if self.on_flush is not None:
+                self.on_flush([(params["SystemId"], params["StatusUpdateHotelInfo"]) for params in written])
+        return len(written) == len(batch)
+
+    def _write_row_by_row(self, batch):
+        """Write each row in its own transaction; returns the rows that were written."""
+        written = []
+        for params in batch:
+            try:
+                self._write([params])
+                written.append(params)
+            except Exception as e:
+                self.failed += 1
+                self.failed_ids.append(params["SystemId"])
+                logger.error("Error writing HotelInfo for SystemId %s: %s", params["SystemId"], e)
+        return written
+
+    def close(self):
+        return self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,594 @@
+import logging
+from datetime import datetime
+
+from hotel_records import Record
+
+
+NULL = "NULL"
+
+logger = logging.getLogger(__name__)
+
+# Marks a skeleton key a provider's spec leaves out of its output.
+OMIT = object()
+
+
+# ---------------------------------------------------------------------------
+# Mapping engine
+# ---------------------------------------------------------------------------
+
+class field:
+    """Getter for ctx[source].get(key, default).
+
+    `default` may itself be a getter, in which case it is only evaluated when the
+    key is missing (e.g. HotelInfo "name" falling back to the HotelName column).
+    """
+
+    def __init__(self, source, key, default=NULL):
+        self.source = source
+        self.key = key
+        self.default = default
+
+    def __call__(self, ctx):
+        values = ctx[self.source]
+        if callable(self.default):
+            return values[self.key] if self.key in values else self.default(ctx)
+        return values.get(self.key, self.default)
+
+
+class value:
+    """Getter for a value computed once per record by a mapping source."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __call__(self, ctx):
+        return ctx[self.name]
+
+
+def merge_template(base, overrides):
+    """Return `base` with `overrides` applied, keeping the skeleton's key order.
+
+    Nested dicts are merged recursively and OMIT drops a key. A key the base does
+    not have is placed right after the override key written before it, or first
+    when nothing precedes it.
+    """
+    items = [[key, val] for key, val in base.items()]
+    anchor = -1
+    for key, override in overrides.items():
+        position = next((i for i, item in enumerate(items) if item[0] == key), None)
+        if position is None:
+            if override is not OMIT:
+                items.insert(anchor + 1, [key, override])
+                anchor += 1
+            continue
+        if override is OMIT:
+            del items[position]
+            anchor = position - 1
+        elif isinstance(override, dict) and isinstance(items[position][1], dict):
+            items[position][1] = merge_template(items[position][1], override)
+            anchor = position
+        else:
+            items[position][1] = override
+            anchor = position
+    return {key: val for key, val in items}
+
+
+class _TemplateCompiler:
+    """Generates the source of one function building a whole record from a template.
+
+    Sources and inputs become local variables, field getters become inline
+    dict lookups and constants are emitted as literals, so a record costs one
+    function call instead of one call per leaf.
+    """
+
+    def __init__(self):
+        self.namespace = {}
+        self.sources_used = set()
+
+    def bind(self, obj):
+        name = f"_c{len(self.namespace)}"
+        self.namespace[name] = obj
+        return name
+
+    def local(self, source):
+        self.sources_used.add(source)
+        return f"_{source}"
+
+    def expr(self, node):
+        if isinstance(node, field):
+            values = self.local(node.source)
+            if callable(node.default):
+                return f"({values}[{node.key!r}] if {node.key!r} in {values} else {self.expr(node.default)})"
+            return f"{values}.get({node.key!r}, {self.expr(node.default)})"
+        if isinstance(node, value):
+            return self.local(node.name)
+        if callable(node):
+            return f"{self.bind(node)}(ctx)"
+        if isinstance(node, dict):
+            return "{" + ", ".join(f"{key!r}: {self.expr(child)}" for key, child in node.items()) + "}"
+        if isinstance(node, list):
+            return "[" + ", ".join(self.expr(child) for child in node) + "]"
+        if node is None or isinstance(node, (str, int, float, bool)):
+            return repr(node)
+        return self.bind(node)
+
+
+def compile_template(template, sources=()):
+    """Compile a template and its sources into a function of ctx building one record."""
+    compiler = _TemplateCompiler()
+    body = compiler.expr(template)
+    lines = ["def build(ctx):"]
+    source_names = set()
+    for names, compute in sources:
+        # A source may fill several names at once by returning a tuple.
+        names = names if isinstance(names, tuple) else (names,)
+        lines.append(f"    {', '.join(f'_{name}' for name in names)} = {compiler.expr(compute)}")
+        lines.extend(f"    ctx[{name!r}] = _{name}" for name in names)
+        source_names.update(names)
+    for name in sorted(compiler.sources_used - source_names):
+        lines.insert(1, f"    _{name} = ctx[{name!r}]")
+    lines.append(f"    return {body}")
+    exec("\n".join(lines), compiler.namespace)
+    return compiler.namespace["build"]
+
+
+class HotelMapping:
+    """A provider spec compiled once into a record builder.
+
+    `sources` is an ordered list of (name, getter) pairs evaluated once per record
+    into the context, so nested lookups such as the first Agoda address are done a
+    single time; the template's getters then read from that context.
+    """
+
+    def __init__(self, template, sources=()):
+        self.template = template
+        self.sources = list(sources)
+        self._build = compile_template(template, self.sources)
+
+    def __call__(self, **inputs):
+        return self._build(inputs)
+
+
+def _address_fields(line_1, line_2, city, state, country, country_code, postal_code, full_address, google_map_site_link,
+                    latitude, longitude):
+    return {
+        "latitude": latitude,
+        "longitude": longitude,
+        "address_line_1": line_1,
+        "address_line_2": line_2,
+        "city": city,
+        "state": state,
+        "country": country,
+        "country_code": country_code,
+        "postal_code": postal_code,
+        "full_address": full_address,
+        "google_map_site_link": google_map_site_link,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Shared skeleton of the unified hotel JSON schema
+# ---------------------------------------------------------------------------
+
+_NULL_ADDRESS = _address_fields(*[NULL] * 11)
+
+HOTEL_SKELETON = {
+    "hotel_id": NULL,
+    "name": NULL,
+    "name_local": NULL,
+    "hotel_formerly_name": NULL,
+    "brand_text": NULL,
+    "property_type": NULL,
+    "star_rating": NULL,
+    "chain": NULL,
+    "brand": NULL,
+    "logo": NULL,
+    "primary_photo": NULL,
+    "review_rating": {
+        "source": NULL,
+        "number_of_reviews": NULL,
+        "rating_average": NULL,
+        "popularity_score": NULL,
+    },
+    "policies": {
+        "checkin": {
+            "begin_time": NULL,
+            "end_time": NULL,
+            "instructions": NULL,
+            "min_age": NULL,
+        },
+        "checkout": {
+            "time": NULL,
+        },
+        "fees": {
+            "optional": NULL,
+        },
+        "know_before_you_go": NULL,
+        "pets": NULL,
+        "remark": NULL,
+        "child_and_extra_bed_policy": {
+            "infant_age": NULL,
+            "children_age_from": NULL,
+            "children_age_to": NULL,
+            "children_stay_free": NULL,
+            "min_guest_age": NULL
+        },
+        "nationality_restrictions": NULL,
+    },
+    "address": {
+        **_NULL_ADDRESS,
+        "local_lang": dict(_NULL_ADDRESS),
+        "mapping": {
+            "continent_id": NULL,
+            "country_id": NULL,
+            "province_id": NULL,
+            "state_id": NULL,
+            "city_id": NULL,
+            "area_id": NULL
+        }
+    },
+    "contacts": {
+        "phone_numbers": [],
+        "fax": NULL,
+        "email_address": NULL,
+        "website": NULL
+    },
+    "descriptions": [
+        {
+            "title": NULL,
+            "text": NULL
+        }
+    ],
+    "room_type": [],
+    "spoken_languages": [],
+    "amenities": [],
+    "facilities": [],
+    "hotel_photo": [],
+    "point_of_interests": [],
+    "nearest_airports": [],
+    "train_stations": [],
+    "connected_locations": [],
+    "stadiums": []
+}
+
+
+# ---------------------------------------------------------------------------
+# GI (hotel_info_all rows with the HotelInfo JSON)
+# ---------------------------------------------------------------------------
+
+def _gi_photos(ctx):
+    return [
+        {
+            "picture_id": NULL,
+            "title": NULL,
+            "url": url
+        } for url in ctx["info"].get("imageUrls", []) or []
+    ]
+
+
+def _gi_amenities(key):
+    def build(ctx):
+        return [
+            {
+                "type": amenity,
+                "title": amenity,
+                "icon": NULL
+            } for amenity in ctx["info"].get(key, []) or []
+        ]
+    return build
+
+
+def _gi_full_address(ctx):
+    row = ctx["row"]
+    return f"{row.get('Address1', NULL)}, {row.get('Address2', NULL)}"
+
+
+def _gi_google_map_site_link(ctx):
+    row = ctx["row"]
+    address_line_1 = row.get("Address1", NULL)
+    address_line_2 = row.get("Address2", NULL)
+    hotel_name = ctx["info"].get("name", row.get("HotelName", NULL))
+    address_query = f"{address_line_1}, {address_line_2}, {hotel_name}"
+    return f"http://maps.google.com/maps?q={address_query.replace(' ', '+')}" if address_line_1 != NULL else NULL
+
+
+def _gi_created(ctx):
+    """(created, timestamp) from CreatedAt, a datetime or an ISO string without fraction."""
+    createdAt = ctx["row"].get("CreatedAt")
+    if isinstance(createdAt, datetime):
+        # Same values as formatting and re-parsing it, without the strptime cost.
+        created_at_dt = createdAt.replace(microsecond=0, tzinfo=None)
+        return created_at_dt.isoformat(), int(created_at_dt.timestamp())
+    created_at_dt = datetime.strptime(createdAt, "%Y-%m-%dT%H:%M:%S")
+    return createdAt, int(created_at_dt.timestamp())
+
+
+GI_SOURCES = [
+    ("geocode", field("info", "geocode", default={})),
+    ("info_address", field("info", "address", default={})),
+    ("contact", field("info", "contact", default={})),
+    ("full_address", _gi_full_address),
+]
+
+
+def _gi_address(google_map_site_link):
+    return _address_fields(
+        line_1=field("row", "Address1"),
+        line_2=field("row", "Address2"),
+        city=field("row", "City"),
+        state=field("info_address", "stateName"),
+        country=field("row", "CountryName"),
+        country_code=field("row", "CountryCode"),
+        postal_code=field("row", "ZipCode"),
+        full_address=value("full_address"),
+        google_map_site_link=google_map_site_link,
+        latitude=field("geocode", "lat", default=field("row", "Latitude")),
+        longitude=field("geocode", "lon", default=field("row", "Longitude")),
+    )
+
+
+def _gi_overrides(google_map_site_link):
+    hotel_name = field("info", "name", default=field("row", "HotelName"))
+    return {
+        "hotel_id": field("row", "SystemId"),
+        "name": hotel_name,
+        "name_local": hotel_name,
+        "hotel_formerly_name": NULL,
+        "destination_code": field("row", "GiDestinationId"),
+        "country_code": field("row", "CountryCode"),
+        "star_rating": field("info", "rating", default=field("row", "Rating")),
+        "primary_photo": field("info", "imageUrl", default=field("row", "ImageUrl")),
+        "review_rating": {
+            "rating_average": field("info", "tripAdvisorRating"),
+        },
+        "address": {
+            **_gi_address(google_map_site_link),
+            "local_lang": _gi_address(google_map_site_link),
+            "mapping": {
+                "country_id": field("row", "CountryCode"),
+            },
+        },
+        "contacts": {
+            "phone_numbers": [field("contact", "phoneNo")],
+            "fax": field("contact", "faxNo"),
+            "website": field("contact", "website", default=field("row", "Website")),
+        },
+        "room_type": {
+            "room_id": NULL,
+            "title": NULL,
+            "title_lang": NULL,
+            "room_pic": NULL,
+            "description": NULL,
+            "max_allowed": {
+                "total": NULL,
+                "adults": NULL,
+                "children": NULL,
+                "infant": "n/a"
+            },
+            "no_of_room": "n/a",
+            "room_size": NULL,
+            "bed_type": [
+                {
+                    "description": NULL,
+                    "configuration": [
+                        {
+                            "quantity": NULL,
+                            "size": NULL,
+                            "type": NULL
+                        }
+                    ],
+                    "max_extrabeds": "n/a"
+                }
+            ],
+            "shared_bathroom": "n/a"
+        },
+        "amenities": _gi_amenities("masterRoomAmenities"),
+        "facilities": _gi_amenities("masterHotelAmenities"),
+        "hotel_photo": _gi_photos,
+    }
+
+
+def _code_name_list():
+    return [{"code": NULL, "name": NULL}]
+
+
+# Schema written by Convert_json_file.py.
+GI_CONVERT_MAPPING = HotelMapping(
+    merge_template(HOTEL_SKELETON, {
+        **_gi_overrides(google_map_site_link=NULL),
+        "spoken_languages": {"type": NULL, "title": NULL, "icon": NULL},
+        "point_of_interests": {"code": NULL, "name": NULL},
+        "nearest_airports": {"code": NULL, "name": NULL},
+        "train_stations": {"code": NULL, "name": NULL},
+    }),
+    sources=GI_SOURCES,
+)
+
+# Schema written by content_create_with_json_file.py.
+GI_CONTENT_MAPPING = HotelMapping(
+    merge_template(HOTEL_SKELETON, {
+        "created": value("created"),
+        "timestamp": value("timestamp"),
+        **_gi_overrides(google_map_site_link=value("google_map_site_link")),
+        "policies": {
+            "checkin": {
+                "instructions": NULL,
+                "special_instructions": NULL,
+            },
+        },
+        "spoken_languages": {
+            "type": "spoken_languages",
+            "title": "English",
+            "icon": "mdi mdi-translate-variant"
+        },
+        "point_of_interests": _code_name_list(),
+        "nearest_airports": _code_name_list(),
+        "train_stations": _code_name_list(),
+        "connected_locations": _code_name_list(),
+        "stadiums": _code_name_list(),
+    }),
+    sources=GI_SOURCES + [
+        (("created", "timestamp"), _gi_created),
+        ("google_map_site_link", _gi_google_map_site_link),
+    ],
+)
+
+
+# ---------------------------------------------------------------------------
+# Agoda (parsed Hotel_feed_full)
+# ---------------------------------------------------------------------------
+
+# Feed records are xmltodict dicts, or hotel_records types from the typed stream parser.
+FEED_RECORD = (dict, Record)
+
+
+def _agoda_address(index):
+    def get(ctx):
+        addresses = (ctx["feed"].get("addresses") or {}).get("address", [{}])
+        if isinstance(addresses, FEED_RECORD):
+            addresses = [addresses]
+        return (addresses[index] if index < len(addresses) else None) or {}
+    return get
+
+
+def _agoda_room_types(ctx):
+    hotel_feed_full, hotel_id = ctx["feed"], ctx["hotel_id"]
+    room_type = []
+    if hotel_feed_full.get("roomtypes") is not None:
+        room_types = hotel_feed_full.get("roomtypes", {}).get("roomtype", [])
+        for room in room_types:
+            if isinstance(room, FEED_RECORD):
+                room_type.append({
+                    "room_id": room.get("hotel_room_type_id", NULL),
+                    "title": room.get("standard_caption", NULL),
+                    "title_lang": room.get("standard_caption", NULL),
+                    "room_pic": room.get("hotel_room_type_picture", NULL),
+                    "description": NULL,
+                    "max_allowed": {
+                        "total": int(room.get("max_occupancy_per_room", 0)),
+                        "adults": int(room.get("max_occupancy_per_room", 0)),
+                        "children": NULL,
+                        "infant": room.get("max_infant_in_room", NULL),
+                    },
+                    "no_of_room": room.get("no_of_room", NULL),
+                    "room_size": room.get("size_of_room", 0),
+                    "bed_type": [
+                        {
+                            "description": room.get("bed_type", NULL),
+                            "configuration": [],
+                            "max_extrabeds": room.get("max_extrabeds", NULL),
+                        }
+                    ],
+                    "shared_bathroom": room.get("shared_bathroom", NULL),
+                })
+            else:
+                logger.warning("Skipping room entry as it is not a dictionary: %s", room)
+    else:
+        logger.debug("Skipping hotel %s as 'room_types' is not found", hotel_id)
+    return room_type
+
+
+def _agoda_facilities(ctx):
+    hotel_feed_full, hotel_id = ctx["feed"], ctx["hotel_id"]
+    facilities = []
+    facilities_types = hotel_feed_full.get("facilities")
+    if facilities_types is None:
+        logger.debug("Skipping hotel %s as 'facilities' is not found.", hotel_id)
+    else:
+        facilities_types = facilities_types.get("facility", [])
+        if isinstance(facilities_types, list):
+            for facility in facilities_types:
+                if isinstance(facility, FEED_RECORD):
+                    facilities.append({
+                        "type": facility.get("property_name", NULL),
+                        "title": facility.get("property_group_description", NULL),
+                        "icon": facility.get("property_translated_name", NULL)
+                    })
+                else:
+                    logger.warning("Skipping facility entry as it is not a dictionary: %s", facility)
+        else:
+            logger.debug("No facilities found for hotel %s", hotel_id)
+    return facilities
+
+
+def _agoda_photos(ctx):
+    hotel_feed_full, hotel_id = ctx["feed"], ctx["hotel_id"]
+    hotel_photo = []
+    if hotel_feed_full.get("pictures") is not None:
+        for photo in hotel_feed_full["pictures"].get("picture", []):
+            if isinstance(photo, FEED_RECORD):
+                hotel_photo.append({
+                    "picture_id": photo.get("picture_id", NULL),
+                    "title": photo.get("caption", NULL),
+                    "url": photo.get("URL", NULL)
+                })
+            else:
+                logger.warning("Skipping photo entry as it is not a dictionary: %s", photo)
+    else:
+        logger.debug("Skipping hotel %s as 'pictures' is not found.", hotel_id)
+    return hotel_photo
+
+
+def _agoda_address_fields(address_source):
+    return _address_fields(
+        line_1=field(address_source, "address_line_1"),
+        line_2=field(address_source, "address_line_2"),
+        city=field(address_source, "city"),
+        state=field(address_source, "state"),
+        country=field(address_source, "country"),
+        country_code=NULL,
+        postal_code=field(address_source, "postal_code"),
+        full_address=NULL,
+        google_map_site_link=NULL,
+        latitude=field("hotel", "latitude"),
+        longitude=field("hotel", "longitude"),
+    )
+
+
+AGODA_MAPPING = HotelMapping(
+    merge_template(HOTEL_SKELETON, {
+        "hotel_id": lambda ctx: ctx["hotel"]["hotel_id"],
+        "name": field("hotel", "hotel_name"),
+        "name_local": field("hotel", "translated_name"),
+        "hotel_formerly_name": field("hotel", "hotel_formerly_name"),
+        "property_type": field("hotel", "accommodation_type"),
+        "star_rating": field("hotel", "star_rating"),
+        "review_rating": {
+            "number_of_reviews": field("hotel", "number_of_reviews"),
+            "rating_average": field("hotel", "rating_average"),
+            "popularity_score": field("hotel", "popularity_score"),
+        },
+        "policies": {
+            "check_in": {
+                "begin_time": NULL,
+                "end_time": NULL,
+                "instructions": NULL,
+                "min_age": NULL,
+            },
+            "checkin": OMIT,
+            "pets": [
+                "Pets not allowed"
+            ],
+            "child_and_extra_bed_policy": {
+                "infant_age": field("bed_policy", "infant_age"),
+                "children_age_from": field("bed_policy", "children_age_from"),
+                "children_age_to": field("bed_policy", "children_age_to"),
+                "children_stay_free": field("bed_policy", "children_stay_free"),
+                "min_guest_age": field("bed_policy", "min_guest_age"),
+            },
+            "nationality_restrictions": field("hotel", "nationality_restrictions"),
+        },
+        "address": {
+            **_agoda_address_fields("address"),
+            "local_lang": _agoda_address_fields("local_address"),
+        },
+        "room_type": _agoda_room_types,
+        "facilities": _agoda_facilities,
+        "hotel_photo": _agoda_photos,
+    }),
+    sources=[
+        ("bed_policy", field("hotel", "child_and_extra_bed_policy", default={})),
+        ("address", _agoda_address(0)),
+        ("local_address", _agoda_address(1)),
+    ],
+)
@@ -0,0 +1,127 @@
+class Record:
+    """Compact, slot based stand-in for the row and feed dicts the builders read.
+
+    Subclasses list their fields in __slots__. A field that was never set behaves
+    like a missing dict key, so get(), `in`, iteration and to_dict() give the same
+    answers the equivalent dict would, and the mappings in hotel_mapping read a
+    Record exactly like a dict. `NESTED` maps a field to the Record type its
+    sub-element decodes into.
+    """
+
+    __slots__ = ()
+    NESTED = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.FIELD_SET = frozenset(cls.__slots__)
+
+    def __init__(self, **values):
+        for name, value in values.items():
+            setattr(self, name, value)
+
+    @classmethod
+    def from_values(cls, values):
+        """Build a record from values in __slots__ order, e.g. a DB row selecting exactly those columns."""
+        record = cls.__new__(cls)
+        for name, value in zip(cls.__slots__, values):
+            setattr(record, name, value)
+        return record
+
+    @classmethod
+    def from_mapping(cls, mapping):
+        """Build a record from a dict-like row; keys that are not fields are ignored."""
+        record = cls.__new__(cls)
+        for name in cls.__slots__:
+            if name in mapping:
+                setattr(record, name, mapping[name])
+        return record
+
+    def get(self, name, default=None):
+        return getattr(self, name, default)
+
+    def __getitem__(self, name):
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name) from None
+
+    def __contains__(self, name):
+        return hasattr(self, name)
+
+    def __iter__(self):
+        return (name for name in self.__slots__ if hasattr(self, name))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def keys(self):
+        return list(self)
+
+    def items(self):
+        return [(name, getattr(self, name)) for name in self]
+
+    def to_dict(self):
+        return {name: value.to_dict() if isinstance(value, Record) else value for name, value in self.items()}
+
+    def __eq__(self, other):
+        if isinstance(other, (Record, dict)):
+            return self.to_dict() == (other.to_dict() if isinstance(other, Record) else other)
+        return NotImplemented
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={value!r}" for name, value in self.items())
+        return f"{type(self).__name__}({fields})"
+
+
+class HotelRecord(Record):
+    """One hotel_info_all row as read by the exporters."""
+
+    __slots__ = (
+        "SystemId", "HotelName", "GiDestinationId", "CountryCode", "CountryName", "Rating",
+        "ImageUrl", "Latitude", "Longitude", "Address1", "Address2", "City", "ZipCode",
+        "Website", "HotelInfo", "CreatedAt",
+    )
+
+
+# Agoda Hotel_feed_full records, holding only the elements build_agoda_specific_data reads.
+
+class Policy(Record):
+    __slots__ = ("infant_age", "children_age_from", "children_age_to", "children_stay_free", "min_guest_age")
+
+
+class AgodaHotel(Record):
+    __slots__ = (
+        "hotel_id", "hotel_name", "translated_name", "hotel_formerly_name", "accommodation_type", "star_rating",
+        "number_of_reviews", "rating_average", "popularity_score", "child_and_extra_bed_policy",
+        "nationality_restrictions", "latitude", "longitude",
+    )
+    NESTED = {"child_and_extra_bed_policy": Policy}
+
+
+class Address(Record):
+    __slots__ = ("address_line_1", "address_line_2", "city", "state", "country", "postal_code")
+
+
+class RoomType(Record):
+    __slots__ = (
+        "hotel_room_type_id", "standard_caption", "hotel_room_type_picture", "max_occupancy_per_room",
+        "max_infant_in_room", "no_of_room", "size_of_room", "bed_type", "max_extrabeds", "shared_bathroom",
+    )
+
+
+class Facility(Record):
+    __slots__ = ("property_name", "property_group_description", "property_translated_name")
+
+
+class Photo(Record):
+    __slots__ = ("picture_id", "caption", "URL")
+
+
+# Record type per Hotel_feed_full section, keyed like agoda_stream_parser.AGODA_FEED_SECTIONS.
+AGODA_RECORD_TYPES = {
+    "hotels": AgodaHotel,
+    "addresses": Address,
+    "roomtypes": RoomType,
+    "facilities": Facility,
+    "pictures": Photo,
+}
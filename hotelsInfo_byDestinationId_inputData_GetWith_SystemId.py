@@ -1,11 +1,14 @@
-import requests
-import json
 from sqlalchemy import create_engine, text
 from dotenv import load_dotenv
 from datetime import datetime
 import os
-import pandas as pd
 import time
+import logging
+import argparse
+from checkpoint_journal import CheckpointJournal
+from gi_client import gi_post
+from hotel_db import fetch_column
+from log_setup import ProgressLog, setup_logging
 
 # Load environment variables
 load_dotenv()
@@ -22,45 +25,43 @@ engine = create_engine(DATABASE_URL)
 gill_table = 'hotels_info_with_gidestination_code'
 gill_api = os.getenv('GILL_API_KEY')
 
+logger = logging.getLogger(__name__)
+
 
 def only_column_info(table, column, engine):
     """Fetch distinct values from a specified column in a given table."""
     try:
         query = f"SELECT DISTINCT {column} FROM {table};"
-        df = pd.read_sql(query, engine)
-        return df[column].tolist()
+        return fetch_column(engine, query)
     except Exception as e:
-        print(f"Error fetching column info: {e}")
+        logger.error("Error fetching column info: %s", e)
         return []
 
 
 def fetch_hotels_by_destination_id(destination_id):
-    """Fetch hotel information for a given giDestinationId using synchronous requests."""
-    url = "https://api.giinfotech.ae/api/Hotel/HotelsInfoByDestinationId"
-    payload = json.dumps({"destinationCode": str(destination_id)})
-    headers = {
-        'ApiKey': gill_api,
-        'Content-Type': 'application/json'
-    }
-
+    """Fetch hotel information for a given giDestinationId through the shared GI client."""
     try:
-        response = requests.post(url, headers=headers, data=payload)
-        if response.status_code == 200:
-            response_data = response.json()
+        status_code, response_data = gi_post("/Hotel/HotelsInfoByDestinationId",
+                                             {"destinationCode": str(destination_id)})
+        if status_code == 200:
             if response_data.get("isSuccess", False):
                 return response_data.get("hotelsInformation", []), "Done"
             else:
-                print(f"No hotel information found for destination ID: {destination_id}")
+                logger.debug("No hotel information found for destination ID: %s", destination_id)
                 return [], "Cannot find."
         else:
-            print(f"Failed to fetch data for destination ID {destination_id}: {response.status_code}")
+            logger.warning("Failed to fetch data for destination ID %s: %s", destination_id, status_code)
             return [], "Cannot find."
     except Exception as e:
-        print(f"Error fetching data for destination ID {destination_id}: {e}")
+        logger.warning("Error fetching data for destination ID %s: %s", destination_id, e)
         return [], "Cannot find."
 
 def insert_hotels_into_db(hotels, status_update):
-    """Insert hotel information into the database while preserving specific existing values."""
+    """Insert hotel information into the database while preserving specific existing values.
+
+    Returns the number of statements that failed.
+    """
+    failed = 0
     with engine.begin() as connection:
         if not hotels:
             query = text("""
@@ -78,19 +79,20 @@ def insert_hotels_into_db(hotels, status_update):
                     'GiDestinationId': hotels.get("giDestinationId", ""),
                     'StatusUpdate': status_update
                 })
-                print(f"Update successful for missing data - GiDestinationId: {hotels.get('giDestinationId')}")
+                logger.debug("Update successful for missing data - GiDestinationId: %s", hotels.get('giDestinationId'))
             except Exception as e:
-                print(f"Error updating hotel data for missing info: {e}")
-            return  
+                logger.error("Error updating hotel data for missing info: %s", e)
+                failed += 1
+            return failed
 
         for hotel in hotels:
             if hotel is None:  
-                print("Hotel data is null, skipping...")
+                logger.debug("Hotel data is null, skipping...")
                 continue
 
             required_fields = ['giDestinationId', 'name', 'systemId', 'rating', 'address1', 'address2', 'imageUrl', 'geoCode']
             if not all(field in hotel for field in required_fields):
-                print(f"Incomplete hotel data for insertion: {hotel}")
+                logger.warning("Incomplete hotel data for insertion: %s", hotel)
                 continue
             
             query = text("""
@@ -128,29 +130,163 @@ def insert_hotels_into_db(hotels, status_update):
                     'Longitude': hotel.get("geoCode", {}).get("lon", None),
                     'StatusUpdate': status_update
                 })
-                print(f"Update successful - GiDestinationId: {hotel['giDestinationId']}")
+                logger.debug("Update successful - GiDestinationId: %s", hotel['giDestinationId'])
+            except Exception as e:
+                logger.error("Error updating hotel data: %s", e)
+                failed += 1
+    return failed
+
+
+HOTEL_REQUIRED_FIELDS = ['giDestinationId', 'name', 'systemId', 'rating', 'address1', 'address2', 'imageUrl', 'geoCode']
+
+HOTEL_UPSERT_COLUMNS = [
+    'GiDestinationId', 'HotelName', 'SystemId', 'Rating', 'City',
+    'Address1', 'Address2', 'ImageUrl', 'Latitude', 'Longitude', 'StatusUpdate',
+]
+
+
+def hotel_to_row(hotel, status_update):
+    """Map one HotelsInfoByDestinationId entry to hotel_info_all column values."""
+    return {
+        'GiDestinationId': hotel.get("giDestinationId", ""),
+        'HotelName': hotel.get("name", ""),
+        'SystemId': hotel.get("systemId", ""),
+        'Rating': hotel.get("rating", ""),
+        'City': hotel.get("city", ""),
+        'Address1': hotel.get("address1", ""),
+        'Address2': hotel.get("address2", ""),
+        'ImageUrl': hotel.get("imageUrl", ""),
+        'Latitude': (hotel.get("geoCode") or {}).get("lat", None),
+        'Longitude': (hotel.get("geoCode") or {}).get("lon", None),
+        'StatusUpdate': status_update
+    }
+
+
+def build_bulk_upsert(row_count):
+    """Build one INSERT ... ON DUPLICATE KEY UPDATE statement with `row_count` VALUES tuples."""
+    values = ",\n".join(
+        "(" + ", ".join(f":{column}_{index}" for column in HOTEL_UPSERT_COLUMNS) + ")"
+        for index in range(row_count)
+    )
+    updates = ",\n".join(
+        f"{column} = VALUES({column})" for column in HOTEL_UPSERT_COLUMNS if column != 'GiDestinationId'
+    )
+    return text(f"""
+        INSERT INTO hotel_info_all ({", ".join(HOTEL_UPSERT_COLUMNS)})
+        VALUES
+        {values}
+        ON DUPLICATE KEY UPDATE
+        {updates}
+    """)
+
+
+def upsert_rows(rows):
+    """Upsert `rows` with one multi-row statement in one transaction."""
+    params = {
+        f"{column}_{index}": row[column]
+        for index, row in enumerate(rows)
+        for column in HOTEL_UPSERT_COLUMNS
+    }
+    with engine.begin() as connection:
+        connection.execute(build_bulk_upsert(len(rows)), params)
+
+
+def bulk_insert_hotels_into_db(hotels, status_update, batch_size=500):
+    """Upsert hotels with one multi-row statement per batch instead of one statement per hotel.
+
+    A batch that fails (e.g. one value too long for its column) is retried row by
+    row, so only the offending rows are lost. Returns (rows upserted, rows dropped
+    because the database rejected them).
+    """
+    if not hotels:
+        logger.debug("No hotel data to insert, skipping...")
+        return 0, 0
+
+    rows = []
+    for hotel in hotels:
+        if hotel is None:
+            logger.debug("Hotel data is null, skipping...")
+            continue
+        if not all(field in hotel for field in HOTEL_REQUIRED_FIELDS):
+            logger.warning("Incomplete hotel data for insertion: %s", hotel)
+            continue
+        rows.append(hotel_to_row(hotel, status_update))
+
+    start_time = time.time()
+    inserted = 0
+    dropped = 0
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        try:
+            upsert_rows(batch)
+            inserted += len(batch)
+            continue
+        except Exception as e:
+            logger.warning("Error upserting batch of %d hotels, retrying row by row: %s", len(batch), e)
+        for row in batch:
+            try:
+                upsert_rows([row])
+                inserted += 1
             except Exception as e:
-                print(f"Error updating hotel data: {e}")
+                dropped += 1
+                logger.error("Error upserting SystemId %s: %s", row['SystemId'], e)
+
+    elapsed = time.time() - start_time
+    rate = inserted / elapsed if elapsed > 0 else float(inserted)
+    logger.info("Bulk upsert: %d/%d rows in %.2f seconds (%.1f rows/sec)", inserted, len(rows), elapsed, rate)
+    return inserted, dropped
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Load hotels for every GiDestinationId into hotel_info_all.")
+    parser.add_argument("--batch-size", type=int, default=500, help="Rows per multi-row upsert statement.")
+    parser.add_argument("--row-by-row", action="store_true", help="Use the old one-statement-per-hotel insert.")
+    parser.add_argument("--job", default=None,
+                        help="Checkpoint journal name; when set, destinations it records as done are skipped.")
+    parser.add_argument("--checkpoint-dir", default="checkpoints")
+    args = parser.parse_args()
+
+    setup_logging()
     start_time = time.time()
     formatted_start_time = datetime.fromtimestamp(start_time).strftime("%I:%M %p")  
-    print(f"Start Time: {formatted_start_time}")
+    logger.info("Start Time: %s", formatted_start_time)
 
     destination_ids = only_column_info(gill_table, 'GiDestinationId', engine)
 
-    for index, destination_id in enumerate(destination_ids, start=1):
+    journal = CheckpointJournal(args.job, directory=args.checkpoint_dir) if args.job else None
+    if journal is not None:
+        logger.info("Skipping %d destinations already recorded in %s", len(journal), journal.path)
+
+    total_rows = 0
+    progress = ProgressLog(logger, "Destination IDs", total=len(destination_ids))
+    for destination_id in destination_ids:
+        if journal is not None and destination_id in journal:
+            continue
         hotels, status_update = fetch_hotels_by_destination_id(destination_id)
         if hotels or status_update == "Cannot find.":
-            insert_hotels_into_db(hotels, status_update)
-            print(f"Processed Destination ID {destination_id} ({index}/{len(destination_ids)})")
+            if args.row_by_row:
+                dropped = insert_hotels_into_db(hotels, status_update)
+            else:
+                inserted, dropped = bulk_insert_hotels_into_db(hotels, status_update, batch_size=args.batch_size)
+                total_rows += inserted
+            progress.record(destination_id, status_update if not dropped else "write failed")
+        else:
+            dropped = 0
+        # Failed lookups and destinations with rejected rows stay out of the journal so a restart retries them.
+        if journal is not None and status_update == "Done" and not dropped:
+            journal.record(destination_id, status_update)
+
+    progress.close()
+    if journal is not None:
+        journal.close()
 
     end_time = time.time()  
     formatted_end_time = datetime.fromtimestamp(end_time).strftime("%I:%M %p")
-    print(f"END time: {formatted_end_time}")
+    logger.info("END time: %s", formatted_end_time)
     total_time = end_time - start_time
-    print(f"Total time taken for updates: {total_time:.2f} seconds")
+    logger.info("Total time taken for updates: %.2f seconds", total_time)
+    if total_rows and total_time > 0:
+        logger.info("Upserted %d rows (%.1f rows/sec overall)", total_rows, total_rows / total_time)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,131 @@
+import os
+import threading
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import h2
+except ImportError:
+    h2 = None
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+
+# br is only offered when a decoder for it is installed; requests/urllib3 and httpx pick it up themselves.
+ACCEPT_ENCODING = "gzip, deflate, br" if brotli is not None else "gzip, deflate"
+
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "60"))
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "32"))
+
+
+class HttpTransport:
+    """Shared HTTP client for the GI and Agoda fetchers.
+
+    Connections are pooled and kept alive between calls, so a job pays the TCP and
+    TLS handshake once per connection instead of once per hotel, and responses are
+    requested compressed (gzip, plus br when brotli is installed). With `http2` and
+    httpx + h2 installed, one multiplexed httpx client is used; otherwise each
+    thread gets its own keep-alive requests.Session.
+    """
+
+    def __init__(self, http2=False, pool_size=POOL_SIZE, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT):
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.http2 = bool(http2) and httpx is not None and h2 is not None
+        self.backend = "httpx" if self.http2 else "requests"
+        self.errors = (requests.RequestException,) + ((httpx.HTTPError,) if httpx is not None else ())
+        self._local = threading.local()
+        self._sessions = []
+        self._sessions_lock = threading.Lock()
+        self._client = None
+        if self.http2:
+            limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+            self._client = httpx.Client(http2=True, limits=limits, headers={"Accept-Encoding": ACCEPT_ENCODING},
+                                        timeout=httpx.Timeout(read_timeout, connect=connect_timeout))
+
+    @classmethod
+    def from_env(cls):
+        """Transport configured by HTTP_HTTP2 and the HTTP_*_TIMEOUT / HTTP_POOL_SIZE settings."""
+        return cls(http2=os.getenv("HTTP_HTTP2", "").lower() in ("1", "true", "yes"))
+
+    @property
+    def session(self):
+        """This thread's requests.Session (requests backend only)."""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=0)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+            self._local.session = session
+            with self._sessions_lock:
+                self._sessions.append(session)
+        return session
+
+    def _timeout(self, timeout):
+        read_timeout = self.read_timeout if timeout is None else timeout
+        if self._client is not None:
+            return httpx.Timeout(read_timeout, connect=self.connect_timeout)
+        return (self.connect_timeout, read_timeout)
+
+    def request(self, method, url, headers=None, data=None, timeout=None):
+        """Send a request and return the response; .status_code, .headers and .content work on both backends."""
+        if self._client is not None:
+            return self._client.request(method, url, headers=headers, content=data, timeout=self._timeout(timeout))
+        return self.session.request(method, url, headers=headers, data=data, timeout=self._timeout(timeout))
+
+    def get(self, url, headers=None, timeout=None):
+        return self.request("GET", url, headers=headers, timeout=timeout)
+
+    def post(self, url, headers=None, data=None, timeout=None):
+        return self.request("POST", url, headers=headers, data=data, timeout=timeout)
+
+    @contextmanager
+    def stream(self, method, url, headers=None, timeout=None, chunk_size=64 * 1024):
+        """Context manager yielding (response, iterator of decoded body chunks) without reading the body first."""
+        if self._client is not None:
+            with self._client.stream(method, url, headers=headers, timeout=self._timeout(timeout)) as response:
+                yield response, response.iter_bytes(chunk_size)
+        else:
+            with self.session.request(method, url, headers=headers, stream=True,
+                                      timeout=self._timeout(timeout)) as response:
+                yield response, response.iter_content(chunk_size=chunk_size)
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+        with self._sessions_lock:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            session.close()
+        self._local = threading.local()
+
+
+_default_transport = None
+_default_lock = threading.Lock()
+
+
+def get_transport():
+    """Process wide transport configured from the environment."""
+    global _default_transport
+    if _default_transport is None:
+        with _default_lock:
+            if _default_transport is None:
+                _default_transport = HttpTransport.from_env()
+    return _default_transport
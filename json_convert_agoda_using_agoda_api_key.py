@@ -1,10 +1,15 @@
-import requests
 import xmltodict
-import json
 from dotenv import load_dotenv
 import os
+import logging
 from sqlalchemy import create_engine
-import pandas as pd
+from response_cache import get_response_cache
+from http_transport import get_transport
+from hotel_mapping import AGODA_MAPPING
+from hotel_db import fetch_column
+from stage_metrics import metrics, start_metrics_reporter, stop_metrics_reporter
+from log_setup import ProgressLog, setup_logging
+import fast_json
 
 load_dotenv()
 
@@ -22,219 +27,94 @@ engine = create_engine(DATABASE_URL)
 
 gtrs_api_key = os.getenv("GTS_API_KEY")
 
+logger = logging.getLogger(__name__)
+
+
+# Overridable so the fetchers can be pointed at mock_provider_server.
+AGODA_FEED_URL = os.getenv(
+    "AGODA_FEED_URL",
+    "https://affiliatefeed.agoda.com/datafeeds/feed/getfeed?apikey={api_key}&mhotel_id={hotel_id}&feed_id=19",
+)
+
 
 def get_xml_to_json_data_for_agoda(api_key, hotel_id):
-    url = f"https://affiliatefeed.agoda.com/datafeeds/feed/getfeed?apikey={api_key}&mhotel_id={hotel_id}&feed_id=19"
-    response = requests.get(url)
+    xml_data = fetch_agoda_feed_xml(api_key, hotel_id)
+    if xml_data is None:
+        return None
+    return parse_agoda_hotel_feed(xml_data, hotel_id)
+
+
+def fetch_agoda_feed_xml(api_key, hotel_id):
+    """Return the raw feed XML, from the response cache when it is configured and still valid."""
+    cache = get_response_cache()
+    cached = cache.get("agoda_feed", hotel_id, allow_stale=True) if cache else None
+    if cached is not None and cached.fresh:
+        metrics.count("cache_hits")
+        return cached.body
 
+    url = AGODA_FEED_URL.format(api_key=api_key, hotel_id=hotel_id)
+    headers = cached.conditional_headers() if cached is not None else {}
+    with metrics.timer("fetch"):
+        response = get_transport().get(url, headers=headers)
+
+    if response.status_code == 304 and cached is not None:
+        cache.touch("agoda_feed", hotel_id)
+        return cached.body
     if response.status_code == 200:
-        xml_data = response.content
+        if cache:
+            cache.put("agoda_feed", hotel_id, response.content,
+                      etag=response.headers.get("ETag"), last_modified=response.headers.get("Last-Modified"))
+        return response.content
+
+    logger.warning("Error fetching data from API for hotel %s: Status code %s", hotel_id, response.status_code)
+    return None
+
+
+def parse_agoda_hotel_feed(xml_data, hotel_id):
+    """Parse a raw Hotel_feed_full XML payload into the specific_data format."""
+    with metrics.timer("parse"):
         data_dict = xmltodict.parse(xml_data)
 
-        # Ensure "Hotel_feed_full" exists in the parsed data
-        hotel_feed_full = data_dict.get("Hotel_feed_full")
-        if hotel_feed_full is None:
-            print(f"Skipping hotel {hotel_id} as 'Hotel_feed_full' is not found.")
-            return None
+    # Ensure "Hotel_feed_full" exists in the parsed data
+    hotel_feed_full = data_dict.get("Hotel_feed_full")
+    if hotel_feed_full is None:
+        logger.debug("Skipping hotel %s as 'Hotel_feed_full' is not found.", hotel_id)
+        return None
 
-        hotel_data = hotel_feed_full.get("hotels", {}).get("hotel", {})
-        
-        if not hotel_data.get("hotel_id"):
-            print(f"Skipping hotel {hotel_id} as 'hotel_id' is not found.")
-            return None
-        
-        specific_data = {
-            "hotel_id": hotel_data["hotel_id"],
-            "name": hotel_data.get("hotel_name", "NULL"),
-            "name_local": hotel_data.get("translated_name", "NULL"),
-            "hotel_formerly_name": hotel_data.get("hotel_formerly_name", "NULL"),
-            "brand_text": "NULL",
-            "property_type": hotel_data.get("accommodation_type", "NULL"),
-            "star_rating": hotel_data.get("star_rating", "NULL"),
-            "chain": "NULL",
-            "brand": "NULL",
-            "logo": "NULL",
-            "primary_photo": "NULL",
-            "review_rating": {
-                "source": "NULL",
-                "number_of_reviews": hotel_data.get("number_of_reviews", "NULL"),
-                "rating_average": hotel_data.get("rating_average", "NULL"),
-                "popularity_score": hotel_data.get("popularity_score", "NULL"),
-            },
-            "policies": {
-                "check_in": {
-                    "begin_time": "NULL",
-                    "end_time": "NULL",
-                    "instructions": "NULL",
-                    "min_age": "NULL",
-                },
-                "checkout": {
-                    "time": "NULL",
-                },
-                "fees": {
-                    "optional": "NULL",
-                },
-                "know_before_you_go": "NULL",
-                "pets": [
-                    "Pets not allowed"
-                ],
-                "remark": "NULL",
-                "child_and_extra_bed_policy": {
-                    "infant_age": hotel_data.get("child_and_extra_bed_policy", {}).get("infant_age", "NULL"),
-                    "children_age_from": hotel_data.get("child_and_extra_bed_policy", {}).get("children_age_from", "NULL"),
-                    "children_age_to": hotel_data.get("child_and_extra_bed_policy", {}).get("children_age_to", "NULL"),
-                    "children_stay_free": hotel_data.get("child_and_extra_bed_policy", {}).get("children_stay_free", "NULL"),
-                    "min_guest_age": hotel_data.get("child_and_extra_bed_policy", {}).get("min_guest_age", "NULL")
-                },
-                "nationality_restrictions": hotel_data.get("nationality_restrictions", "NULL"),
-            },
-            "address": {
-                "latitude": hotel_data.get("latitude", "NULL"),
-                "longitude": hotel_data.get("longitude", "NULL"),
-                "address_line_1": hotel_feed_full.get("addresses", {}).get("address", [{}])[0].get("address_line_1", "NULL"),
-                "address_line_2": hotel_feed_full.get("addresses", {}).get("address", [{}])[0].get("address_line_2", "NULL"),
-                "city": hotel_feed_full.get("addresses", {}).get("address", [{}])[0].get("city", "NULL"),
-                "state": hotel_feed_full.get("addresses", {}).get("address", [{}])[0].get("state", "NULL"),
-                "country": hotel_feed_full.get("addresses", {}).get("address", [{}])[0].get("country", "NULL"),
-                "country_code": "NULL",
-                "postal_code": hotel_feed_full.get("addresses", {}).get("address", [{}])[0].get("postal_code", "NULL"),
-                "full_address": "NULL",
-                "google_map_site_link": "NULL",
-                "local_lang": {
-                    "latitude": hotel_data.get("latitude", "NULL"),
-                    "longitude": hotel_data.get("longitude", "NULL"),
-                    "address_line_1": hotel_feed_full.get("addresses", {}).get("address", [{}])[1].get("address_line_1", "NULL"),
-                    "address_line_2": hotel_feed_full.get("addresses", {}).get("address", [{}])[1].get("address_line_2", "NULL"),
-                    "city": hotel_feed_full.get("addresses", {}).get("address", [{}])[1].get("city", "NULL"),
-                    "state": hotel_feed_full.get("addresses", {}).get("address", [{}])[1].get("state", "NULL"),
-                    "country": hotel_feed_full.get("addresses", {}).get("address", [{}])[1].get("country", "NULL"),
-                    "country_code": "NULL",
-                    "postal_code": hotel_feed_full.get("addresses", {}).get("address", [{}])[1].get("postal_code", "NULL"),
-                    "full_address": "NULL",
-                    "google_map_site_link": "NULL",
-                },
-                "mapping": {
-                    "continent_id": "NULL",
-                    "country_id": "NULL",
-                    "province_id": "NULL",
-                    "state_id": "NULL",
-                    "city_id": "NULL",
-                    "area_id": "NULL"
-                }
-            },
-            "contacts": {
-                "phone_numbers": [],
-                "fax": "NULL",
-                "email_address": "NULL",
-                "website": "NULL"
-            },
-            "descriptions": [
-                {
-                    "title": "NULL",
-                    "text": "NULL"
-                }
-            ],
-            "room_type": [],
-            "spoken_languages": [],
-            "amenities": [],
-            "facilities": [],
-            "hotel_photo": [],
-            "point_of_interests": [],
-            "nearest_airports": [],
-            "train_stations": [],
-            "connected_locations": [],
-            "stadiums": []    
-        }
-
-        # Room types processing
-        if hotel_feed_full.get("roomtypes") is not None:
-            room_types = hotel_feed_full.get("roomtypes", {}).get("roomtype", [])
-            for room in room_types:
-                if isinstance(room, dict):
-                    room_data = {
-                        "room_id": room.get("hotel_room_type_id", "NULL"),
-                        "title": room.get("standard_caption", "NULL"),
-                        "title_lang": room.get("standard_caption", "NULL"),
-                        "room_pic": room.get("hotel_room_type_picture", "NULL"),
-                        "description": "NULL",
-                        "max_allowed": {
-                            "total": int(room.get("max_occupancy_per_room", 0)),
-                            "adults": int(room.get("max_occupancy_per_room", 0)),
-                            "children": "NULL",
-                            "infant": room.get("max_infant_in_room", "NULL"),
-                        },
-                        "no_of_room": room.get("no_of_room", "NULL"),
-                        "room_size": room.get("size_of_room", 0),
-                        "bed_type": [
-                            {
-                                "description": room.get("bed_type", "NULL"),
-                                "configuration": [],
-                                "max_extrabeds": room.get("max_extrabeds", "NULL"),
-                            }
-                        ],
-                        "shared_bathroom": room.get("shared_bathroom", "NULL"),
-                    }
-                    specific_data["room_type"].append(room_data)
-                else:
-                    print(f"Skipping room entry as it is not a dictionary: {room}")
-        else:
-            print(f"Skipping hotel {hotel_id} as 'room_types' is not found")
-
-        # Facilities processing
-        facilities_types = hotel_feed_full.get("facilities")
-        if facilities_types is None:
-            print(f"Skipping hotel {hotel_id} as 'facilities' is ------------------------------------ not found.")
-        else:
-            facilities_types = facilities_types.get("facility", [])
-            if isinstance(facilities_types, list):
-                for facility in facilities_types:
-                    if isinstance(facility, dict):
-                        facilities_data = {
-                            "type": facility.get("property_name", "NULL"),
-                            "title": facility.get("property_group_description", "NULL"),
-                            "icon": facility.get("property_translated_name", "NULL")
-                        }
-                        specific_data["facilities"].append(facilities_data)
-                    else:
-                        print(f"Skipping facility entry as it is not a dictionary: {facility}")
-            else:
-                print(f"No facilities found for hotel {hotel_id}")
-
-        # Hotel photo processing
-        if hotel_feed_full.get("pictures") is not None:
-            hotel_photo_data = hotel_feed_full["pictures"].get("picture", [])
-            for photo in hotel_photo_data:
-                if isinstance(photo, dict):
-                    hotel_photo_data = {  
-                        "picture_id": photo.get("picture_id", "NULL"),
-                        "title": photo.get("caption", "NULL"),
-                        "url": photo.get("URL", "NULL")
-                    }
-                    specific_data["hotel_photo"].append(hotel_photo_data)
-                else:
-                    print(f"Skipping photo entry as it is not a dictionary: {photo}")
-        else:
-            print(f"Skipping hotel {hotel_id} as 'pictures' is not found.")
-
-        return specific_data
-    else:
-        print(f"Error fetching data from API for hotel {hotel_id}: Status code {response.status_code}")
+    return build_agoda_specific_data(hotel_feed_full, hotel_id)
+
+
+def build_agoda_specific_data(hotel_feed_full, hotel_id):
+    """Build the specific_data dict from an already parsed Hotel_feed_full tree."""
+    hotel_data = hotel_feed_full.get("hotels", {}).get("hotel", {})
+    
+    if not hotel_data.get("hotel_id"):
+        logger.debug("Skipping hotel %s as 'hotel_id' is not found.", hotel_id)
         return None
+    
+    with metrics.timer("transform"):
+        return AGODA_MAPPING(feed=hotel_feed_full, hotel=hotel_data, hotel_id=hotel_id)
 
 
-def save_json_to_folder(data, hotel_id, folder_name):
-    if not os.path.exists(folder_name):
+def save_json_to_folder(data, hotel_id, folder_name, archive=None):
+    """Save one hotel as <folder_name>/<hotel_id>.json, or into `archive` (a JsonlShardWriter) when given."""
+    if archive is None and not os.path.exists(folder_name):
         os.makedirs(folder_name)
     
     file_path = os.path.join(folder_name, f"{hotel_id}.json")
     try:
-        with open(file_path, "w") as json_file:
-            json.dump(data, json_file, indent=4)
-        print(f"Data saved to {file_path}")
+        if archive is not None:
+            with metrics.timer("file_write"):
+                archive.write(hotel_id, data)
+            logger.debug("Data saved to %s for hotel %s", archive.directory, hotel_id)
+            return
+        with metrics.timer("file_write"):
+            fast_json.dump_to_file(data, file_path, indent=4)
+        logger.debug("Data saved to %s", file_path)
     except TypeError as e:
-        print(f"Serialization error: {e}")
+        logger.error("Serialization error for hotel %s: %s", hotel_id, e)
     except Exception as e:
-        print(f"An error occurred: {e}")
+        logger.error("An error occurred saving hotel %s: %s", hotel_id, e)
 
         
 # data = get_xml_to_json_data_for_agoda(api_key=gtrs_api_key, hotel_id=15281267)
@@ -243,34 +123,38 @@ def save_json_to_folder(data, hotel_id, folder_name):
 
 
 def get_vervotech_id(engine, table, providerFamily):
-    query = f"SELECT VervotechId FROM {table} WHERE ProviderFamily = '{providerFamily}';"
-    df = pd.read_sql(query, engine)
-    data = df['VervotechId'].tolist()
+    query = f"SELECT VervotechId FROM {table} WHERE ProviderFamily = :providerFamily;"
+    data = fetch_column(engine, query, {"providerFamily": providerFamily})
     return data
 
 
 
-table = "vervotech_mapping"
-providerFamily = "Agoda"
-ids = get_vervotech_id(engine=engine, table=table, providerFamily=providerFamily)
-
-for id in ids:
-    try:
-        hotel_id = int(id)  
-        data = get_xml_to_json_data_for_agoda(api_key=gtrs_api_key, hotel_id=hotel_id)
-
-        if data is None:
-            continue  
-
-        save_json_to_folder(data=data, hotel_id=hotel_id, folder_name=providerFamily)
-        print(f"Completed creating JSON file for hotel {hotel_id}")
-
-    except ValueError:
-        print(f"Skipping invalid id: {id} (cannot convert to int)")
-
+def main():
+    table = "vervotech_mapping"
+    providerFamily = "Agoda"
+    setup_logging()
+    ids = get_vervotech_id(engine=engine, table=table, providerFamily=providerFamily)
+    start_metrics_reporter()
+    progress = ProgressLog(logger, "Agoda hotels", total=len(ids))
 
+    for id in ids:
+        try:
+            hotel_id = int(id)  
+            data = get_xml_to_json_data_for_agoda(api_key=gtrs_api_key, hotel_id=hotel_id)
 
+            if data is None:
+                progress.record(hotel_id, "skipped")
+                continue  
 
+            save_json_to_folder(data=data, hotel_id=hotel_id, folder_name=providerFamily)
+            progress.record(hotel_id, "saved")
 
+        except ValueError:
+            logger.warning("Skipping invalid id: %s (cannot convert to int)", id)
+            progress.record(id, "invalid id")
+    progress.close()
+    stop_metrics_reporter()
 
 
+if __name__ == "__main__":
+    main()
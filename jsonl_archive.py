@@ -0,0 +1,225 @@
+import os
+import re
+import gzip
+import argparse
+import threading
+
+import fast_json
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+SHARD_EXTENSIONS = {None: ".jsonl", "gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}
+INDEX_FILE = "index.tsv"
+
+_SHARD_NAME = re.compile(r"^part-(\d{5})\.jsonl(\.gz|\.zst)?$")
+
+
+def _compressor(compression):
+    if compression is None:
+        return lambda data: data
+    if compression == "gzip":
+        return lambda data: gzip.compress(data, compresslevel=6, mtime=0)
+    if compression == "zstd":
+        if zstandard is None:
+            raise ValueError("zstd compression needs the 'zstandard' package.")
+        return zstandard.ZstdCompressor(level=3).compress
+    raise ValueError(f"Unknown compression: {compression}")
+
+
+def _decompressor(shard_name):
+    if shard_name.endswith(".gz"):
+        return gzip.decompress
+    if shard_name.endswith(".zst"):
+        if zstandard is None:
+            raise ValueError(f"Reading {shard_name} needs the 'zstandard' package.")
+        return zstandard.ZstdDecompressor().decompress
+    return lambda data: data
+
+
+def _load_index(directory):
+    """{id: (shard, offset, length)} from the index file; later lines win, a torn last line is ignored."""
+    index = {}
+    path = os.path.join(directory, INDEX_FILE)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as index_file:
+            for line in index_file:
+                if not line.endswith("\n"):
+                    break
+                item_id, shard, offset, length = line.rstrip("\n").split("\t")
+                index[item_id] = (shard, int(offset), int(length))
+    return index
+
+
+class JsonlShardWriter:
+    """Write hotels as compact JSON Lines into size-bounded shard files.
+
+    Every record is appended to the current part-NNNNN.jsonl shard and its
+    (shard, offset, length) is written to index.tsv, so the archive can be
+    streamed shard by shard or read one hotel at a time. With gzip or zstd each
+    record is its own compressed member/frame: the shard still decompresses as a
+    whole and a single record can be decompressed from its offset alone.
+
+    Reopening an existing archive continues in a new shard; ids written again
+    supersede their earlier records. write() may be called from several threads.
+    """
+
+    def __init__(self, directory, shard_size=256 * 1024 * 1024, compression=None, flush_every=1000):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.shard_size = shard_size
+        self.compression = compression
+        self.flush_every = flush_every
+        self.written = 0
+        self._compress = _compressor(compression)
+        self._index = _load_index(directory)
+        self._lock = threading.Lock()
+
+        shard_numbers = [int(match.group(1)) for match in map(_SHARD_NAME.match, os.listdir(directory)) if match]
+        self._next_shard = max(shard_numbers, default=-1) + 1
+        self._shard = None
+        self._shard_name = None
+        self._index_file = open(os.path.join(directory, INDEX_FILE), "a", encoding="utf-8")
+        self._unflushed = 0
+
+    def __contains__(self, item_id):
+        return str(item_id) in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def _open_next_shard(self):
+        if self._shard is not None:
+            self._shard.close()
+        self._shard_name = f"part-{self._next_shard:05d}{SHARD_EXTENSIONS[self.compression]}"
+        self._next_shard += 1
+        self._shard = open(os.path.join(self.directory, self._shard_name), "wb")
+
+    def write(self, item_id, data):
+        """Append one record; `data` is serialized as compact JSON."""
+        self.write_text(item_id, fast_json.dumps(data, ensure_ascii=False))
+
+    def write_text(self, item_id, text):
+        """Append one already serialized JSON document (it must not contain raw newlines)."""
+        record = self._compress(f"{text}\n".encode("utf-8"))
+        item_id = str(item_id)
+        with self._lock:
+            if self._shard is None or self._shard.tell() >= self.shard_size:
+                self._open_next_shard()
+            offset = self._shard.tell()
+            self._shard.write(record)
+            self._index_file.write(f"{item_id}\t{self._shard_name}\t{offset}\t{len(record)}\n")
+            self._index[item_id] = (self._shard_name, offset, len(record))
+            self.written += 1
+            self._unflushed += 1
+            if self._unflushed >= self.flush_every:
+                self._flush()
+
+    def _flush(self):
+        # Records reach disk before the index lines pointing at them.
+        if self._shard is not None:
+            self._shard.flush()
+            os.fsync(self._shard.fileno())
+        self._index_file.flush()
+        os.fsync(self._index_file.fileno())
+        self._unflushed = 0
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        with self._lock:
+            if self._index_file.closed:
+                return
+            self._flush()
+            if self._shard is not None:
+                self._shard.close()
+            self._index_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class JsonlShardReader:
+    """Random and sequential access to an archive written by JsonlShardWriter."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._index = _load_index(directory)
+        self._handles = {}
+
+    def __contains__(self, item_id):
+        return str(item_id) in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def ids(self):
+        return list(self._index)
+
+    def shards(self):
+        return sorted({location[0] for location in self._index.values()})
+
+    def _read(self, shard, offset, length):
+        handle = self._handles.get(shard)
+        if handle is None:
+            handle = self._handles[shard] = open(os.path.join(self.directory, shard), "rb")
+        handle.seek(offset)
+        return _decompressor(shard)(handle.read(length))
+
+    def get(self, item_id, default=None):
+        location = self._index.get(str(item_id))
+        if location is None:
+            return default
+        return fast_json.loads(self._read(*location))
+
+    def __iter__(self):
+        """Yield (id, data) for the current record of every id, in shard and offset order."""
+        for item_id, location in sorted(self._index.items(), key=lambda item: item[1]):
+            yield item_id, fast_json.loads(self._read(*location))
+
+    def close(self):
+        for handle in self._handles.values():
+            handle.close()
+        self._handles = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def add_archive_arguments(parser):
+    """The --archive options shared by the export scripts."""
+    parser.add_argument("--archive", default=None,
+                        help="Write JSON Lines shards with an id index into this directory instead of one file per hotel.")
+    parser.add_argument("--compression", choices=["gzip", "zstd"], default=None, help="Compress --archive records.")
+    parser.add_argument("--shard-size-mb", type=int, default=256, help="Start a new --archive shard after this size.")
+
+
+def open_archive(args):
+    """JsonlShardWriter for parsed add_archive_arguments options, or None when --archive is not set."""
+    if not args.archive:
+        return None
+    return JsonlShardWriter(args.archive, shard_size=args.shard_size_mb * 1024 * 1024, compression=args.compression)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect a JSON Lines hotel archive.")
+    parser.add_argument("directory")
+    parser.add_argument("--get", default=None, help="Print the record for this id.")
+    args = parser.parse_args()
+
+    with JsonlShardReader(args.directory) as reader:
+        if args.get is not None:
+            print(fast_json.dumps(reader.get(args.get), indent=4))
+        else:
+            print(f"{len(reader)} records in {len(reader.shards())} shards")
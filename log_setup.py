@@ -0,0 +1,178 @@
+import os
+import sys
+import time
+import queue
+import atexit
+import logging
+import threading
+from multiprocessing import util
+from logging.handlers import QueueHandler, QueueListener
+
+
+LOG_FORMAT = "%(asctime)s %(levelname)-7s %(processName)s %(name)s: %(message)s"
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FILE = os.getenv("LOG_FILE")
+# Records waiting for the writer thread; beyond this they are dropped instead of blocking the caller.
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# At most LOG_RATE_LIMIT records per message template and LOG_RATE_INTERVAL seconds (0 disables).
+LOG_RATE_LIMIT = int(os.getenv("LOG_RATE_LIMIT", "20"))
+LOG_RATE_INTERVAL = float(os.getenv("LOG_RATE_INTERVAL", "10"))
+# Seconds between the aggregated per-record progress lines of ProgressLog.
+LOG_PROGRESS_INTERVAL = float(os.getenv("LOG_PROGRESS_INTERVAL", "10"))
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops (and counts) records when the queue is full instead of blocking."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class RateLimitFilter(logging.Filter):
+    """Pass at most `limit` records per (logger, message template) every `interval` seconds.
+
+    Per-record messages are logged with %-style arguments, so all "No hotel
+    information found for systemID: %s" records share one template. The first
+    record let through after a suppressed run notes how many were dropped.
+    DEBUG records are never limited: LOG_LEVEL=DEBUG asks for every one of them.
+    """
+
+    def __init__(self, limit=LOG_RATE_LIMIT, interval=LOG_RATE_INTERVAL):
+        super().__init__()
+        self.limit = limit
+        self.interval = interval
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if not self.limit or record.levelno < logging.INFO:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            if len(self._windows) > 10000:
+                # Messages built with f-strings are all distinct templates; do not let them grow this forever.
+                self._windows.clear()
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window is not None else 0
+                self._windows[key] = [now, 1, 0]
+            elif window[1] < self.limit:
+                window[1] += 1
+                suppressed = 0
+            else:
+                window[2] += 1
+                return False
+        if suppressed:
+            record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+        return True
+
+
+_listener = None
+_handler = None
+_pid = None
+
+
+def setup_logging(level=None, log_file=None):
+    """Send all logging through a non-blocking queue to a writer thread (stdout plus LOG_FILE, if set).
+
+    Callers only pay for putting a record on the queue; formatting and the
+    actual writes happen on the listener thread. Safe to call more than once;
+    a forked child process calling it gets its own queue and listener.
+    """
+    global _listener, _handler, _pid
+    level = level or LOG_LEVEL
+    root = logging.getLogger()
+    root.setLevel(level)
+    if _pid == os.getpid():
+        return _handler
+    if _handler is not None:
+        # Inherited from the parent process, whose listener thread does not exist here.
+        root.removeHandler(_handler)
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [logging.StreamHandler(sys.stdout)]
+    log_file = log_file or LOG_FILE
+    if log_file:
+        directory = os.path.dirname(log_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        handlers.append(logging.FileHandler(log_file, encoding="utf-8"))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _handler = DroppingQueueHandler(log_queue)
+    _handler.addFilter(RateLimitFilter())
+    root.addHandler(_handler)
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    _pid = os.getpid()
+    atexit.register(shutdown_logging)
+    # multiprocessing children leave through os._exit and skip atexit, but do run these.
+    util.Finalize(None, shutdown_logging, exitpriority=0)
+    return _handler
+
+
+def shutdown_logging():
+    """Drain the queue and stop the writer thread."""
+    global _listener
+    if _listener is not None and _pid == os.getpid():
+        _listener.stop()
+        if _handler.dropped:
+            sys.stderr.write(f"log_setup: dropped {_handler.dropped} records on a full log queue\n")
+    _listener = None
+
+
+class ProgressLog:
+    """Aggregate per-record outcomes into one INFO line every `interval` seconds.
+
+    record(key, status) counts the status and logs the record itself at DEBUG, so
+    hot loops no longer write a line per hotel unless LOG_LEVEL=DEBUG.
+    """
+
+    def __init__(self, logger, label="records", total=None, interval=None):
+        self.logger = logger
+        self.label = label
+        self.total = total
+        self.interval = LOG_PROGRESS_INTERVAL if interval is None else interval
+        self.counts = {}
+        self.processed = 0
+        self._started = self._last_report = time.monotonic()
+        self._last_processed = 0
+        self._lock = threading.Lock()
+
+    def record(self, key, status):
+        with self._lock:
+            self.counts[status] = self.counts.get(status, 0) + 1
+            self.processed += 1
+            due = time.monotonic() - self._last_report >= self.interval
+        self.logger.debug("%s %s: %s", self.label, key, status)
+        if due:
+            self.report()
+
+    def report(self):
+        with self._lock:
+            now = time.monotonic()
+            elapsed = max(now - self._last_report, 1e-9)
+            rate = (self.processed - self._last_processed) / elapsed
+            self._last_report, self._last_processed = now, self.processed
+            counts = ", ".join(f"{status} {count}" for status, count in sorted(self.counts.items()))
+            processed = self.processed
+        total = f"/{self.total}" if self.total is not None else ""
+        self.logger.info("%s %d%s (%.1f/s): %s", self.label, processed, total, rate, counts)
+
+    def close(self):
+        """Log the final counts and overall rate."""
+        elapsed = max(time.monotonic() - self._started, 1e-9)
+        counts = ", ".join(f"{status} {count}" for status, count in sorted(self.counts.items()))
+        self.logger.info("%s done: %d in %.1f s (%.1f/s): %s", self.label, self.processed, elapsed,
+                         self.processed / elapsed, counts)
@@ -0,0 +1,297 @@
+import json
+import time
+import random
+import zlib
+import argparse
+import threading
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from response_cache import ResponseCache
+
+
+class MockSettings:
+    """Behaviour of the stand-in GI / Agoda server.
+
+    `latency_ms` +- `jitter_ms` is slept before every answer. `error_rate` of the
+    requests get a 500, and above `rate_limit` requests/second the server answers
+    429 like the real APIs do. `miss_rate` of the hotels and cities are unknown.
+    """
+
+    def __init__(self, latency_ms=20.0, jitter_ms=10.0, error_rate=0.0, rate_limit=0.0, miss_rate=0.0,
+                 hotels_per_destination=50, images=20, sample="10000072.json", feed_scale=1, recordings=None, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.miss_rate = miss_rate
+        self.hotels_per_destination = hotels_per_destination
+        self.images = images
+        self.sample = sample
+        self.feed_scale = feed_scale
+        self.recordings = recordings
+        self.seed = seed
+
+
+def _stable_fraction(*parts):
+    """Deterministic float in [0, 1) for an id, so a hotel is missing on every run or on none."""
+    return zlib.crc32("\t".join(str(part) for part in parts).encode("utf-8")) / 2 ** 32
+
+
+def synthetic_hotel_info(system_id, images=20):
+    """A HotelInfo object shaped like GI's, with the keys the exporters read."""
+    rng = random.Random(f"hotel-{system_id}")
+    city = rng.choice(["Dubai", "Abu Dhabi", "Sharjah", "Moscow", "Dhaka"])
+    return {
+        "systemId": str(system_id),
+        "name": f"Hotel {system_id}",
+        "rating": str(rng.randint(1, 5)),
+        "tripAdvisorRating": str(round(rng.uniform(2.5, 5.0), 1)),
+        "giDestinationId": str(rng.randint(1000, 9999)),
+        "address": {
+            "line1": f"{rng.randint(1, 999)} Sheikh Zayed Road",
+            "line2": "Trade Centre",
+            "cityName": city,
+            "stateName": city,
+            "countryName": "United Arab Emirates",
+            "countryCode": "AE",
+            "zipCode": str(rng.randint(10000, 99999)),
+        },
+        "geocode": {"lat": str(round(rng.uniform(24, 26), 6)), "lon": str(round(rng.uniform(54, 56), 6))},
+        "contact": {"phoneNo": f"+971 4 {rng.randint(1000000, 9999999)}", "website": f"https://hotel{system_id}.example"},
+        "imageUrls": [f"https://images.example/{system_id}/{index}.jpg" for index in range(images)],
+        "masterHotelAmenities": ["Free WiFi", "Swimming pool", "Fitness centre", "Restaurant", "Airport shuttle",
+                                 "Spa", "Parking", "Bar", "24-hour front desk", "Laundry"],
+        "masterRoomAmenities": ["Air conditioning", "Minibar", "Safe", "Flat-screen TV", "Bathtub"],
+        "description": "A comfortable city hotel close to the business district. " * 10,
+    }
+
+
+def synthetic_destination_hotels(destination_id, count):
+    """HotelsInfoByDestinationId entries with every field bulk_insert_hotels_into_db requires."""
+    rng = random.Random(f"destination-{destination_id}")
+    hotels = []
+    for index in range(count):
+        system_id = f"{destination_id}{index:05d}"
+        hotels.append({
+            "giDestinationId": str(destination_id),
+            "name": f"Hotel {system_id}",
+            "systemId": system_id,
+            "rating": str(rng.randint(1, 5)),
+            "city": f"City {destination_id}",
+            "address1": f"{rng.randint(1, 999)} Main Street",
+            "address2": "Downtown",
+            "imageUrl": f"https://images.example/{system_id}/0.jpg",
+            "geoCode": {"lat": str(round(rng.uniform(-60, 60), 6)), "lon": str(round(rng.uniform(-180, 180), 6))},
+        })
+    return hotels
+
+
+class MockProviderServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops SYNs when a pipeline opens its whole pool at once.
+    request_queue_size = 256
+
+    def __init__(self, address, settings):
+        super().__init__(address, MockProviderHandler)
+        self.settings = settings
+        self.recordings = ResponseCache(settings.recordings, ttl=float("inf")) if settings.recordings else None
+        self.random = random.Random(settings.seed)
+        self.lock = threading.Lock()
+        self.stats = {}
+        self._allowance = settings.rate_limit
+        self._last_check = time.monotonic()
+        self._feed_template = None
+        self._sample_hotel_id = None
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def throttled(self):
+        """Token bucket of `rate_limit` requests/second; True when this request should get a 429."""
+        if not self.settings.rate_limit:
+            return False
+        with self.lock:
+            now = time.monotonic()
+            self._allowance = min(self.settings.rate_limit,
+                                  self._allowance + (now - self._last_check) * self.settings.rate_limit)
+            self._last_check = now
+            if self._allowance < 1:
+                return True
+            self._allowance -= 1
+            return False
+
+    def failed(self):
+        with self.lock:
+            return self.random.random() < self.settings.error_rate
+
+    def delay(self):
+        settings = self.settings
+        with self.lock:
+            jitter = self.random.uniform(-settings.jitter_ms, settings.jitter_ms)
+        return max(0.0, settings.latency_ms + jitter) / 1000
+
+    def recorded(self, provider, key):
+        if self.recordings is None:
+            return None
+        cached = self.recordings.get(provider, key, allow_stale=True)
+        return cached.body if cached is not None else None
+
+    def feed_template(self):
+        """The Agoda sample feed, built on the first /getfeed so a GI-only run never loads the Agoda modules."""
+        with self.lock:
+            if self._feed_template is None:
+                from benchmark_agoda_parser import build_sample_feed
+                with open(self.settings.sample) as f:
+                    self._sample_hotel_id = str(json.load(f)["hotel_id"])
+                self._feed_template = build_sample_feed(self.settings.sample, scale=self.settings.feed_scale)
+            return self._feed_template
+
+    def agoda_feed(self, hotel_id):
+        body = self.recorded("agoda_feed", hotel_id)
+        if body is not None:
+            return body
+        return self.feed_template().replace(f"<hotel_id>{self._sample_hotel_id}</hotel_id>".encode(),
+                                           f"<hotel_id>{hotel_id}</hotel_id>".encode(), 1)
+
+
+class MockProviderHandler(BaseHTTPRequestHandler):
+    """Routes the GI endpoints the fetchers call plus the Agoda getfeed URL."""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, kept-alive connections stall on delayed ACKs.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b"", content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if status == 429:
+            self.send_header("Retry-After", "1")
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.count(status)
+
+    def _send_json(self, obj):
+        self._send(200, json.dumps(obj).encode("utf-8"))
+
+    def _admit(self):
+        """Apply latency, 429s and injected 500s; False when the request has already been answered."""
+        server = self.server
+        if server.throttled():
+            self._send(429, b'{"message": "Too Many Requests"}')
+            return False
+        time.sleep(server.delay())
+        if server.failed():
+            self._send(500, b'{"message": "Internal Server Error"}')
+            return False
+        return True
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/stats":
+            with self.server.lock:
+                stats = {str(key): value for key, value in self.server.stats.items()}
+            self._send_json(stats)
+            return
+        if not url.path.endswith("/getfeed"):
+            self._send(404)
+            return
+
+        self.server.count("agoda_feed")
+        if not self._admit():
+            return
+        hotel_id = parse_qs(url.query).get("mhotel_id", [""])[0]
+        if _stable_fraction("agoda", hotel_id) < self.server.settings.miss_rate:
+            self._send(200, b"<error>No data</error>", content_type="application/xml")
+            return
+        self._send(200, self.server.agoda_feed(hotel_id), content_type="application/xml")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        path = urlsplit(self.path).path
+        endpoint = path.rsplit("/Hotel/", 1)[-1]
+        settings = self.server.settings
+        if endpoint not in ("HotelInfo", "HotelsInfoByDestinationId", "DestinationInfo"):
+            self._send(404)
+            return
+
+        self.server.count(endpoint)
+        if not self._admit():
+            return
+
+        if endpoint == "HotelInfo":
+            system_id = payload.get("hotelCode")
+            body = self.server.recorded("gi_hotel_info", system_id)
+            if body is not None:
+                self._send(200, body)
+            elif _stable_fraction("hotel", system_id) < settings.miss_rate:
+                self._send_json({"isSuccess": False, "hotelInformation": None})
+            else:
+                self._send_json({"isSuccess": True,
+                                 "hotelInformation": synthetic_hotel_info(system_id, settings.images)})
+        elif endpoint == "HotelsInfoByDestinationId":
+            destination_id = payload.get("destinationCode")
+            if _stable_fraction("destination", destination_id) < settings.miss_rate:
+                self._send_json({"isSuccess": False, "hotelsInformation": []})
+            else:
+                hotels = synthetic_destination_hotels(destination_id, settings.hotels_per_destination)
+                self._send_json({"isSuccess": True, "hotelsInformation": hotels})
+        else:
+            city = payload.get("destination")
+            if _stable_fraction("city", city) < settings.miss_rate:
+                self._send_json({"isSuccess": False, "data": []})
+            else:
+                gi_destination_id = str(1000 + zlib.crc32(str(city).casefold().encode("utf-8")) % 900000)
+                self._send_json({"isSuccess": True, "data": [{"giDestinationId": gi_destination_id}]})
+
+
+def start_mock_server(settings, host="localhost", port=0):
+    """Start the server on a background thread; returns it (the port is server.server_address[1])."""
+    server = MockProviderServer((host, port), settings)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_mock_arguments(parser):
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Mean simulated response time.")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="Uniform +- spread around the latency.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with a 500.")
+    parser.add_argument("--rate-limit", type=float, default=0.0,
+                        help="Requests/second above which the server answers 429 (0 disables).")
+    parser.add_argument("--miss-rate", type=float, default=0.0, help="Fraction of hotels and cities that are unknown.")
+    parser.add_argument("--hotels-per-destination", type=int, default=50)
+    parser.add_argument("--images", type=int, default=20, help="imageUrls per synthetic HotelInfo.")
+    parser.add_argument("--sample", default="10000072.json", help="Exported hotel JSON the Agoda feed is built from.")
+    parser.add_argument("--feed-scale", type=int, default=1, help="Multiply rooms, facilities and pictures in feeds.")
+    parser.add_argument("--recordings", default=None,
+                        help="response_cache directory whose gi_hotel_info / agoda_feed entries are replayed.")
+
+
+def settings_from_args(args):
+    return MockSettings(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                        rate_limit=args.rate_limit, miss_rate=args.miss_rate,
+                        hotels_per_destination=args.hotels_per_destination, images=args.images, sample=args.sample,
+                        feed_scale=args.feed_scale, recordings=args.recordings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stand-in GI and Agoda API server for local benchmarks.")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8765)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockProviderServer((args.host, args.port), settings_from_args(args))
+    base = f"http://{args.host}:{server.server_address[1]}"
+    print(f"GI_API_BASE_URL={base}/api")
+    print(f"AGODA_FEED_URL={base}/datafeeds/feed/getfeed?apikey={{api_key}}&mhotel_id={{hotel_id}}&feed_id=19")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
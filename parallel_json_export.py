@@ -0,0 +1,233 @@
+import os
+import time
+import queue
+import logging
+import argparse
+import threading
+from multiprocessing import Pool
+
+from export_fingerprints import FingerprintStore, row_fingerprint
+from jsonl_archive import add_archive_arguments, open_archive
+from stage_metrics import metrics, start_metrics_reporter, stop_metrics_reporter
+from log_setup import setup_logging
+import fast_json
+
+
+logger = logging.getLogger(__name__)
+
+_build_func = None
+_indent = 4
+
+
+def _init_worker(build_func, indent):
+    global _build_func, _indent
+    _build_func = build_func
+    _indent = indent
+    # Forked workers inherit a queue handler whose listener thread only runs in the parent.
+    setup_logging()
+
+
+def _transform(hotel_data):
+    """Build and serialize one hotel in a pool worker; returns (SystemId, text, error, seconds).
+
+    The time is returned rather than recorded because the worker's metrics are not
+    visible to the parent process.
+    """
+    systemid = hotel_data.get("SystemId")
+    start = time.perf_counter()
+    try:
+        data_dict = _build_func(hotel_data)
+        if data_dict is None:
+            return systemid, None, "no data", time.perf_counter() - start
+        text = fast_json.dumps(data_dict, indent=_indent, ensure_ascii=_indent is not None)
+        return systemid, text, None, time.perf_counter() - start
+    except Exception as e:
+        return systemid, None, str(e), time.perf_counter() - start
+
+
+class BatchFileWriter:
+    """Write (file_path, text) pairs from a background thread, one batch at a time.
+
+    `on_written`, if given, is called from the writer thread with each file's key
+    once that file has been written. With a JsonlShardWriter as `archive`, texts
+    are appended to it under their key and file_path is ignored.
+    """
+
+    def __init__(self, batch_size=500, max_pending_batches=8, on_written=None, archive=None):
+        self.batch_size = batch_size
+        self.on_written = on_written
+        self.archive = archive
+        self.written = 0
+        self.failed = 0
+        self._batch = []
+        self._queue = queue.Queue(maxsize=max_pending_batches)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def add(self, file_path, text, key=None):
+        self._batch.append((file_path, text, key))
+        if len(self._batch) >= self.batch_size:
+            self._queue.put(self._batch)
+            self._batch = []
+
+    def close(self):
+        if self._batch:
+            self._queue.put(self._batch)
+            self._batch = []
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            batch = self._queue.get()
+            metrics.gauge("write_queue", self._queue.qsize())
+            if batch is None:
+                return
+            for file_path, text, key in batch:
+                try:
+                    with metrics.timer("file_write"):
+                        if self.archive is not None:
+                            self.archive.write_text(key, text)
+                        else:
+                            with open(file_path, "w") as json_file:
+                                json_file.write(text)
+                    self.written += 1
+                except OSError as e:
+                    self.failed += 1
+                    logger.error("Error writing %s: %s", file_path, e)
+                    continue
+                if self.on_written is not None:
+                    self.on_written(key)
+
+
+def run_parallel_export(rows, build_func, folder_path, workers=None, chunksize=64, write_batch_size=500,
+                        skip_existing=False, indent=4, report_every=10.0, fingerprints=None, salt="", archive=None):
+    """Export hotel rows to JSON files through a reader -> transform pool -> writer pipeline.
+
+    `rows` is any iterable of row dicts or HotelRecords (read in the main process),
+    `build_func` a module level function turning one row into the specific_data dict. Building and
+    json serialization run in a pool of `workers` processes; files are written in
+    batches by a background thread. With a FingerprintStore only new or changed
+    rows are exported. With a JsonlShardWriter as `archive`, compact JSON is
+    appended to its shards instead of writing files. Returns a dict of counters.
+    """
+    if archive is not None:
+        indent = None
+    else:
+        os.makedirs(folder_path, exist_ok=True)
+    stats = {"read": 0, "skipped": 0, "unchanged": 0, "failed": 0, "written": 0}
+    pending_fingerprints = {}
+
+    def pending_rows():
+        for hotel_data in rows:
+            stats["read"] += 1
+            systemid = hotel_data["SystemId"]
+            if fingerprints is not None:
+                fingerprint = row_fingerprint(hotel_data, salt=salt)
+                if fingerprints.is_unchanged(systemid, fingerprint):
+                    stats["unchanged"] += 1
+                    continue
+                pending_fingerprints[systemid] = fingerprint
+            elif skip_existing and (systemid in archive if archive is not None
+                                    else os.path.exists(os.path.join(folder_path, f"{systemid}.json"))):
+                stats["skipped"] += 1
+                continue
+            yield hotel_data
+
+    def on_written(systemid):
+        fingerprint = pending_fingerprints.pop(systemid, None)
+        if fingerprint is not None:
+            fingerprints.update(systemid, fingerprint)
+
+    start_time = time.time()
+    last_report = start_time
+    writer = BatchFileWriter(batch_size=write_batch_size, on_written=on_written if fingerprints is not None else None,
+                             archive=archive)
+
+    try:
+        with Pool(processes=workers, initializer=_init_worker, initargs=(build_func, indent)) as pool:
+            for systemid, text, error, seconds in pool.imap_unordered(_transform, pending_rows(), chunksize=chunksize):
+                metrics.observe("transform", seconds, error=error is not None)
+                if error is not None:
+                    stats["failed"] += 1
+                    pending_fingerprints.pop(systemid, None)
+                    logger.warning("Error occurred while processing SystemId %s: %s", systemid, error)
+                    continue
+
+                writer.add(os.path.join(folder_path, f"{systemid}.json"), text, key=systemid)
+
+                now = time.time()
+                if now - last_report >= report_every:
+                    last_report = now
+                    elapsed = now - start_time
+                    logger.info("Progress: read %d, written %d (%.1f files/sec)",
+                                stats['read'], writer.written, writer.written / elapsed)
+    finally:
+        # Drain and stop the writer thread even when the pool loop raises.
+        writer.close()
+    stats["written"] = writer.written
+    stats["failed"] += writer.failed
+
+    total_time = time.time() - start_time
+    rate = stats["written"] / total_time if total_time > 0 else 0.0
+    logger.info("Export finished: %s in %.2f seconds (%.1f files/sec)", stats, total_time, rate)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export hotel_info_all to JSON files using a process pool.")
+    parser.add_argument("--format", choices=["content", "convert"], default="content",
+                        help="'content' uses content_create_with_json_file's schema, 'convert' uses Convert_json_file's.")
+    parser.add_argument("--folder", default="./gill_hotel_json_files/AE")
+    parser.add_argument("--country-code", default=None)
+    parser.add_argument("--batch-size", type=int, default=5000, help="Rows per database round-trip.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Transform processes.")
+    parser.add_argument("--chunksize", type=int, default=64, help="Rows handed to a worker at a time.")
+    parser.add_argument("--write-batch-size", type=int, default=500, help="Files created per writer batch.")
+    parser.add_argument("--skip-existing", action="store_true", help="Do not regenerate files that already exist.")
+    parser.add_argument("--changed-only", action="store_true",
+                        help="Regenerate only hotels whose source row changed since the last export.")
+    parser.add_argument("--fingerprints", default=None,
+                        help="Fingerprint file for --changed-only (defaults to checkpoints/<folder name>.fingerprints).")
+    add_archive_arguments(parser)
+    args = parser.parse_args()
+
+    setup_logging()
+    from content_create_with_json_file import engine, table_main, iter_hotel_rows_in_batches
+    if args.format == "content":
+        from content_create_with_json_file import build_specific_data, EXPORT_SCHEMA_VERSION
+    else:
+        from Convert_json_file import build_specific_data, EXPORT_SCHEMA_VERSION
+
+    fingerprints = None
+    if args.changed_only:
+        fingerprint_path = args.fingerprints or os.path.join(
+            "checkpoints", f"{os.path.basename(os.path.normpath(args.folder))}.fingerprints")
+        fingerprints = FingerprintStore(fingerprint_path)
+    archive = open_archive(args)
+
+    rows = iter_hotel_rows_in_batches(table_main, engine, country_code=args.country_code, batch_size=args.batch_size)
+    start_metrics_reporter()
+    try:
+        run_parallel_export(
+            rows,
+            build_specific_data,
+            args.folder,
+            workers=args.workers,
+            chunksize=args.chunksize,
+            write_batch_size=args.write_batch_size,
+            skip_existing=args.skip_existing,
+            fingerprints=fingerprints,
+            salt=EXPORT_SCHEMA_VERSION,
+            archive=archive,
+        )
+    finally:
+        if archive is not None:
+            archive.close()
+        if fingerprints is not None:
+            fingerprints.close()
+        stop_metrics_reporter()
+
+
+if __name__ == "__main__":
+    main()
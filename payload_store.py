@@ -0,0 +1,152 @@
+import os
+import zlib
+import hashlib
+import logging
+import argparse
+from sqlalchemy import text, inspect
+
+from hotel_db import iter_keyset_batches
+from log_setup import setup_logging
+
+
+payload_table = 'hotel_info_payload'
+
+logger = logging.getLogger(__name__)
+
+# Column of hotel_info_all holding the sha256 of the payload kept in the side table.
+POINTER_COLUMN = 'HotelInfoSha256'
+
+UPSERT_PAYLOAD = {
+    "mysql": """
+        INSERT INTO {table} (SystemId, Sha256, Payload)
+        VALUES (:SystemId, :HotelInfoSha256, :Payload)
+        ON DUPLICATE KEY UPDATE
+            Sha256 = VALUES(Sha256),
+            Payload = VALUES(Payload)
+    """,
+    "sqlite": """
+        INSERT INTO {table} (SystemId, Sha256, Payload)
+        VALUES (:SystemId, :HotelInfoSha256, :Payload)
+        ON CONFLICT (SystemId) DO UPDATE SET
+            Sha256 = excluded.Sha256,
+            Payload = excluded.Payload
+    """,
+}
+
+
+class PayloadStore:
+    """Raw HotelInfo payloads kept zlib-compressed in a side table keyed by SystemId.
+
+    With a store, hotel_info_all keeps only its scalar columns plus the payload's
+    sha256 in POINTER_COLUMN, and HotelInfo is left NULL, so the status and
+    CountryCode scans over hotel_info_all no longer drag the JSON along. Readers
+    put the payload back with fill_hotel_info().
+    """
+
+    def __init__(self, engine, table=payload_table, level=6):
+        self.engine = engine
+        self.table = table
+        self.level = level
+        self._upsert = text(UPSERT_PAYLOAD[engine.dialect.name].format(table=table))
+
+    @classmethod
+    def from_env(cls, engine):
+        """Store enabled by HOTEL_INFO_PAYLOAD_STORE=1 (table name from HOTEL_INFO_PAYLOAD_TABLE), or None."""
+        if os.getenv("HOTEL_INFO_PAYLOAD_STORE", "").lower() not in ("1", "true", "yes"):
+            return None
+        return cls(engine, table=os.getenv("HOTEL_INFO_PAYLOAD_TABLE", payload_table))
+
+    def ensure_schema(self):
+        """Create the side table and add POINTER_COLUMN to hotel_info_all when they are missing."""
+        blob_type = "LONGBLOB" if self.engine.dialect.name == "mysql" else "BLOB"
+        with self.engine.begin() as connection:
+            connection.execute(text(f"""
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    SystemId VARCHAR(64) NOT NULL PRIMARY KEY,
+                    Sha256 CHAR(64) NOT NULL,
+                    Payload {blob_type} NOT NULL
+                )
+            """))
+            columns = {column["name"] for column in inspect(connection).get_columns("hotel_info_all")}
+            if POINTER_COLUMN not in columns:
+                connection.execute(text(f"ALTER TABLE hotel_info_all ADD COLUMN {POINTER_COLUMN} CHAR(64) NULL"))
+
+    def encode(self, payload):
+        """(sha256 hex digest, compressed bytes) of a JSON text payload."""
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        return hashlib.sha256(payload).hexdigest(), zlib.compress(payload, self.level)
+
+    def write(self, connection, params):
+        """Upsert the payloads of hotel_info_update_params() rows that carry one, inside the caller's transaction."""
+        rows = [row for row in params if row.get("Payload") is not None]
+        if rows:
+            connection.execute(self._upsert, rows)
+
+    def get_many(self, system_ids):
+        """Payload JSON text per SystemId for the ids that have one."""
+        system_ids = [str(system_id) for system_id in system_ids]
+        if not system_ids:
+            return {}
+        placeholders = ", ".join(f":id{index}" for index in range(len(system_ids)))
+        query = text(f"SELECT SystemId, Payload FROM {self.table} WHERE SystemId IN ({placeholders})")
+        params = {f"id{index}": system_id for index, system_id in enumerate(system_ids)}
+        with self.engine.connect() as connection:
+            rows = connection.execute(query, params).all()
+        return {system_id: zlib.decompress(payload).decode("utf-8") for system_id, payload in rows}
+
+    def get(self, system_id):
+        return self.get_many([system_id]).get(str(system_id))
+
+    def fill_hotel_info(self, records):
+        """Load HotelInfo from the store into the records (HotelRecords or dicts) whose column is empty."""
+        missing = [record for record in records if record.get("HotelInfo") is None]
+        if not missing:
+            return records
+        payloads = self.get_many(record["SystemId"] for record in missing)
+        for record in missing:
+            payload = payloads.get(str(record["SystemId"]))
+            if payload is None:
+                continue
+            if isinstance(record, dict):
+                record["HotelInfo"] = payload
+            else:
+                record.HotelInfo = payload
+        return records
+
+    def migrate(self, chunk_size=500):
+        """Move HotelInfo JSON already in hotel_info_all into the store, one SystemId chunk per transaction."""
+        update_pointer = text(f"""
+            UPDATE hotel_info_all
+            SET HotelInfo = NULL, {POINTER_COLUMN} = :HotelInfoSha256
+            WHERE SystemId = :SystemId
+        """)
+        moved = 0
+        for batch in iter_keyset_batches(self.engine, "hotel_info_all", ["SystemId", "HotelInfo"], key="SystemId",
+                                         where="HotelInfo IS NOT NULL", batch_size=chunk_size):
+            params = []
+            for system_id, hotel_info in batch:
+                digest, payload = self.encode(hotel_info)
+                params.append({"SystemId": system_id, "HotelInfoSha256": digest, "Payload": payload})
+            with self.engine.begin() as connection:
+                self.write(connection, params)
+                connection.execute(update_pointer, params)
+            moved += len(params)
+            logger.info("Moved %d HotelInfo payloads to %s, last SystemId: %s", moved, self.table, batch[-1][0])
+        return moved
+
+
+if __name__ == "__main__":
+    from single_hotel_info_input_data_in_db_json_formet import engine
+
+    parser = argparse.ArgumentParser(description="Create the HotelInfo payload table and move existing payloads into it.")
+    parser.add_argument("--table", default=os.getenv("HOTEL_INFO_PAYLOAD_TABLE", payload_table))
+    parser.add_argument("--chunk-size", type=int, default=500, help="Rows moved per transaction.")
+    parser.add_argument("--schema-only", action="store_true", help="Only create the table and pointer column.")
+    args = parser.parse_args()
+
+    setup_logging()
+    store = PayloadStore(engine, table=args.table)
+    store.ensure_schema()
+    if not args.schema_only:
+        logger.info("Moved %d payloads in total.", store.migrate(chunk_size=args.chunk_size))
@@ -0,0 +1,173 @@
+import os
+import re
+import gzip
+import json
+import time
+import hashlib
+import tempfile
+
+
+class CachedResponse:
+    def __init__(self, body, meta, fresh):
+        self.body = body
+        self.meta = meta
+        self.fresh = fresh
+
+    @property
+    def etag(self):
+        return self.meta.get("etag")
+
+    @property
+    def last_modified(self):
+        return self.meta.get("last_modified")
+
+    def conditional_headers(self):
+        """Headers for revalidating a stale entry with the provider."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """On-disk cache of raw provider responses keyed by (provider, id).
+
+    Bodies are gzip-compressed and stored by their sha256, so identical payloads
+    are kept once. Each (provider, id) has a small JSON entry with the hash,
+    ETag / Last-Modified and the time it was stored; entries older than `ttl`
+    seconds are stale and are removed by evict_expired().
+    """
+
+    def __init__(self, directory="response_cache", ttl=7 * 24 * 3600):
+        self.directory = directory
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls):
+        """Cache configured by RESPONSE_CACHE_DIR / RESPONSE_CACHE_TTL, or None when disabled."""
+        directory = os.getenv("RESPONSE_CACHE_DIR")
+        if not directory:
+            return None
+        return cls(directory, ttl=float(os.getenv("RESPONSE_CACHE_TTL", 7 * 24 * 3600)))
+
+    def _entry_path(self, provider, key):
+        safe_key = re.sub(r"[^A-Za-z0-9_.-]", "_", str(key))
+        shard = hashlib.sha1(safe_key.encode()).hexdigest()[:2]
+        return os.path.join(self.directory, "entries", provider, shard, f"{safe_key}.json")
+
+    def _blob_path(self, digest):
+        return os.path.join(self.directory, "blobs", digest[:2], f"{digest}.gz")
+
+    def _write_atomic(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, path)
+
+    def _read_meta(self, provider, key):
+        try:
+            with open(self._entry_path(provider, key), encoding="utf-8") as entry:
+                return json.load(entry)
+        except (OSError, ValueError):
+            return None
+
+    def get(self, provider, key, allow_stale=False):
+        """Return a CachedResponse, or None if there is no (fresh) entry.
+
+        With `allow_stale`, expired entries are returned too (with fresh=False) so the
+        caller can revalidate them using conditional_headers().
+        """
+        meta = self._read_meta(provider, key)
+        if meta is None:
+            self.misses += 1
+            return None
+        fresh = time.time() - meta["stored_at"] < self.ttl
+        if not fresh and not allow_stale:
+            self.misses += 1
+            return None
+        try:
+            with gzip.open(self._blob_path(meta["sha256"]), "rb") as blob:
+                body = blob.read()
+        except OSError:
+            self.misses += 1
+            return None
+        if fresh:
+            self.hits += 1
+        return CachedResponse(body, meta, fresh)
+
+    def put(self, provider, key, body, etag=None, last_modified=None):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        digest = hashlib.sha256(body).hexdigest()
+        blob_path = self._blob_path(digest)
+        if not os.path.exists(blob_path):
+            self._write_atomic(blob_path, gzip.compress(body, compresslevel=6))
+        meta = {
+            "provider": provider,
+            "key": str(key),
+            "sha256": digest,
+            "size": len(body),
+            "etag": etag,
+            "last_modified": last_modified,
+            "stored_at": time.time(),
+        }
+        self._write_atomic(self._entry_path(provider, key), json.dumps(meta).encode("utf-8"))
+        return meta
+
+    def touch(self, provider, key):
+        """Mark an entry as fresh again, e.g. after a 304 Not Modified."""
+        meta = self._read_meta(provider, key)
+        if meta is not None:
+            meta["stored_at"] = time.time()
+            self._write_atomic(self._entry_path(provider, key), json.dumps(meta).encode("utf-8"))
+
+    def evict_expired(self):
+        """Delete expired entries and any blob no remaining entry points to. Returns entries removed."""
+        removed = 0
+        live_digests = set()
+        now = time.time()
+        for root, _, files in os.walk(os.path.join(self.directory, "entries")):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    with open(path, encoding="utf-8") as entry:
+                        meta = json.load(entry)
+                except (OSError, ValueError):
+                    os.remove(path)
+                    removed += 1
+                    continue
+                if now - meta["stored_at"] >= self.ttl:
+                    os.remove(path)
+                    removed += 1
+                else:
+                    live_digests.add(meta["sha256"])
+
+        for root, _, files in os.walk(os.path.join(self.directory, "blobs")):
+            for name in files:
+                if name.endswith(".gz") and name[:-3] not in live_digests:
+                    os.remove(os.path.join(root, name))
+        return removed
+
+
+_default_cache = None
+
+
+def get_response_cache():
+    """Process wide cache configured from the environment (None when RESPONSE_CACHE_DIR is unset)."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResponseCache.from_env() or False
+    return _default_cache or None
+
+
+if __name__ == "__main__":
+    cache = ResponseCache.from_env()
+    if cache is None:
+        print("RESPONSE_CACHE_DIR is not set.")
+    else:
+        print(f"Evicted {cache.evict_expired()} expired entries from {cache.directory}")
@@ -1,11 +1,19 @@
 import os
 import time
-import json
-import requests
-import pandas as pd
+import asyncio
+import logging
+import argparse
 from datetime import datetime
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine
+from gi_client import gi_post
+from response_cache import get_response_cache
+from hotel_info_writer import BufferedHotelInfoWriter, hotel_info_update_params, write_hotel_info_updates
+from payload_store import PayloadStore
+from stage_metrics import metrics, start_metrics_reporter, stop_metrics_reporter
+from log_setup import ProgressLog, setup_logging
+import fast_json
+from hotel_db import fetch_column, fetch_distinct_column
 
 
 load_dotenv()
@@ -18,52 +26,35 @@ db_name = os.getenv('DB_NAME')
 DATABASE_URL = f"mysql+pymysql://{db_user}:{db_pass}@{db_host}/{db_name}"
 engine = create_engine(DATABASE_URL)
 
+# Side table for raw HotelInfo payloads, when HOTEL_INFO_PAYLOAD_STORE is set.
+payload_store = PayloadStore.from_env(engine)
+
 table = 'hotel_info_all'
 gill_api = os.getenv('GILL_API_KEY')
 
+logger = logging.getLogger(__name__)
+
 
 def only_column_info(table, column, engine):
     """Fetch distinct values from a specified column in a given table."""
     try:
         query = f"SELECT {column} FROM {table} WHERE StatusUpdateHotelInfo != 'Done Json' OR StatusUpdateHotelInfo IS NULL;"
-        df = pd.read_sql(query, engine)
-        return df[column].tolist()
+        return fetch_column(engine, query)
     except Exception as e:
-        print(f"Error fetching column info: {e}")
+        logger.error("Error fetching column info: %s", e)
         return []
 
 
 def only_select_column_info(table, column, country_code, engine):
     """Fetch distinct values from a specified column in a given table."""
     try:
-        query = f"SELECT {column} FROM {table} WHERE StatusUpdateHotelInfo != 'Done Json' OR StatusUpdateHotelInfo IS NULL AND CountryCode = '{country_code}';"
-        df = pd.read_sql(query, engine)
-        
-
-        unique_values = df[column].unique()
-        print(len(unique_values))
-        
-        # len_list = len(list)
-        # print(len_list)
-
-        # all_values = df[column].tolist()
-        
-        # Count unique values
-        unique_values = df[column].unique()
-        # print(f"Number of unique values: {len(unique_values)}")
-        
-        # # Find duplicates
-        # duplicates = df[df[column].duplicated()][column].tolist()  
-        # duplicate_counts = df[column].value_counts()[df[column].value_counts() > 1]  
-
-        # print(f"Total values: {len(all_values)}")
-        # print(f"Duplicate values: {duplicates}")
-        # print(f"Duplicate counts:\n{duplicate_counts}")
-
+        query = f"SELECT {column} FROM {table} WHERE StatusUpdateHotelInfo != 'Done Json' OR StatusUpdateHotelInfo IS NULL AND CountryCode = :country_code;"
+        unique_values = fetch_distinct_column(engine, query, {"country_code": country_code})
+        logger.info("%d SystemIds for %s", len(unique_values), country_code)
         return unique_values
     except Exception as e:
-        print(f"Error fetching column info: {e}")
-        return [], pd.Series()
+        logger.error("Error fetching column info: %s", e)
+        return []
         
 # data = only_select_column_info('hotel_info_all', 'SystemId', 'AE', engine)
 
@@ -71,86 +62,107 @@ def only_select_column_info(table, column, country_code, engine):
 
 
 def fetch_hotel_info_by_systemId(systemId):
-    """Fetch hotel information by system ID using synchronous requests."""
-    url = "https://api.giinfotech.ae/api/Hotel/HotelInfo"
-    payload = json.dumps({"hotelCode": str(systemId)})
-    headers = {
-        'ApiKey': gill_api,
-        'Content-Type': 'application/json'
-    }
+    """Fetch hotel information by system ID through the shared, rate limited GI client.
 
+    When a response cache is configured (RESPONSE_CACHE_DIR), a fresh cached
+    HotelInfo response is used instead of calling the API.
+    """
+    cache = get_response_cache()
     try:
-        response = requests.post(url, headers=headers, data=payload)
-        if response.status_code == 200:
-            response_data = response.json()
+        cached = cache.get("gi_hotel_info", systemId) if cache else None
+        if cached is not None:
+            metrics.count("cache_hits")
+            status_code, response_data = 200, fast_json.loads(cached.body)
+        else:
+            with metrics.timer("fetch"):
+                status_code, response_data = gi_post("/Hotel/HotelInfo", {"hotelCode": str(systemId)})
+            if cache and status_code == 200 and response_data.get("isSuccess"):
+                cache.put("gi_hotel_info", systemId, fast_json.dumps(response_data, ensure_ascii=False))
+        if status_code == 200:
             if response_data["isSuccess"]:
                 hotel_info = response_data["hotelInformation"]
                 return hotel_info
             else:
-                print(f"No hotel information found for systemID: {systemId}")
+                logger.debug("No hotel information found for systemID: %s", systemId)
         else:
-            print(f"Failed to fetch data for systemID {systemId}: {response.status_code}")
+            logger.warning("Failed to fetch data for systemID %s: %s", systemId, status_code)
     except Exception as e:
-        print(f"Error fetching data for system ID {systemId}: {e}")
+        logger.warning("Error fetching data for system ID %s: %s", systemId, e)
     
     return []
 
 
-def update_hotel_info(systemId, hotel_info_json_data, status_update, engine):
-    """Update hotel information in the database."""
-
-    if isinstance(hotel_info_json_data, str):
-        hotel_info_json_data = json.loads(hotel_info_json_data)
-    
-    country_code = hotel_info_json_data.get("address", {}).get("countryCode")
-    zip_code = hotel_info_json_data.get("address", {}).get("zipCode")
-    country_name = hotel_info_json_data.get("address", {}).get("countryName")
-    
-    query = text("""
-        UPDATE hotel_info_all
-        SET HotelInfo = :HotelInfo,
-            StatusUpdateHotelInfo = :StatusUpdateHotelInfo,
-            CountryCode = :CountryCode,
-            ZipCode = :ZipCode,
-            CountryName = :CountryName
-        WHERE SystemId = :SystemId
-    """)
-    
-    with engine.begin() as connection:
-        connection.execute(query, {
-            "HotelInfo": json.dumps(hotel_info_json_data),
-            "StatusUpdateHotelInfo": status_update,
-            "CountryCode": country_code,
-            "ZipCode": zip_code,
-            "CountryName": country_name,
-            "SystemId": systemId
-        })
-        print(f"Updated SystemId: {systemId} with Status: {status_update}.")
+def update_hotel_info(systemId, hotel_info_json_data, status_update, engine, max_retries=5, base_delay=1,
+                      payload_store=payload_store):
+    """Update hotel information in the database with retry logic using exponential backoff."""
+
+    with metrics.timer("transform"):
+        params = hotel_info_update_params(systemId, hotel_info_json_data, status_update, payload_store)
+
+    attempt = 0
+    while attempt < max_retries:
+        try:
+            with metrics.timer("db_write"), engine.begin() as connection:
+                write_hotel_info_updates(connection, [params], payload_store)
+            metrics.count("rows_written")
+            logger.debug("Updated SystemId: %s with Status: %s.", systemId, status_update)
+            return True
+        except Exception as e:
+            attempt += 1
+            if attempt < max_retries:
+                delay = base_delay * (2 ** (attempt - 1))  # Exponential backoff
+                logger.warning("Attempt %d failed: %s. Retrying in %s seconds...", attempt, e, delay)
+                time.sleep(delay)
+            else:
+                logger.error("All %d attempts failed. Error: %s", max_retries, e)
+                return False
+
+
+def update_hotel_info_sequentially(system_ids):
+    """Fetch and store HotelInfo one SystemId at a time."""
+    progress = ProgressLog(logger, "SystemIds", total=len(system_ids))
+    with BufferedHotelInfoWriter(engine, batch_size=200, flush_interval=5.0, payload_store=payload_store) as writer:
+        for systemId in system_ids:
+            hotel_info = fetch_hotel_info_by_systemId(systemId)
+            if hotel_info:
+                status_update = "Done Json"
+                writer.add(systemId, hotel_info, status_update)
+            else:
+                status_update = "Not found json"
+                writer.add(systemId, {}, status_update)
+            progress.record(systemId, status_update)
+    progress.close()
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Fetch GI HotelInfo for pending SystemIds.")
+    parser.add_argument("--concurrency", type=int, default=20, help="HotelInfo requests in flight.")
+    parser.add_argument("--sync", action="store_true", help="Use the old one-request-at-a-time loop.")
+    args = parser.parse_args()
+
+    setup_logging()
     start_time = time.time()
     formatted_start_time = datetime.fromtimestamp(start_time).strftime("%I:%M %p")  
-    print(f"Start Time: {formatted_start_time}")
+    logger.info("Start Time: %s", formatted_start_time)
 
+    if payload_store is not None:
+        payload_store.ensure_schema()
+    start_metrics_reporter()
     system_ids = only_column_info(table='hotel_info_all', column='SystemId', engine=engine)
 
     # system_ids = only_select_column_info('hotel_info_all', 'SystemId', 'AE', engine)
 
-    for index, systemId in enumerate(system_ids, start=1):
-        hotel_info = fetch_hotel_info_by_systemId(systemId)
-        if hotel_info:
-            status_update = "Done Json"
-            update_hotel_info(systemId, json.dumps(hotel_info), status_update, engine)
-            print(f"Update system Id Done: No:{index} ----- {systemId}")
-        else:
-            status_update = "Not found json"
-            update_hotel_info(systemId, json.dumps({}), status_update, engine)
-            print(f"Update system Not found json: No:{index} ---------------------------------------------------------------- {systemId}")
+    if args.sync:
+        update_hotel_info_sequentially(system_ids)
+    else:
+        from async_hotel_info_pipeline import run_hotel_info_pipeline
+        stats = asyncio.run(run_hotel_info_pipeline(system_ids, concurrency=args.concurrency))
+        logger.info("Pipeline finished: %s", stats)
+    stop_metrics_reporter()
 
-    end_time = time.time()  
+    end_time = time.time()
     formatted_end_time = datetime.fromtimestamp(end_time).strftime("%I:%M %p")
-    print(f"END time: {formatted_end_time}")
+    logger.info("END time: %s", formatted_end_time)
 
     total_time = end_time - start_time
 
@@ -161,7 +173,7 @@ def main():
     minutes = int((total_time % 3600) // 60)
     seconds = int(total_time % 60)
 
-    print(f"Total time taken for updates: {hours} hours, {minutes} minutes, {seconds} seconds")
+    logger.info("Total time taken for updates: %d hours, %d minutes, %d seconds", hours, minutes, seconds)
 
 
 if __name__ == "__main__":
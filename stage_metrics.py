@@ -0,0 +1,239 @@
+import os
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is +Inf.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class StageStats:
+    """Count, errors, total time and a latency histogram for one pipeline stage."""
+
+    __slots__ = ("count", "errors", "seconds", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def copy(self):
+        stats = StageStats()
+        stats.count, stats.errors, stats.seconds, stats.buckets = self.count, self.errors, self.seconds, list(self.buckets)
+        return stats
+
+    def minus(self, earlier):
+        stats = StageStats()
+        stats.count = self.count - earlier.count
+        stats.errors = self.errors - earlier.errors
+        stats.seconds = self.seconds - earlier.seconds
+        stats.buckets = [now - before for now, before in zip(self.buckets, earlier.buckets)]
+        return stats
+
+    def quantile(self, fraction):
+        """Upper bound of the bucket holding the `fraction` quantile (inf when it is in the last bucket)."""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS + (float("inf"),), self.buckets):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class StageMetrics:
+    """Thread-safe per-stage timers, counters and gauges for one process.
+
+    Stages are timed with `with metrics.timer("fetch"):`; an exception leaving the
+    block counts as an error of that stage. Counters only go up (rows written,
+    cache hits) and gauges hold the latest value (queue depths, buffer sizes).
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._counters = {}
+        self._gauges = {}
+
+    def observe(self, stage, seconds, error=False):
+        index = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = StageStats()
+            stats.count += 1
+            stats.seconds += seconds
+            stats.buckets[index] += 1
+            if error:
+                stats.errors += 1
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.observe(stage, time.perf_counter() - start, error=True)
+            raise
+        self.observe(stage, time.perf_counter() - start)
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def gauge(self, name, value):
+        with self._lock:
+            self._gauges[name] = value
+
+    def snapshot(self):
+        """(stages, counters, gauges) copied under the lock."""
+        with self._lock:
+            stages = {stage: stats.copy() for stage, stats in self._stages.items()}
+            return stages, dict(self._counters), dict(self._gauges)
+
+    def prometheus_text(self, prefix="hotel_pipeline"):
+        """All metrics in the Prometheus text exposition format."""
+        stages, counters, gauges = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_stage_seconds Time spent per pipeline stage.",
+            f"# TYPE {prefix}_stage_seconds histogram",
+        ]
+        for stage, stats in sorted(stages.items()):
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + (float("inf"),), stats.buckets):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {stats.seconds:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {stats.count}')
+
+        lines.append(f"# HELP {prefix}_stage_errors_total Stage executions that raised.")
+        lines.append(f"# TYPE {prefix}_stage_errors_total counter")
+        for stage, stats in sorted(stages.items()):
+            lines.append(f'{prefix}_stage_errors_total{{stage="{stage}"}} {stats.errors}')
+
+        lines.append(f"# TYPE {prefix}_events_total counter")
+        for name, value in sorted(counters.items()):
+            lines.append(f'{prefix}_events_total{{name="{name}"}} {value}')
+
+        lines.append(f"# TYPE {prefix}_gauge gauge")
+        for name, value in sorted(gauges.items()):
+            lines.append(f'{prefix}_gauge{{name="{name}"}} {value}')
+
+        lines.append(f"# TYPE {prefix}_start_time_seconds gauge")
+        lines.append(f"{prefix}_start_time_seconds {self.started:.3f}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Write prometheus_text() to `path` atomically (for node_exporter's textfile collector)."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+
+def format_summary(current, previous, interval):
+    """One line per stage with its rate, mean and p50/p99 over the last `interval` seconds, plus counters and gauges."""
+    stages, counters, gauges = current
+    previous_stages, previous_counters, _ = previous
+    lines = []
+    for stage, stats in sorted(stages.items()):
+        window = stats.minus(previous_stages.get(stage, StageStats()))
+        if not window.count:
+            continue
+        mean_ms = window.seconds / window.count * 1000
+        lines.append(f"  {stage:<12} {window.count / interval:8.1f}/s  mean {mean_ms:8.1f} ms  "
+                     f"p50<={window.quantile(0.5) * 1000:g} ms  p99<={window.quantile(0.99) * 1000:g} ms  "
+                     f"errors {window.errors}  busy {window.seconds / interval:5.2f}")
+    for name, value in sorted(counters.items()):
+        delta = value - previous_counters.get(name, 0)
+        lines.append(f"  {name:<12} {delta / interval:8.1f}/s  total {value}")
+    for name, value in sorted(gauges.items()):
+        lines.append(f"  {name:<12} {value}")
+    return lines
+
+
+class MetricsReporter:
+    """Background thread printing rolling summaries and/or rewriting a Prometheus text file every `interval` s.
+
+    A `{pid}` in `prometheus_path` is replaced by the process id, so worker
+    processes do not overwrite each other's files.
+    """
+
+    def __init__(self, metrics, interval=30.0, prometheus_path=None, log=True):
+        self.metrics = metrics
+        self.interval = interval
+        self.prometheus_path = prometheus_path.replace("{pid}", str(os.getpid())) if prometheus_path else None
+        self.log = log
+        self._stop = threading.Event()
+        self._previous = metrics.snapshot()
+        self._previous_time = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="metrics-reporter", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def report(self):
+        current, now = self.metrics.snapshot(), time.monotonic()
+        if self.log:
+            lines = format_summary(current, self._previous, max(now - self._previous_time, 1e-9))
+            if lines:
+                logger.info("Stage metrics:\n%s", "\n".join(lines))
+        if self.prometheus_path:
+            self.metrics.write_prometheus(self.prometheus_path)
+        self._previous, self._previous_time = current, now
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.report()
+
+    def stop(self):
+        """Stop the thread and emit a final report."""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.report()
+
+
+# Process wide metrics the pipeline modules record into.
+metrics = StageMetrics()
+
+_reporter = None
+
+
+def start_metrics_reporter(interval=None, prometheus_path=None):
+    """Start the process wide reporter from arguments or STAGE_METRICS_INTERVAL / STAGE_METRICS_FILE.
+
+    Returns the reporter, or None when reporting is not configured. Summaries are
+    printed when an interval is set; the file is only written when a path is set.
+    """
+    global _reporter
+    if _reporter is not None:
+        return _reporter
+    interval = interval if interval is not None else float(os.getenv("STAGE_METRICS_INTERVAL", "0") or 0)
+    prometheus_path = prometheus_path or os.getenv("STAGE_METRICS_FILE")
+    if not interval and not prometheus_path:
+        return None
+    _reporter = MetricsReporter(metrics, interval=interval or 30.0, prometheus_path=prometheus_path,
+                                log=bool(interval)).start()
+    return _reporter
+
+
+def stop_metrics_reporter():
+    global _reporter
+    if _reporter is not None:
+        _reporter.stop()
+        _reporter = None